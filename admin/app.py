@@ -1,6 +1,5 @@
-from terraria_admin import create_app
-
-app = create_app()
+import os
+import sys
 
 if __name__ == '__main__':
     print("=" * 50)
@@ -8,4 +7,11 @@ if __name__ == '__main__':
     print("=" * 50)
     print("Access: http://0.0.0.0:5000")
     print("=" * 50)
-    app.run(host='0.0.0.0', port=5000, debug=False)
+    sys.stdout.flush()
+    # Hand off to gunicorn (same settings as the container CMD, see
+    # gunicorn.conf.py) instead of the single-threaded Werkzeug dev server.
+    os.execvp('gunicorn', ['gunicorn', '-c', 'gunicorn.conf.py', 'app:app'])
+
+from terraria_admin import create_app
+
+app = create_app()
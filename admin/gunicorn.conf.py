@@ -0,0 +1,12 @@
+# Gunicorn settings shared by the container CMD and `python app.py`.
+#
+# One worker process: the console buffer, log pollers, API caches and the
+# world-job queue live in-process, so extra workers would each see partial
+# state.  Concurrency comes from threads instead — the handlers mostly wait on
+# Docker, TShock REST or disk I/O, so a blocking call stalls one thread only.
+bind = '0.0.0.0:5000'
+worker_class = 'gthread'
+workers = 1
+threads = 8
+# Long enough for synchronous steamcmd/tModLoader update requests.
+timeout = 600
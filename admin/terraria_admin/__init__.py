@@ -1,8 +1,37 @@
+import importlib
 import os
+import stat
 
-from flask import Flask, jsonify, render_template, request, session
+from flask import Flask, abort, g, jsonify, render_template, request, session
+from jinja2 import FileSystemBytecodeCache
 
 from .config import Config
+from .json_provider import OrjsonProvider, orjson
+
+_BLUEPRINTS = (
+    'auth', 'dashboard', 'players', 'world', 'mods',
+    'backups', 'config_bp', 'console', 'api',
+)
+
+# Endpoints allowed the full MAX_CONTENT_LENGTH; everything else is a small form.
+_UPLOAD_ENDPOINTS = frozenset({'mods.mods_upload'})
+
+
+def _private_dir(path):
+    """Create *path* as a 0700 directory and return it, or None if it is unsafe.
+
+    Jinja unmarshals whatever bytecode it finds in the cache directory, so a
+    directory another local user created first (or a symlink) must not be used.
+    """
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        st = os.lstat(path)
+    except OSError:
+        return None
+    if (not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid()
+            or stat.S_IMODE(st.st_mode) != 0o700):
+        return None
+    return path
 
 
 def create_app(config_class=Config):
@@ -10,6 +39,8 @@ def create_app(config_class=Config):
         __name__,
         template_folder='../templates',
     )
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
     cfg = config_class()
     app.secret_key = cfg.SECRET_KEY
     app.config['SESSION_COOKIE_HTTPONLY'] = cfg.SESSION_COOKIE_HTTPONLY
@@ -18,29 +49,48 @@ def create_app(config_class=Config):
     app.config['PERMANENT_SESSION_LIFETIME'] = cfg.PERMANENT_SESSION_LIFETIME
     app.config['MAX_CONTENT_LENGTH'] = cfg.MAX_CONTENT_LENGTH
 
+    # Keep compiled templates on disk so a fresh worker deserialises them
+    # instead of re-parsing every template on its first render.
+    jinja_cache_dir = getattr(cfg, 'JINJA_CACHE_DIR', '')
+    if jinja_cache_dir is None:
+        try:
+            app.jinja_env.bytecode_cache = FileSystemBytecodeCache()
+        except (OSError, RuntimeError):
+            pass
+    elif jinja_cache_dir and _private_dir(jinja_cache_dir):
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(jinja_cache_dir)
+
     # Store config object on app for services that need it in threads
     app.terraria_config = cfg
 
-    # Register blueprints
-    from .blueprints.auth       import bp as auth_bp
-    from .blueprints.dashboard  import bp as dashboard_bp
-    from .blueprints.players    import bp as players_bp
-    from .blueprints.world      import bp as world_bp
-    from .blueprints.mods       import bp as mods_bp
-    from .blueprints.backups    import bp as backups_bp
-    from .blueprints.config_bp  import bp as config_bp
-    from .blueprints.console    import bp as console_bp
-    from .blueprints.api        import bp as api_bp
-
-    app.register_blueprint(auth_bp)
-    app.register_blueprint(dashboard_bp)
-    app.register_blueprint(players_bp)
-    app.register_blueprint(world_bp)
-    app.register_blueprint(mods_bp)
-    app.register_blueprint(backups_bp)
-    app.register_blueprint(config_bp)
-    app.register_blueprint(console_bp)
-    app.register_blueprint(api_bp)
+    # Register blueprints.  Service modules (and the heavy third-party packages
+    # they need: docker, psutil, requests) are only imported when a handler
+    # actually calls into them.
+    for name in _BLUEPRINTS:
+        module = importlib.import_module(f'.blueprints.{name}', __name__)
+        app.register_blueprint(module.bp)
+
+    # Request-scoped memo for services._cache: repeated get_server_type() /
+    # get_enabled_mods() calls within one request skip even the stat().
+    @app.before_request
+    def _init_stat_cache():
+        g._stat_cache = {}
+
+    # Refuse oversized bodies from the declared length, before request.form
+    # makes Werkzeug read and parse them.  A chunked body declares no length:
+    # read at most one byte past the limit and cache it for request.form.
+    max_form_length = getattr(cfg, 'MAX_FORM_LENGTH', None)
+    if max_form_length:
+        @app.before_request
+        def _limit_form_body():
+            if request.endpoint in _UPLOAD_ENDPOINTS:
+                return
+            if (request.content_length or 0) > max_form_length:
+                abort(413)
+            if 'chunked' in request.headers.get('Transfer-Encoding', '').lower():
+                request.max_content_length = max_form_length + 1
+                if len(request.get_data(cache=True)) > max_form_length:
+                    abort(413)
 
     # Security headers on every response
     @app.after_request
@@ -71,7 +121,10 @@ def create_app(config_class=Config):
         if request.path.startswith('/api/'):
             return jsonify({'error': 'File too large', 'status': 413}), 413
         from flask import flash, redirect, url_for
-        flash('File is too large (max 256 MB)', 'error')
+        if request.endpoint in _UPLOAD_ENDPOINTS:
+            flash('File is too large (max 256 MB)', 'error')
+        else:
+            flash('Request is too large', 'error')
         return redirect(request.referrer or url_for('dashboard.dashboard'))
 
     # Start background daemons only once.
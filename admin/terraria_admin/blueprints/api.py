@@ -1,14 +1,116 @@
+import hashlib
+import json
+import os
+import re
+import shutil
 import subprocess
+import threading
+import time
+from types import SimpleNamespace
 
-from flask import Blueprint, current_app, jsonify, render_template, request
+from flask import Blueprint, Response, current_app, jsonify, render_template, request
 
 from ..decorators import login_required
+from ..extensions import get_docker, reset_docker
+from ..json_provider import orjson
 from ..services.server import get_server_status, get_players
+from ..services.metrics import host_usage
 from ..services.mods import list_mods
 from ..services.world import get_version_info
 
+if orjson is not None:
+    _dumps = orjson.dumps
+else:
+    def _dumps(obj):
+        return json.dumps(obj).encode()
+
+try:
+    import psutil
+    _HAS_PSUTIL = True
+except ImportError:
+    psutil = None
+    _HAS_PSUTIL = False
+
+# Optional: systemd-python reads the journal in-process instead of forking
+# journalctl. Only useful on bare-metal installs; Docker has no journal.
+try:
+    from systemd import journal
+except ImportError:
+    journal = None
+
 bp = Blueprint('api', __name__)
 
+# Config values the logs/diag/metrics handlers read on every request. Config
+# is fixed for the life of an app, so they are resolved once when the
+# blueprint is registered (per app, in app.extensions) instead of through
+# getattr()/properties per call.
+@bp.record
+def _resolve_config(state):
+    cfg = state.app.terraria_config
+    state.app.extensions['api_cfg'] = SimpleNamespace(
+        LOG_FILE=getattr(cfg, 'LOG_FILE', None),
+        LOG_LOOKBACK=cfg.LOG_LOOKBACK,
+        SERVICE_NAME=cfg.SERVICE_NAME,
+        SERVER_CONTAINER=cfg.SERVER_CONTAINER,
+        WORLDS_DIR=cfg.WORLDS_DIR,
+        CONFIG_FILE=cfg.CONFIG_FILE,
+        TERRARIA_DIR=cfg.TERRARIA_DIR,
+    )
+
+
+# /api/logs?level= filters: one case-insensitive scan per line instead of
+# lower() plus a substring test per keyword. File and journalctl lines stay
+# bytes until filtered, so there is a bytes twin of each pattern.
+_LEVEL_KEYWORDS = {
+    'error': 'error|exception|fail|fatal',
+    'warn': 'warn|error|exception|fail|fatal',
+}
+_LEVEL_RE = {k: re.compile(v, re.IGNORECASE) for k, v in _LEVEL_KEYWORDS.items()}
+_LEVEL_RE_BYTES = {k: re.compile(v.encode(), re.IGNORECASE) for k, v in _LEVEL_KEYWORDS.items()}
+
+# Polled JSON endpoints that get an ETag; unchanged payloads become a 304.
+_CONDITIONAL_ENDPOINTS = frozenset({
+    'api.api_status', 'api.api_version', 'api.api_mods',
+    'api.api_diag', 'api.api_metrics',
+})
+
+# Short-lived results for the polled endpoints, so several open tabs polling
+# every few seconds share one upstream Docker/REST/filesystem call.
+# Keyed by (function, cfg): the function is looked up at call time, which
+# keeps the cache from outliving a swapped-in implementation.
+_TTL_STATUS = 2
+_TTL_MODS = 5
+_TTL_VERSION = 30
+_ttl_store: dict = {}
+_ttl_locks: dict = {}
+_ttl_guard = threading.Lock()
+
+
+def _ttl_call(fn, cfg, ttl):
+    key = (fn, cfg)
+    with _ttl_guard:
+        lock = _ttl_locks.setdefault(key, threading.Lock())
+    # Per-key lock: concurrent misses wait for the first caller's result
+    # instead of each hitting the backend.
+    with lock:
+        hit = _ttl_store.get(key)
+        if hit and hit[0] > time.monotonic():
+            return hit[1]
+        value = fn(cfg)
+        _ttl_store[key] = (time.monotonic() + ttl, value)
+    return value
+
+
+@bp.after_request
+def _conditional_json(response):
+    if (request.endpoint in _CONDITIONAL_ENDPOINTS and request.method == 'GET'
+            and response.status_code == 200 and not response.is_streamed):
+        response.set_etag(hashlib.blake2b(response.get_data(), digest_size=8).hexdigest())
+        response.cache_control.max_age = 2
+        response.cache_control.private = True
+        response.make_conditional(request)
+    return response
+
 
 @bp.route('/logs')
 @login_required
@@ -20,76 +122,285 @@ def logs():
 @login_required
 def api_status():
     cfg = current_app.terraria_config
-    return jsonify(get_server_status(cfg))
+    return jsonify(_ttl_call(get_server_status, cfg, _TTL_STATUS))
 
 
 @bp.route('/api/players')
 @login_required
 def api_players():
     cfg = current_app.terraria_config
-    return jsonify(get_players(cfg))
+    return jsonify(_ttl_call(get_players, cfg, _TTL_STATUS))
 
 
 @bp.route('/api/version')
 @login_required
 def api_version():
     cfg = current_app.terraria_config
-    return jsonify(get_version_info(cfg))
+    return jsonify(_ttl_call(get_version_info, cfg, _TTL_VERSION))
 
 
 @bp.route('/api/mods')
 @login_required
 def api_mods():
     cfg = current_app.terraria_config
-    return jsonify(list_mods(cfg))
+    return jsonify(_ttl_call(list_mods, cfg, _TTL_MODS))
 
 
 @bp.route('/api/logs')
 @login_required
 def api_logs():
-    cfg = current_app.terraria_config
+    cfg = current_app.extensions['api_cfg']
     try:
-        lines = min(int(request.args.get('lines', 300)), 1000)
+        lines = max(1, min(int(request.args.get('lines', 300)), 1000))
     except (ValueError, TypeError):
         lines = 300
     level = request.args.get('level', 'all')
 
     log_lines = _read_logs(cfg, lines)
 
-    if level == 'error':
-        log_lines = [line for line in log_lines if any(
-            kw in line.lower() for kw in ('error', 'exception', 'fail', 'fatal'))]
-    elif level == 'warn':
-        log_lines = [line for line in log_lines if any(
-            kw in line.lower() for kw in ('warn', 'error', 'exception', 'fail', 'fatal'))]
-    return jsonify({'lines': log_lines})
+    raw = bool(log_lines) and isinstance(log_lines[0], bytes)
+    level_re = (_LEVEL_RE_BYTES if raw else _LEVEL_RE).get(level)
+    if level_re is not None:
+        log_lines = [line for line in log_lines if level_re.search(line)]
+    return Response(_stream_lines_json(log_lines, raw), mimetype='application/json')
+
+
+_LOG_STREAM_BATCH = 100
+
+
+def _stream_lines_json(log_lines, raw):
+    """Yield {"lines": [...]} in chunks, decoding bytes lines as they are sent.
+
+    Up to 1000 lines can be requested; streaming lets the client start
+    receiving before the whole body is encoded and keeps only one batch of
+    encoded lines in memory at a time.
+    """
+    yield b'{"lines":['
+    for start in range(0, len(log_lines), _LOG_STREAM_BATCH):
+        batch = log_lines[start:start + _LOG_STREAM_BATCH]
+        if raw:
+            batch = [line.decode('utf-8', errors='replace') for line in batch]
+        encoded = b','.join(_dumps(line) for line in batch)
+        yield encoded if start == 0 else b',' + encoded
+    yield b']}'
 
 
 def _read_logs(cfg, lines):
-    """Try log file → journalctl → console buffer, in that order."""
+    """Try log file → journalctl → console buffer, in that order.
+
+    The log file and journalctl sources return undecoded bytes lines; the
+    journal reader and console buffer return str.
+    """
     # 1. Log file (works in Docker if volume-mounted)
-    log_file = getattr(cfg, 'LOG_FILE', None)
+    log_file = cfg.LOG_FILE
     if log_file:
         try:
-            with open(log_file) as f:
-                return f.readlines()[-lines:]
+            return _tail_file(log_file, lines)
         except Exception:
             pass
 
-    # 2. journalctl (works on bare-metal with systemd)
-    try:
-        result = subprocess.run(
-            ['journalctl', '-u', cfg.SERVICE_NAME, f'-n{lines}', '--no-pager', '--output=short-iso'],
-            capture_output=True, text=True, timeout=10
-        )
-        if result.returncode == 0:
-            return result.stdout.splitlines()
-    except Exception:
-        pass
+    # 2. systemd journal (works on bare-metal with systemd)
+    if journal is not None:
+        try:
+            tail = _journal_tail(cfg.SERVICE_NAME, lines)
+            if tail:
+                return tail
+        except Exception:
+            pass
+
+    if _JOURNALCTL:
+        try:
+            tail = _journalctl_tail(cfg, lines)
+            if tail is not None:
+                return tail
+        except Exception:
+            pass
 
     # 3. In-memory console buffer (always available in Docker)
-    from ..extensions import console_buffer
-    return list(console_buffer)[-lines:]
+    from ..extensions import console_tail
+    return console_tail(lines)
+
+
+# journalctl can only work on a systemd host: inside the admin container it
+# always fails, so don't fork it per request. Resolved once at import.
+_IN_DOCKER = (os.path.exists('/.dockerenv')
+              or os.environ.get('IN_DOCKER', '').lower() in ('1', 'true', 'yes'))
+_JOURNALCTL = None if _IN_DOCKER else shutil.which('journalctl')
+
+# Upper bound on journalctl output read per /api/logs line.
+_JOURNAL_LINE_BYTES = 512
+_JOURNALCTL_TIMEOUT = 10
+
+
+def _journalctl_tail(cfg, lines):
+    """Return the last *lines* journalctl lines (bytes, oldest first), or None.
+
+    Output is read newest-first (--reverse) into a bounded buffer and the
+    process is stopped as soon as the buffer is full, so a chatty journal
+    never gets fully buffered and truncation only ever drops the oldest lines.
+    """
+    limit = lines * _JOURNAL_LINE_BYTES
+    proc = subprocess.Popen(
+        [_JOURNALCTL, '-u', cfg.SERVICE_NAME, f'-n{lines}', f'--since={cfg.LOG_LOOKBACK}',
+         '--reverse', '--no-pager', '--output=short-iso'],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=65536,
+    )
+    killer = threading.Timer(_JOURNALCTL_TIMEOUT, proc.kill)
+    killer.start()
+    try:
+        data = proc.stdout.read(limit)
+        truncated = len(data) >= limit
+        if truncated:
+            proc.terminate()
+            # Last line may be cut off mid-record.
+            data = data[:data.rfind(b'\n') + 1]
+        returncode = proc.wait()
+    finally:
+        killer.cancel()
+        proc.stdout.close()
+    if not truncated and returncode != 0:
+        return None
+    return data.splitlines()[::-1]
+
+
+def _tail_file(path, n, block=65536):
+    """Return the last *n* lines of *path* (as bytes) without reading the whole file.
+
+    Reads fixed-size blocks backwards from EOF until enough newlines have
+    been seen, so cost scales with the output rather than the log size.
+    """
+    with open(path, 'rb') as f:
+        pos = os.fstat(f.fileno()).st_size
+        buf = b''
+        # n + 1: the final line usually ends in a newline of its own.
+        while pos > 0 and buf.count(b'\n') <= n:
+            step = min(block, pos)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+    # split(b'\n') rather than splitlines(): only newline ends a record
+    # (a bare \r from progress output must not), and it is a single pass.
+    lines = buf.split(b'\n')
+    if not lines[-1]:
+        lines.pop()
+    lines = lines[-n:]
+    if b'\r' in buf:
+        lines = [line[:-1] if line.endswith(b'\r') else line for line in lines]
+    return lines
+
+
+def _journal_tail(service, lines):
+    """Return the last *lines* journal entries of *service*, oldest first."""
+    reader = journal.Reader()
+    try:
+        reader.add_match(_SYSTEMD_UNIT=f'{service}.service')
+        reader.seek_tail()
+        entries = []
+        while len(entries) < lines:
+            entry = reader.get_previous()
+            if not entry:
+                break
+            entries.append(entry)
+    finally:
+        reader.close()
+    out = []
+    for entry in reversed(entries):
+        ts = entry.get('__REALTIME_TIMESTAMP')
+        stamp = ts.isoformat(timespec='seconds') if ts else ''
+        ident = entry.get('SYSLOG_IDENTIFIER', service)
+        out.append(f"{stamp} {ident}: {entry.get('MESSAGE', '')}")
+    return out
+
+
+# Shell probes run inside the server container by /api/diag: (result key, sh -c script).
+_DIAG_PROBES = (
+    # Show ARGS section of entrypoint to verify worldpath fix is deployed
+    ('entrypoint_args_section',
+     'grep -n "ARGS\\|worldpath\\|SERVERCONFIG\\|config" /entrypoint.sh | head -20'),
+    # Find .wld files anywhere in the container (most important!)
+    ('wld_search',
+     'find / -name "*.wld" -not -path "/proc/*" -not -path "/sys/*" 2>/dev/null || echo "(none found)"'),
+    # List shared volume
+    ('terraria_ls', 'ls -lah /opt/terraria/'),
+    # List tModLoader log directory (reveals if logs are being written)
+    ('tml_logs_ls',
+     'ls -lah /root/.local/share/Terraria/tModLoader/Logs/ 2>/dev/null || echo "(dir not found)"'),
+    # Last 30 lines of tModLoader server.log if it exists
+    ('log_file_tail',
+     'tail -30 /root/.local/share/Terraria/tModLoader/Logs/server.log 2>/dev/null || echo "(log not found)"'),
+    # Running processes — is tModLoader actually alive?
+    ('processes', 'ps aux 2>/dev/null || ps -ef 2>/dev/null || echo "(ps not found)"'),
+    # Process list via /proc (works even without ps binary)
+    ('procs_proc',
+     'for f in /proc/[0-9]*/cmdline; do '
+     'pid=$(echo "$f" | grep -oE "[0-9]+"); '
+     'cmd=$(cat "$f" 2>/dev/null | tr "\\0" " " | cut -c1-200); '
+     '[ -n "$cmd" ] && echo "  PID $pid: $cmd"; '
+     'done 2>/dev/null | head -30'),
+    # dotnet runtime version — verify dotnet is available and working
+    ('dotnet_version', 'dotnet --version 2>&1 || echo "(dotnet not found in PATH)"'),
+    # ScriptCaller.sh — understand env/lib setup tModLoader needs before dotnet
+    ('script_caller',
+     'cat /server/LaunchUtils/ScriptCaller.sh 2>/dev/null '
+     '|| cat /server/ScriptCaller.sh 2>/dev/null '
+     '|| echo "(ScriptCaller.sh not found)"'),
+    # Binary info — architecture mismatch causes immediate silent crash
+    ('server_binary_info',
+     'echo "arch: $(uname -m)"; '
+     'file /server/tModLoaderServer 2>/dev/null || echo "no tModLoaderServer"; '
+     'ls -lah /server/tModLoaderServer /server/tModLoader.dll /server/start-tModLoaderServer.sh 2>/dev/null'),
+    # First 25 lines of start-tModLoaderServer.sh (official launcher)
+    ('start_script_head', 'head -25 /server/start-tModLoaderServer.sh 2>/dev/null || echo "(not found)"'),
+    # All log files in /root/.local and /server dirs
+    ('all_logs',
+     'find /root/.local /server -name "*.log" -o -name "*.txt" 2>/dev/null | head -20 || echo "(none)"'),
+    # ScriptCaller.sh launch log — contains dotnet install output and startup errors
+    ('launch_log',
+     'find /server -name "Launch.log" 2>/dev/null | head -1'
+     ' | xargs tail -40 2>/dev/null || echo "(Launch.log not found)"'),
+    # Natives.log — stderr from dotnet/tModLoader (crash stack traces go here)
+    ('native_log',
+     'find /server -name "Natives.log" 2>/dev/null | head -1'
+     ' | xargs cat 2>/dev/null || echo "(Natives.log not found)"'),
+    # LD_LIBRARY_PATH inside container after EnvironmentFix runs
+    ('env_ld',
+     'echo "LD_LIBRARY_PATH=${LD_LIBRARY_PATH:-<not set>}"; '
+     'ls /server/Libraries/ 2>/dev/null | head -10 || echo "(no /server/Libraries)"'),
+)
+
+# All probes as one script so /api/diag costs a single exec round-trip and a
+# single shell start. Each probe runs in its own subshell (so its ||/pipes stay
+# local) and its output is preceded by a ---DIAG:key--- marker line.
+_DIAG_SCRIPT = '\n'.join(
+    f"printf '\\n---DIAG:{key}---\\n'; ( {cmd} ) 2>&1" for key, cmd in _DIAG_PROBES
+)
+_DIAG_MARKER = re.compile(rb'^---DIAG:(\w+)---$', re.MULTILINE)
+
+
+def _parse_diag_output(raw):
+    """Split raw _DIAG_SCRIPT output bytes into {key: stripped section text}."""
+    parts = _DIAG_MARKER.split(raw)
+    return {
+        key.decode('ascii'): out.strip().decode('utf-8', errors='replace')
+        for key, out in zip(parts[1::2], parts[2::2])
+    }
+
+
+# serverconfig.txt as last read by /api/diag, keyed by file identity so the
+# diag page only costs a stat() until the file actually changes.
+_serverconfig_cache: dict = {}
+
+
+def _serverconfig_text(path):
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    cached = _serverconfig_cache.get('entry')
+    if cached and cached[0] == key:
+        return cached[1]
+    with open(path) as f:
+        content = f.read()
+    _serverconfig_cache['entry'] = (key, content)
+    return content
 
 
 @bp.route('/diag')
@@ -102,8 +413,7 @@ def diag_page():
 @login_required
 def api_diag():
     """Diagnostic endpoint: Docker connection, container exec probes, worlds dir, log file."""
-    import os
-    cfg = current_app.terraria_config
+    cfg = current_app.extensions['api_cfg']
     result = {
         'docker': {'connected': False, 'error': None},
         'container': {
@@ -120,148 +430,120 @@ def api_diag():
         'console_buffer': {'size': 0, 'last': []},
         'worlds': {'dir': cfg.WORLDS_DIR, 'exists': False, 'files': []},
         'serverconfig': {'exists': False, 'content': None},
-        'log_file': {'path': getattr(cfg, 'LOG_FILE', None), 'exists': False, 'tail': []},
+        'log_file': {'path': cfg.LOG_FILE, 'exists': False, 'tail': []},
     }
 
     # Docker + container exec probes
     try:
-        import docker
-        client = docker.from_env()
+        client = get_docker()
+        try:
+            client.ping()
+        except Exception:
+            # Stale connection (daemon restarted?): rebuild once.
+            reset_docker()
+            client = get_docker()
+            client.ping()
         result['docker']['connected'] = True
+        # Low-level API: one inspect gives status and tty as a plain dict,
+        # without the Container model and its lazy reload round-trips.
+        api = client.api
+        name = cfg.SERVER_CONTAINER
         try:
-            container = client.containers.get(cfg.SERVER_CONTAINER)
-            result['container']['status'] = container.status
-            result['container']['tty'] = container.attrs.get('Config', {}).get('Tty', False)
+            info = api.inspect_container(name)
+            status = info.get('State', {}).get('Status')
+            result['container']['status'] = status
+            result['container']['tty'] = info.get('Config', {}).get('Tty', False)
 
             # Docker logs (non-streaming) — may be empty if tModLoader writes to file
-            raw = container.logs(tail=100, stdout=True, stderr=True)
-            lines = raw.decode('utf-8', errors='replace').splitlines()
-            result['container']['logs_last'] = [l for l in lines if l.strip()][-50:]
-
-            if container.status == 'running':
-                def _exec(sh_cmd):
-                    """Run sh -c '...' inside the container."""
-                    try:
-                        r = container.exec_run(['sh', '-c', sh_cmd],
-                                               stdout=True, stderr=True)
-                        return r.output.decode('utf-8', errors='replace').strip()
-                    except Exception as e:
-                        return f'exec error: {e}'
-
-                # Show ARGS section of entrypoint to verify worldpath fix is deployed
-                result['container']['entrypoint_args_section'] = _exec(
-                    'grep -n "ARGS\\|worldpath\\|SERVERCONFIG\\|config" /entrypoint.sh | head -20'
-                )
-                # Find .wld files anywhere in the container (most important!)
-                result['container']['wld_search'] = _exec(
-                    'find / -name "*.wld" -not -path "/proc/*" -not -path "/sys/*" 2>/dev/null || echo "(none found)"'
-                )
-                # List shared volume
-                result['container']['terraria_ls'] = _exec('ls -lah /opt/terraria/')
-                # List tModLoader log directory (reveals if logs are being written)
-                result['container']['tml_logs_ls'] = _exec(
-                    'ls -lah /root/.local/share/Terraria/tModLoader/Logs/ 2>/dev/null || echo "(dir not found)"'
-                )
-                # Last 30 lines of tModLoader server.log if it exists
-                result['container']['log_file_tail'] = _exec(
-                    'tail -30 /root/.local/share/Terraria/tModLoader/Logs/server.log 2>/dev/null || echo "(log not found)"'
-                )
-                # Running processes — is tModLoader actually alive?
-                result['container']['processes'] = _exec('ps aux 2>/dev/null || ps -ef 2>/dev/null || echo "(ps not found)"')
-                # Process list via /proc (works even without ps binary)
-                result['container']['procs_proc'] = _exec(
-                    'for f in /proc/[0-9]*/cmdline; do '
-                    'pid=$(echo "$f" | grep -oE "[0-9]+"); '
-                    'cmd=$(cat "$f" 2>/dev/null | tr "\\0" " " | cut -c1-200); '
-                    '[ -n "$cmd" ] && echo "  PID $pid: $cmd"; '
-                    'done 2>/dev/null | head -30'
-                )
-                # dotnet runtime version — verify dotnet is available and working
-                result['container']['dotnet_version'] = _exec('dotnet --version 2>&1 || echo "(dotnet not found in PATH)"')
-                # ScriptCaller.sh — understand env/lib setup tModLoader needs before dotnet
-                result['container']['script_caller'] = _exec(
-                    'cat /server/LaunchUtils/ScriptCaller.sh 2>/dev/null '
-                    '|| cat /server/ScriptCaller.sh 2>/dev/null '
-                    '|| echo "(ScriptCaller.sh not found)"'
-                )
-                # Binary info — architecture mismatch causes immediate silent crash
-                result['container']['server_binary_info'] = _exec(
-                    'echo "arch: $(uname -m)"; '
-                    'file /server/tModLoaderServer 2>/dev/null || echo "no tModLoaderServer"; '
-                    'ls -lah /server/tModLoaderServer /server/tModLoader.dll /server/start-tModLoaderServer.sh 2>/dev/null'
-                )
-                # First 25 lines of start-tModLoaderServer.sh (official launcher)
-                result['container']['start_script_head'] = _exec(
-                    'head -25 /server/start-tModLoaderServer.sh 2>/dev/null || echo "(not found)"'
-                )
-                # All log files in /root/.local and /server dirs
-                result['container']['all_logs'] = _exec(
-                    'find /root/.local /server -name "*.log" -o -name "*.txt" 2>/dev/null | head -20 || echo "(none)"'
-                )
-                # ScriptCaller.sh launch log — contains dotnet install output and startup errors
-                result['container']['launch_log'] = _exec(
-                    'find /server -name "Launch.log" 2>/dev/null | head -1'
-                    ' | xargs tail -40 2>/dev/null || echo "(Launch.log not found)"'
-                )
-                # Natives.log — stderr from dotnet/tModLoader (crash stack traces go here)
-                result['container']['native_log'] = _exec(
-                    'find /server -name "Natives.log" 2>/dev/null | head -1'
-                    ' | xargs cat 2>/dev/null || echo "(Natives.log not found)"'
-                )
-                # LD_LIBRARY_PATH inside container after EnvironmentFix runs
-                result['container']['env_ld'] = _exec(
-                    'echo "LD_LIBRARY_PATH=${LD_LIBRARY_PATH:-<not set>}"; '
-                    'ls /server/Libraries/ 2>/dev/null | head -10 || echo "(no /server/Libraries)"'
-                )
+            raw = api.logs(name, tail=100, stdout=True, stderr=True)
+            kept = [l for l in raw.splitlines() if l.strip()][-50:]
+            result['container']['logs_last'] = [l.decode('utf-8', errors='replace') for l in kept]
+
+            if status == 'running':
+                try:
+                    exec_id = api.exec_create(name, ['sh', '-c', _DIAG_SCRIPT],
+                                              stdout=True, stderr=True)['Id']
+                    output = api.exec_start(exec_id)
+                    sections = _parse_diag_output(output)
+                except Exception as e:
+                    sections = {}
+                    missing = f'exec error: {e}'
+                else:
+                    missing = '(no output)'
+                for key, _ in _DIAG_PROBES:
+                    result['container'][key] = sections.get(key, missing)
         except Exception as exc:
             result['container']['status'] = f'error: {exc}'
-        finally:
-            client.close()
     except Exception as exc:
         result['docker']['error'] = str(exc)
 
     # Console buffer
-    from ..extensions import console_buffer, console_lock
-    with console_lock:
-        buf = list(console_buffer)
-    result['console_buffer']['size'] = len(buf)
-    result['console_buffer']['last'] = buf[-20:]
+    from ..extensions import console_buffer, console_tail
+    result['console_buffer']['size'] = len(console_buffer)
+    result['console_buffer']['last'] = console_tail(20)
 
     # Worlds dir
-    if os.path.isdir(cfg.WORLDS_DIR):
+    try:
+        with os.scandir(cfg.WORLDS_DIR) as it:
+            result['worlds']['files'] = sorted(entry.name for entry in it)
         result['worlds']['exists'] = True
-        result['worlds']['files'] = sorted(os.listdir(cfg.WORLDS_DIR))
+    except OSError:
+        pass
 
     # Serverconfig
     try:
-        with open(cfg.CONFIG_FILE) as f:
-            result['serverconfig']['exists'] = True
-            result['serverconfig']['content'] = f.read()
+        result['serverconfig']['content'] = _serverconfig_text(cfg.CONFIG_FILE)
+        result['serverconfig']['exists'] = True
     except Exception:
         pass
 
     # Log file (on shared volume after docker-compose mount)
-    log_file = getattr(cfg, 'LOG_FILE', None)
+    log_file = cfg.LOG_FILE
     if log_file and os.path.exists(log_file):
         result['log_file']['exists'] = True
         try:
-            with open(log_file, 'r', errors='replace') as f:
-                lines = f.readlines()
-            result['log_file']['tail'] = [l.rstrip() for l in lines[-50:]]
+            result['log_file']['tail'] = [
+                l.decode('utf-8', errors='replace').rstrip() for l in _tail_file(log_file, 50)
+            ]
         except Exception:
             pass
 
     return jsonify(result)
 
 
+# The server process found by the last /api/metrics scan. Keeping the Process
+# object avoids walking every PID on each poll and gives cpu_percent() the
+# previous sample it measures against.
+_SERVER_MARKERS = ('tModLoader', 'TerrariaServer')
+_server_proc = None
+_server_proc_lock = threading.Lock()
+
+
+def _server_process():
+    """Return the cached server psutil.Process, rescanning only when it has exited."""
+    global _server_proc
+    with _server_proc_lock:
+        proc = _server_proc
+        if proc is not None and proc.is_running():
+            return proc
+        _server_proc = None
+        for candidate in psutil.process_iter(['cmdline']):
+            # Test each argv element; no joined string per process.
+            args = candidate.info['cmdline'] or ()
+            if any(marker in arg for arg in args for marker in _SERVER_MARKERS):
+                _server_proc = candidate
+                break
+        return _server_proc
+
+
 @bp.route('/api/metrics')
 @login_required
 def api_metrics():
-    cfg = current_app.terraria_config
+    cfg = current_app.extensions['api_cfg']
+    if not _HAS_PSUTIL:
+        return jsonify({'error': 'psutil not installed'})
     try:
-        import psutil
-        cpu = psutil.cpu_percent(interval=0.2)
-        mem = psutil.virtual_memory()
+        cpu, mem = host_usage()
         try:
             disk = psutil.disk_usage(cfg.TERRARIA_DIR)
             disk_used  = round(disk.used  / (1024 ** 3), 2)
@@ -271,14 +553,12 @@ def api_metrics():
             disk_used = disk_total = disk_pct = None
 
         server_cpu = server_ram_mb = None
-        for proc in psutil.process_iter(['pid', 'cmdline', 'cpu_percent', 'memory_info']):
+        proc = _server_process()
+        if proc is not None:
             try:
-                cmdline = ' '.join(proc.info['cmdline'] or [])
-                if 'tModLoader' in cmdline or 'TerrariaServer' in cmdline:
-                    server_cpu    = proc.cpu_percent()
-                    server_ram_mb = round(proc.memory_info().rss / (1024 ** 2), 1)
-                    break
-            except Exception:
+                server_cpu    = proc.cpu_percent()
+                server_ram_mb = round(proc.memory_info().rss / (1024 ** 2), 1)
+            except psutil.Error:
                 pass
 
         return jsonify({
@@ -292,7 +572,5 @@ def api_metrics():
             'server_cpu':    server_cpu,
             'server_ram_mb': server_ram_mb,
         })
-    except ImportError:
-        return jsonify({'error': 'psutil not installed'})
     except Exception as exc:
         return jsonify({'error': str(exc)})
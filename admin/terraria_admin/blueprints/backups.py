@@ -1,16 +1,30 @@
+import logging
 import os
 import shutil
-import tempfile
-import time
+import stat
+import zipfile
 
-from flask import Blueprint, current_app, flash, redirect, render_template, request, send_file, url_for
+from flask import Blueprint, Response, current_app, flash, redirect, render_template, request, url_for
 
 from ..decorators import login_required
-from ..services.backups import create_backup, list_backups, prune_auto_backups
+from ..services.backups import create_backup, fast_copy, list_backups, prune_auto_backups
 from ..services.discord import discord_notify
 from ..services.server import container_action
 
 bp = Blueprint('backups', __name__)
+log = logging.getLogger(__name__)
+
+# realpath(BACKUPS_DIR) keyed by the configured path; the directory itself is
+# not expected to be re-pointed while the app runs.
+_REAL_BASE: dict = {}
+
+
+def _backups_realpath(cfg):
+    base = cfg.BACKUPS_DIR
+    real = _REAL_BASE.get(base)
+    if real is None:
+        real = _REAL_BASE[base] = os.path.realpath(base)
+    return real
 
 
 def _safe_backup_path(backup_name, cfg):
@@ -18,9 +32,15 @@ def _safe_backup_path(backup_name, cfg):
     if not backup_name or os.sep in backup_name or '..' in backup_name:
         return None
     candidate = os.path.join(cfg.BACKUPS_DIR, backup_name)
-    real = os.path.realpath(candidate)
-    real_base = os.path.realpath(cfg.BACKUPS_DIR)
-    if not real.startswith(real_base + os.sep) and real != real_base:
+    # A single path component with no '..' is lexically inside BACKUPS_DIR;
+    # only a symlink could point it elsewhere, so realpath() is needed only then.
+    try:
+        if not stat.S_ISLNK(os.lstat(candidate).st_mode):
+            return candidate
+    except OSError:
+        return candidate
+    real_base = _backups_realpath(cfg)
+    if os.path.commonpath([os.path.realpath(candidate), real_base]) != real_base:
         return None
     return candidate
 
@@ -62,26 +82,42 @@ def backups_restore():
     if not os.path.isdir(backup_path):
         flash('Backup not found', 'error')
         return redirect(url_for('backups.backups'))
+    # Terraria only reads the world at boot and rewrites it on autosave,
+    # so the server has to be down for the swap.  Container.stop() blocks
+    # until the container has exited; no extra settle delay is needed.
+    try:
+        container_action('stop', cfg)
+    except Exception:
+        pass
     try:
-        try:
-            container_action('stop', cfg)
-        except Exception:
-            pass
-        time.sleep(3)
         os.makedirs(cfg.WORLDS_DIR, exist_ok=True)
-        for fname in os.listdir(backup_path):
-            if fname.endswith('.wld'):
-                shutil.copy2(
-                    os.path.join(backup_path, fname),
-                    os.path.join(cfg.WORLDS_DIR, fname)
-                )
+        with os.scandir(backup_path) as it:
+            for entry in it:
+                # is_file(follow_symlinks=False) uses the cached dirent type and
+                # skips symlinks planted in a backup dir.
+                if entry.name.endswith('.wld') and entry.is_file(follow_symlinks=False):
+                    dst = os.path.join(cfg.WORLDS_DIR, entry.name)
+                    # Copy beside the live file and rename over it, so a failed
+                    # copy never leaves a half-written world in place.
+                    tmp = dst + '.new'
+                    try:
+                        fast_copy(entry.path, tmp, follow_symlinks=False)
+                        os.replace(tmp, dst)
+                    finally:
+                        try:
+                            os.remove(tmp)
+                        except FileNotFoundError:
+                            pass
+        flash(f'Restored from "{backup_name}". Server restarting.', 'success')
+    except Exception as exc:
+        flash(f'Restore failed: {exc}', 'error')
+    finally:
+        # Bring the server back even after a failed copy: the live worlds
+        # were left untouched.
         try:
             container_action('start', cfg)
         except Exception:
             pass
-        flash(f'Restored from "{backup_name}". Server restarting.', 'success')
-    except Exception as exc:
-        flash(f'Restore failed: {exc}', 'error')
     return redirect(url_for('backups.backups'))
 
 
@@ -110,26 +146,88 @@ def backups_download(backup_name):
     if not backup_path or not os.path.isdir(backup_path):
         flash('Backup not found', 'error')
         return redirect(url_for('backups.backups'))
+    # Stream the archive as it is built: no temp zip on disk, and the first
+    # bytes go out as soon as the first file is being read.
+    response = Response(_stream_zip(backup_path), mimetype='application/zip')
+    response.headers.set('Content-Disposition', 'attachment', filename=f'{backup_name}.zip')
+    return response
+
+
+class _ZipStream:
+    """Write-only, non-seekable sink for ZipFile; the generator drains it."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+# Leading bytes of formats that are already compressed; deflating them again
+# only burns CPU.  Everything else (.wld included) gets the cheapest deflate.
+_COMPRESSED_MAGIC = (
+    b'PK\x03\x04',        # zip / .tmod-style containers
+    b'\x1f\x8b',           # gzip
+    b'\x28\xb5\x2f\xfd',   # zstd
+    b'\xfd7zXZ',           # xz
+    b'BZh',                # bzip2
+    b'\x89PNG',            # png
+)
+
+
+# Python 3.13 made the per-entry level public as ZipInfo.compress_level and
+# keeps _compresslevel only as a compatibility alias; older versions have
+# just the private slot, which is what ZipFile.write(compresslevel=) sets.
+_ZIPINFO_LEVEL_ATTR = (
+    'compress_level' if hasattr(zipfile.ZipInfo, 'compress_level') else '_compresslevel'
+)
+
+
+def _entry_compression(head):
+    if head.startswith(_COMPRESSED_MAGIC):
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def _stream_zip(root, chunk_size=1 << 20):
+    """Yield a zip of *root* chunk by chunk.
+
+    Entries are deflated at level 1 (most of the size win of the default
+    level 6 at a fraction of the CPU) unless their first bytes show they are
+    already compressed, in which case they are stored as-is.
+    """
+    sink = _ZipStream()
     try:
-        from flask import after_this_request
-        tmp_dir = tempfile.mkdtemp()
-
-        @after_this_request
-        def _cleanup(response, _d=tmp_dir):
-            try:
-                shutil.rmtree(_d, ignore_errors=True)
-            except Exception:
-                pass
-            return response
-
-        zip_base = os.path.join(tmp_dir, backup_name)
-        zip_path = shutil.make_archive(zip_base, 'zip', backup_path)
-        return send_file(
-            zip_path,
-            as_attachment=True,
-            download_name=f'{backup_name}.zip',
-            mimetype='application/zip',
-        )
-    except Exception as exc:
-        flash(f'Download failed: {exc}', 'error')
-        return redirect(url_for('backups.backups'))
+        with zipfile.ZipFile(sink, 'w') as zf:
+            for dirpath, dirnames, filenames in os.walk(root):
+                dirnames.sort()
+                for fname in sorted(filenames):
+                    full = os.path.join(dirpath, fname)
+                    info = zipfile.ZipInfo.from_file(full, os.path.relpath(full, root))
+                    with open(full, 'rb') as src:
+                        chunk = src.read(chunk_size)
+                        info.compress_type = _entry_compression(chunk)
+                        # What ZipFile.write() does with compresslevel=; open()
+                        # with a ZipInfo leaves it at the zlib default otherwise.
+                        setattr(info, _ZIPINFO_LEVEL_ATTR, 1)
+                        with zf.open(info, 'w') as dst:
+                            while chunk:
+                                dst.write(chunk)
+                                yield sink.drain()
+                                chunk = src.read(chunk_size)
+        yield sink.drain()
+    except Exception:
+        # The 200 and its headers are already sent; re-raising makes the WSGI
+        # server drop the connection so the client sees a failed download
+        # rather than a zip that merely ends early.
+        log.exception('Backup download of %s aborted', root)
+        raise
@@ -1,40 +1,65 @@
 import json
 import os
 import subprocess
+import threading
+from collections import deque
 from datetime import datetime
-from pathlib import Path
 
 from flask import Blueprint, current_app, flash, redirect, render_template, request, url_for
 
 from ..decorators import login_required
-from ..services.server import get_server_type
+from ..services.config_parse import parse_kv
+from ..services.server import get_server_type, write_serverconfig
 from ..services.world import get_version_info, update_tmodloader
 from ..services.discord import get_discord_config, save_discord_config, discord_notify
 
 bp = Blueprint('config_bp', __name__)
 
+# Parsed serverconfig.txt / tshock config.json keyed by path, validated
+# against (st_mtime_ns, st_size) so reloading /config costs one stat per file
+# until the file actually changes.
+_CFG_CACHE: dict = {}
+_CFG_CACHE_LOCK = threading.Lock()
+
+
+def _cached_parse(path, parser):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return {}
+    key = (st.st_mtime_ns, st.st_size)
+    with _CFG_CACHE_LOCK:
+        hit = _CFG_CACHE.get(path)
+        if hit and hit[0] == key:
+            return dict(hit[1])
+    parsed = parser(path)
+    with _CFG_CACHE_LOCK:
+        _CFG_CACHE[path] = (key, parsed)
+    return dict(parsed)
+
+
+def _parse_tshock(path):
+    with open(path) as f:
+        try:
+            return json.load(f).get('Settings', {})
+        except Exception:
+            return {}
+
+
+def _load_kv(path):
+    return _cached_parse(path, parse_kv)
+
+
+def _load_tshock(path):
+    return _cached_parse(path, _parse_tshock)
+
 
 @bp.route('/config')
 @login_required
 def config():
     cfg = current_app.terraria_config
-    server_config = {}
-    if Path(cfg.CONFIG_FILE).exists():
-        with open(cfg.CONFIG_FILE) as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#') and '=' in line:
-                    key, value = line.split('=', 1)
-                    server_config[key.strip()] = value.strip()
-
-    tshock_config = {}
-    if Path(cfg.TSHOCK_CONFIG).exists():
-        with open(cfg.TSHOCK_CONFIG) as f:
-            try:
-                data = json.load(f)
-                tshock_config = data.get('Settings', {})
-            except Exception:
-                pass
+    server_config = _load_kv(cfg.CONFIG_FILE)
+    tshock_config = _load_tshock(cfg.TSHOCK_CONFIG)
 
     version_info = get_version_info(cfg)
     server_type = get_server_type(cfg)
@@ -73,8 +98,7 @@ def save_config():
     lines.extend(['secure=1', 'language=en-US', 'upnp=0', 'npcstream=60', 'priority=1'])
 
     try:
-        with open(cfg.CONFIG_FILE, 'w') as f:
-            f.write('\n'.join(lines) + '\n')
+        write_serverconfig(lines, cfg)
         flash('Configuration saved. Restart server to apply changes.', 'success')
     except Exception as e:
         flash(f'Error saving config: {e}', 'error')
@@ -82,6 +106,42 @@ def save_config():
     return redirect(url_for('config_bp.config'))
 
 
+_UPDATE_TIMEOUT = 300
+_UPDATE_TAIL_LINES = 20
+
+
+def _run_update_script(script, cwd, timeout=_UPDATE_TIMEOUT):
+    """Run update.sh and return (returncode, last lines of combined output).
+
+    Output is streamed through a fixed-size ring instead of being captured
+    whole, so a chatty script (steamcmd progress, unzip listings) never
+    holds megabytes in memory; only the tail is kept for the error flash.
+    """
+    proc = subprocess.Popen(
+        ['/bin/bash', script], cwd=cwd,
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=1 << 16,
+    )
+    timed_out = threading.Event()
+
+    def _kill():
+        timed_out.set()
+        proc.kill()
+
+    killer = threading.Timer(timeout, _kill)
+    killer.start()
+    tail = deque(maxlen=_UPDATE_TAIL_LINES)
+    try:
+        for line in proc.stdout:
+            tail.append(line)
+        returncode = proc.wait()
+    finally:
+        killer.cancel()
+        proc.stdout.close()
+    if timed_out.is_set():
+        raise subprocess.TimeoutExpired(proc.args, timeout)
+    return returncode, b''.join(tail).decode('utf-8', errors='replace').strip()
+
+
 @bp.route('/update', methods=['POST'])
 @login_required
 def update_server():
@@ -92,15 +152,11 @@ def update_server():
         return redirect(url_for('config_bp.config'))
 
     try:
-        result = subprocess.run(
-            ['/bin/bash', update_script],
-            capture_output=True, text=True, timeout=300,
-            cwd=cfg.TERRARIA_DIR
-        )
-        if result.returncode == 0:
+        returncode, tail = _run_update_script(update_script, cfg.TERRARIA_DIR)
+        if returncode == 0:
             flash('Update completed successfully!', 'success')
         else:
-            flash(f'Update failed: {result.stderr or result.stdout}', 'error')
+            flash(f'Update failed: {tail}', 'error')
     except subprocess.TimeoutExpired:
         flash('Update timed out', 'error')
     except Exception as e:
@@ -1,7 +1,8 @@
 from flask import Blueprint, current_app, flash, redirect, render_template, url_for
 
 from ..decorators import login_required
-from ..services.server import get_server_status, get_players
+from ..extensions import get_docker, get_io_pool
+from ..services.server import get_server_status, get_server_type, get_players
 from ..services.discord import discord_notify
 
 bp = Blueprint('dashboard', __name__)
@@ -11,8 +12,18 @@ bp = Blueprint('dashboard', __name__)
 @login_required
 def dashboard():
     cfg = current_app.terraria_config
-    status = get_server_status(cfg)
-    players = get_players(cfg) if status.get('online') else []
+    if get_server_type(cfg) == 'tshock':
+        # Both are REST calls to TShock; fetch players alongside the status.
+        # (tModLoader's player list goes through the console, so it is only
+        # asked for once the server is known to be up.)
+        players_future = get_io_pool().submit(get_players, cfg)
+        status = get_server_status(cfg)
+        players = players_future.result()
+        if not status.get('online'):
+            players = []
+    else:
+        status = get_server_status(cfg)
+        players = get_players(cfg) if status.get('online') else []
     return render_template('dashboard.html', status=status, players=players)
 
 
@@ -24,11 +35,8 @@ def server_control(action):
         flash('Invalid action', 'error')
         return redirect(url_for('dashboard.dashboard'))
 
-    client = None
     try:
-        import docker
-        client = docker.from_env()
-        container = client.containers.get(cfg.SERVER_CONTAINER)
+        container = get_docker().containers.get(cfg.SERVER_CONTAINER)
 
         if action == 'start':
             container.start()
@@ -45,11 +53,5 @@ def server_control(action):
 
     except Exception as e:
         flash(f'Error: {e}', 'error')
-    finally:
-        if client:
-            try:
-                client.close()
-            except Exception:
-                pass
 
     return redirect(url_for('dashboard.dashboard'))
@@ -1,5 +1,6 @@
 import os
 import shutil
+import stat
 
 from flask import Blueprint, current_app, flash, redirect, render_template, request, url_for
 from werkzeug.utils import secure_filename
@@ -7,14 +8,26 @@ from werkzeug.utils import secure_filename
 from ..decorators import login_required
 from ..services.server import get_server_type
 from ..services.mods import (
-    list_mods, get_enabled_mods, save_enabled_mods,
+    list_mods, get_enabled_mods, set_mod_enabled,
     get_mod_meta, record_mod_installed, remove_mod_meta,
-    download_mod_from_workshop, ensure_mod_dependencies, parse_tmod_dependencies,
+    download_mod_from_workshop, download_workshop_mods, ensure_mod_dependencies,
+    parse_tmod_dependencies, EMPTY_META, TMOD_MAGIC,
 )
 from ..services.discord import discord_notify
 
 bp = Blueprint('mods', __name__)
 
+# realpath(MODS_DIR) keyed by the configured path, resolved on first use.
+_MODS_REAL: dict = {}
+
+
+def _mods_realpath(cfg):
+    base = cfg.MODS_DIR
+    real = _MODS_REAL.get(base)
+    if real is None:
+        real = _MODS_REAL[base] = os.path.realpath(base)
+    return real
+
 
 @bp.route('/mods')
 @login_required
@@ -34,12 +47,10 @@ def mods_toggle():
         flash('Mod name is required', 'error')
         return redirect(url_for('mods.mods'))
 
-    enabled = get_enabled_mods(cfg)
-    current = enabled.get(mod_name, False)
-    enabled[mod_name] = not current
-    save_enabled_mods(enabled, cfg)
+    on = not get_enabled_mods(cfg).get(mod_name, False)
+    set_mod_enabled(mod_name, on, cfg)
 
-    action = 'enabled' if enabled[mod_name] else 'disabled'
+    action = 'enabled' if on else 'disabled'
     flash(f'Mod "{mod_name}" {action}. Restart the server to apply changes.', 'success')
     return redirect(url_for('mods.mods'))
 
@@ -62,14 +73,33 @@ def mods_upload():
         flash('Only .tmod files are allowed', 'error')
         return redirect(url_for('mods.mods'))
 
+    # Check the header before touching disk, then stream the rest straight
+    # into MODS_DIR in 1 MiB chunks (FileStorage.save() goes through a
+    # smaller default buffer).  The .part + os.replace keeps a failed upload
+    # from clobbering an installed mod of the same name.
+    magic = f.stream.read(len(TMOD_MAGIC))
+    if magic != TMOD_MAGIC:
+        flash('Not a valid .tmod file', 'error')
+        return redirect(url_for('mods.mods'))
+
     os.makedirs(cfg.MODS_DIR, exist_ok=True)
     dest = os.path.join(cfg.MODS_DIR, filename)
-    f.save(dest)
+    tmp = dest + '.part'
+    try:
+        with open(tmp, 'wb', buffering=0) as out:
+            out.write(magic)
+            shutil.copyfileobj(f.stream, out, length=1 << 20)
+        os.replace(tmp, dest)
+    except OSError as e:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        flash(f'Upload failed: {e}', 'error')
+        return redirect(url_for('mods.mods'))
 
     mod_name = filename[:-5]
-    enabled = get_enabled_mods(cfg)
-    enabled[mod_name] = True
-    save_enabled_mods(enabled, cfg)
+    set_mod_enabled(mod_name, True, cfg)
     record_mod_installed(mod_name, dest, cfg)
     flash(f'Mod "{mod_name}" uploaded and enabled.', 'success')
 
@@ -101,16 +131,22 @@ def mods_delete():
 
     filename = secure_filename(mod_name + '.tmod')
     target = os.path.join(cfg.MODS_DIR, filename)
-    real_base = os.path.realpath(cfg.MODS_DIR)
-    if not os.path.realpath(target).startswith(real_base + os.sep):
-        flash('Invalid mod path', 'error')
-        return redirect(url_for('mods.mods'))
-
-    if os.path.exists(target):
+    # lstat the name itself before resolving anything: a symlink in MODS_DIR
+    # is never a mod we installed, whatever it points at.
+    try:
+        st = os.lstat(target)
+    except OSError:
+        st = None
+    if st is not None:
+        real_base = _mods_realpath(cfg)
+        if stat.S_ISLNK(st.st_mode) or \
+                os.path.commonpath([os.path.realpath(target), real_base]) != real_base:
+            flash('Invalid mod path', 'error')
+            return redirect(url_for('mods.mods'))
+
+    if st is not None:
         os.remove(target)
-        enabled = get_enabled_mods(cfg)
-        enabled.pop(mod_name, None)
-        save_enabled_mods(enabled, cfg)
+        set_mod_enabled(mod_name, False, cfg)
         remove_mod_meta(mod_name, cfg)
         flash(f'Mod "{mod_name}" deleted. Restart the server to apply.', 'success')
     else:
@@ -140,9 +176,7 @@ def mods_workshop():
         return redirect(url_for('mods.mods'))
 
     dest = os.path.join(cfg.MODS_DIR, f'{mod_name}.tmod')
-    enabled = get_enabled_mods(cfg)
-    enabled[mod_name] = True
-    save_enabled_mods(enabled, cfg)
+    set_mod_enabled(mod_name, True, cfg)
     record_mod_installed(mod_name, dest, cfg, workshop_id)
     flash(f'Mod "{mod_name}" installed and enabled!', 'success')
     discord_notify(
@@ -167,7 +201,8 @@ def mods_update_one():
         return redirect(url_for('mods.mods'))
 
     meta = get_mod_meta(cfg)
-    workshop_id = meta.get(mod_name, {}).get('workshop_id') or cfg.KNOWN_WORKSHOP_IDS.get(mod_name)
+    entry = meta.get(mod_name) or EMPTY_META
+    workshop_id = entry.get('workshop_id') or cfg.KNOWN_WORKSHOP_IDS.get(mod_name)
     if not workshop_id:
         flash(f'No Workshop ID known for "{mod_name}". Cannot auto-update.', 'error')
         return redirect(url_for('mods.mods'))
@@ -177,15 +212,14 @@ def mods_update_one():
         flash('steamcmd not found', 'error')
         return redirect(url_for('mods.mods'))
 
-    old_version = meta.get(mod_name, {}).get('version', '?')
+    old_version = entry.get('version', '?')
     new_mod_name, err = download_mod_from_workshop(steamcmd, workshop_id, cfg)
     if err:
         flash(err, 'error')
         return redirect(url_for('mods.mods'))
 
     dest = os.path.join(cfg.MODS_DIR, f'{new_mod_name}.tmod')
-    record_mod_installed(new_mod_name, dest, cfg, workshop_id)
-    new_version = get_mod_meta(cfg).get(new_mod_name, {}).get('version', '?')
+    new_version = record_mod_installed(new_mod_name, dest, cfg, workshop_id).get('version', '?')
 
     if old_version != new_version:
         flash(f'"{mod_name}" updated: {old_version} → {new_version}. Restart server to apply.', 'success')
@@ -209,22 +243,25 @@ def mods_update_all():
     skipped = []
     failed = []
 
+    pending = {}  # workshop_id -> (mod_name, old_version)
     for mod in list_mods(cfg):
         mod_name = mod['name']
         workshop_id = mod.get('workshop_id')
         if not workshop_id:
             skipped.append(mod_name)
             continue
+        pending[workshop_id] = (mod_name, (meta.get(mod_name) or EMPTY_META).get('version', '?'))
 
-        old_version = meta.get(mod_name, {}).get('version', '?')
-        new_mod_name, err = download_mod_from_workshop(steamcmd, workshop_id, cfg)
+    # steamcmd runs are slow and independent: download in parallel, but record
+    # each result here so meta writes stay on one thread.
+    for workshop_id, new_mod_name, err in download_workshop_mods(steamcmd, list(pending), cfg):
+        mod_name, old_version = pending[workshop_id]
         if err:
             failed.append(f'{mod_name}: {err}')
             continue
 
         dest = os.path.join(cfg.MODS_DIR, f'{new_mod_name}.tmod')
-        record_mod_installed(new_mod_name, dest, cfg, workshop_id)
-        new_version = get_mod_meta(cfg).get(new_mod_name, {}).get('version', '?')
+        new_version = record_mod_installed(new_mod_name, dest, cfg, workshop_id).get('version', '?')
         if old_version != new_version:
             updated.append(f'{mod_name}: {old_version} → {new_version}')
 
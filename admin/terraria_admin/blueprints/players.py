@@ -1,6 +1,7 @@
 from flask import Blueprint, current_app, flash, redirect, render_template, request, url_for
 
 from ..decorators import login_required
+from ..extensions import get_io_pool
 from ..services.server import get_players, get_server_type
 from ..services.tshock import rest_call
 from ..services.screen import screen_send
@@ -12,11 +13,15 @@ bp = Blueprint('players', __name__)
 @login_required
 def players():
     cfg = current_app.terraria_config
-    player_list = get_players(cfg)
     bans = []
     if get_server_type(cfg) == 'tshock':
-        bans_result = rest_call('/v2/bans/list', cfg)
+        # Two independent REST round-trips to TShock: run them side by side.
+        bans_future = get_io_pool().submit(rest_call, '/v2/bans/list', cfg)
+        player_list = get_players(cfg)
+        bans_result = bans_future.result()
         bans = bans_result.get('bans', []) if bans_result.get('status') == '200' else []
+    else:
+        player_list = get_players(cfg)
     return render_template('players.html', players=player_list, bans=bans)
 
 
@@ -1,18 +1,51 @@
 import os
+import re
 import shutil
-import time
+import threading
+import uuid
+from collections import OrderedDict
 from datetime import datetime
 
-from flask import Blueprint, current_app, flash, redirect, render_template, request, url_for
+from flask import Blueprint, current_app, flash, jsonify, redirect, render_template, request, url_for
 
 from ..decorators import login_required
-from ..services.server import get_server_status, get_server_type, container_action, read_serverconfig
+from ..extensions import get_world_ops
+from ..services.server import (
+    get_server_status, get_server_type, container_action,
+    get_serverconfig, read_serverconfig, write_serverconfig, write_serverconfig_text,
+    wait_until_stopped,
+)
 from ..services.tshock import rest_call
 from ..services.screen import screen_send
 from ..services.world import list_worlds
 
 bp = Blueprint('world', __name__)
 
+# New world names become file names and serverconfig values; allow only a
+# plain character set so separators, dots, NULs and newlines never get that far.
+_WORLDNAME_RE = re.compile(r'[A-Za-z0-9 _\-]{1,64}')
+
+# Existing worlds keep whatever name the game gave them ("Bob's World"); only
+# these characters could escape WORLDS_DIR or the serverconfig line.
+_UNSAFE_WORLDNAME_CHARS = frozenset('\x00\r\n/\\')
+
+# Recent background world jobs, job id -> Future, oldest first.  Trimmed to
+# the last _JOBS_KEEP so the map cannot grow without bound.
+_JOBS_KEEP = 20
+_jobs: OrderedDict = OrderedDict()
+_jobs_lock = threading.Lock()
+
+
+def _submit_job(fn, *args):
+    """Queue fn(*args) on the world-ops worker and return its job id."""
+    job_id = uuid.uuid4().hex
+    future = get_world_ops().submit(fn, *args)
+    with _jobs_lock:
+        _jobs[job_id] = future
+        while len(_jobs) > _JOBS_KEEP:
+            _jobs.popitem(last=False)
+    return job_id
+
 
 @bp.route('/world')
 @login_required
@@ -28,7 +61,27 @@ def world():
         autocreate = read_serverconfig('autocreate', cfg)
         if worldname and autocreate:
             generating = worldname
-    return render_template('world.html', status=status, worlds=worlds, generating=generating)
+    return render_template('world.html', status=status, worlds=worlds, generating=generating,
+                           job_id=request.args.get('job'))
+
+
+@bp.route('/world/job/<job_id>')
+@login_required
+def world_job(job_id):
+    with _jobs_lock:
+        future = _jobs.get(job_id)
+    if future is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    if not future.done():
+        return jsonify({'status': 'running' if future.running() else 'pending'})
+    exc = future.exception()
+    if exc is not None:
+        return jsonify({'status': 'error', 'error': str(exc)})
+    return jsonify({'status': 'done'})
+
+
+# Form value -> tModLoader console command; also the set of accepted values.
+_TML_TIME_COMMANDS = {'day': 'dawn', 'noon': 'noon', 'night': 'dusk', 'midnight': 'midnight'}
 
 
 @bp.route('/world/time', methods=['POST'])
@@ -36,6 +89,10 @@ def world():
 def set_time():
     cfg = current_app.terraria_config
     time_val = request.form.get('time')
+    if time_val not in _TML_TIME_COMMANDS:
+        flash('Invalid time value', 'error')
+        return redirect(url_for('world.world'))
+
     server_type = get_server_type(cfg)
 
     if server_type == 'tshock':
@@ -45,8 +102,7 @@ def set_time():
         else:
             flash(f'Error: {result.get("error", "Unknown")}', 'error')
     else:
-        tml_map = {'day': 'dawn', 'noon': 'noon', 'night': 'dusk', 'midnight': 'midnight'}
-        cmd = tml_map.get(time_val, time_val)
+        cmd = _TML_TIME_COMMANDS[time_val]
         screen_send(cmd, cfg)
         flash(f'Time command "{cmd}" sent', 'success')
 
@@ -134,11 +190,38 @@ def butcher():
     return redirect(url_for('world.world'))
 
 
+# Fresh serverconfig.txt for a world that tModLoader/TShock will autocreate.
+_RECREATE_TMPL = (
+    '# Terraria Server Configuration\n'
+    '# Created: {ts}\n'
+    '\n'
+    'world={td}/worlds/{w}.wld\n'
+    'autocreate={sz}\n'
+    'worldname={w}\n'
+    'difficulty={d}\n'
+    'evil={e}\n'
+    '{seed_line}'
+    'worldpath={td}/worlds\n'
+    'maxplayers=8\n'
+    'port=7777\n'
+    'password=\n'
+    'motd=\n'
+    'secure=1\n'
+    'language=en-US\n'
+    'upnp=0\n'
+    'npcstream=60\n'
+    'priority=1\n'
+)
+
+
 @bp.route('/world/recreate', methods=['POST'])
 @login_required
 def recreate_world():
     cfg = current_app.terraria_config
-    worldname  = os.path.basename(request.form.get('worldname', 'World').strip()).replace('..', '').strip()[:64] or 'World'
+    worldname  = request.form.get('worldname', '').strip() or 'World'
+    if not _WORLDNAME_RE.fullmatch(worldname):
+        flash('Invalid world name', 'error')
+        return redirect(url_for('world.world'))
     size       = request.form.get('size', '2') if request.form.get('size') in ('1', '2', '3') else '2'
     difficulty = request.form.get('difficulty', '0') if request.form.get('difficulty') in ('0', '1', '2', '3') else '0'
     evil       = request.form.get('evil', '0') if request.form.get('evil') in ('0', '1', '2') else '0'
@@ -149,47 +232,35 @@ def recreate_world():
         flash(f'World "{worldname}" already exists. Use Switch and Restart to load it, or choose a different name.', 'error')
         return redirect(url_for('world.world'))
 
+    job_id = _submit_job(_do_recreate, cfg, worldname, size, difficulty, evil, seed)
+    flash(f'World "{worldname}" is being generated. Server restarting…', 'success')
+    return redirect(url_for('world.world', job=job_id))
+
+
+def _do_recreate(cfg, worldname, size, difficulty, evil, seed):
+    """Stop the server, write a fresh autocreate config and start it again."""
     try:
-        try:
-            container_action('stop', cfg)
-        except Exception:
-            pass
-        time.sleep(3)
-
-        os.makedirs(cfg.WORLDS_DIR, exist_ok=True)
-        config_lines = [
-            '# Terraria Server Configuration',
-            f'# Created: {datetime.now().isoformat()}',
-            '',
-            f'world={cfg.TERRARIA_DIR}/worlds/{worldname}.wld',
-            f'autocreate={size}',
-            f'worldname={worldname}',
-            f'difficulty={difficulty}',
-            f'evil={evil}',
-            *([f'seed={seed}'] if seed else []),
-            f'worldpath={cfg.TERRARIA_DIR}/worlds',
-            'maxplayers=8',
-            'port=7777',
-            'password=',
-            'motd=',
-            'secure=1',
-            'language=en-US',
-            'upnp=0',
-            'npcstream=60',
-            'priority=1',
-        ]
-        with open(cfg.CONFIG_FILE, 'w') as f:
-            f.write('\n'.join(config_lines) + '\n')
-
-        try:
-            container_action('start', cfg)
-        except Exception:
-            pass
-        flash(f'World "{worldname}" is being generated. Server restarting…', 'success')
-    except Exception as e:
-        flash(f'Error: {e}', 'error')
+        container_action('stop', cfg)
+    except Exception:
+        pass
+    wait_until_stopped(cfg)
+
+    os.makedirs(cfg.WORLDS_DIR, exist_ok=True)
+    config_text = _RECREATE_TMPL.format_map({
+        'ts': datetime.now().isoformat(),
+        'td': cfg.TERRARIA_DIR,
+        'w': worldname,
+        'sz': size,
+        'd': difficulty,
+        'e': evil,
+        'seed_line': f'seed={seed}\n' if seed else '',
+    })
+    write_serverconfig_text(config_text, cfg)
 
-    return redirect(url_for('world.world'))
+    try:
+        container_action('start', cfg)
+    except Exception:
+        pass
 
 
 @bp.route('/world/switch', methods=['POST'])
@@ -197,23 +268,23 @@ def recreate_world():
 def world_switch():
     cfg = current_app.terraria_config
     world_name = request.form.get('world_name', '').strip()
-    if not world_name or os.sep in world_name or '..' in world_name:
+    if not world_name or not _UNSAFE_WORLDNAME_CHARS.isdisjoint(world_name):
         flash('Invalid world name', 'error')
         return redirect(url_for('world.world'))
 
-    world_file = os.path.join(cfg.WORLDS_DIR, world_name + '.wld')
-    if not os.path.exists(world_file):
+    if world_name not in {w['name'] for w in list_worlds(cfg)}:
         flash(f'World file not found: {world_name}.wld', 'error')
         return redirect(url_for('world.world'))
+    world_file = os.path.join(cfg.WORLDS_DIR, world_name + '.wld')
+
+    job_id = _submit_job(_do_switch, cfg, world_file, world_name)
+    flash(f'Switching to world "{world_name}". Server restarting…', 'success')
+    return redirect(url_for('world.world', job=job_id))
 
-    config = {}
-    if os.path.exists(cfg.CONFIG_FILE):
-        with open(cfg.CONFIG_FILE) as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#') and '=' in line:
-                    k, v = line.split('=', 1)
-                    config[k.strip()] = v.strip()
+
+def _do_switch(cfg, world_file, world_name):
+    """Point serverconfig.txt at another world and restart the server."""
+    config = get_serverconfig(cfg)
 
     config['world'] = world_file
     config['worldname'] = world_name
@@ -223,15 +294,8 @@ def world_switch():
     for k, v in config.items():
         lines.append(f'{k}={v}')
 
+    write_serverconfig(lines, cfg)
     try:
-        with open(cfg.CONFIG_FILE, 'w') as f:
-            f.write('\n'.join(lines) + '\n')
-        try:
-            container_action('restart', cfg)
-        except Exception:
-            pass
-        flash(f'Switched to world "{world_name}". Server restarting…', 'success')
-    except Exception as exc:
-        flash(f'Error: {exc}', 'error')
-
-    return redirect(url_for('world.world'))
+        container_action('restart', cfg)
+    except Exception:
+        pass
@@ -1,8 +1,57 @@
 import os
+from functools import cached_property
+from types import MappingProxyType
 
 from dotenv import load_dotenv
 
-load_dotenv()
+
+def _load_dotenv_once():
+    """Read .env into os.environ unless this environment already has it.
+
+    The marker is inherited by child interpreters (update scripts, CLI tools
+    importing the package), so .env is parsed once per process tree.
+    """
+    if os.environ.get('_DOTENV_LOADED'):
+        return
+    load_dotenv()
+    os.environ['_DOTENV_LOADED'] = '1'
+
+
+# Runs at import, not in create_app(): the Config class body below reads
+# os.environ when the module is first imported.
+_load_dotenv_once()
+
+
+# Mod name -> Steam Workshop ID for mods that do not record their own ID.
+# Read-only and module-level: one copy shared by every request, background
+# job and Config subclass.
+KNOWN_WORKSHOP_IDS = MappingProxyType({
+    'CalamityMod':          '2824688072',
+    'CalamityModMusic':     '2824688266',
+    'ThoriumMod':           '2756794847',
+    'BossChecklist':        '2756794864',
+    'RecipeBrowser':        '2756794983',
+    'MagicStorage':         '2563309347',
+    'Census':               '2687356363',
+    'AlchemistNPCLite':     '2382561813',
+    'ImprovedTorches':      '2790887285',
+    'HEROsMod':             '2564599814',
+    'WingSlot':             '2563309386',
+    'CheatSheet':           '2563309402',
+    'AutoTrash':            '2563372007',
+    'Fargo_Mutant_Mod':     '2563309826',
+    'FargowiltasSouls':     '2564815791',
+    'StarlightRiver':       '2609329524',
+    'Infernum':             '3142790752',
+    'Terraria_Overhaul':    '1417245098',
+    'FancyLighting':        '2907538845',
+    'SpiritMod':            '2563309339',
+    'Redemption':           '2610690817',
+    'GRealm':               '2563309387',
+    'AssortedCrazyThings':  '2563309359',
+    'Wikithis':             '2563309480',
+    'AmuletOfManyMinions':  '2398614480',
+})
 
 
 class Config:
@@ -12,7 +61,9 @@ class Config:
     # Set to True when serving over HTTPS (prevents cookie leakage over HTTP)
     SESSION_COOKIE_SECURE  = os.environ.get('SESSION_COOKIE_SECURE', '').lower() in ('1', 'true', 'yes')
     PERMANENT_SESSION_LIFETIME = 3600
+    # Sized for .tmod uploads; every other endpoint is capped at MAX_FORM_LENGTH.
     MAX_CONTENT_LENGTH = 256 * 1024 * 1024  # 256 MB
+    MAX_FORM_LENGTH    = 64 * 1024
 
     TERRARIA_DIR   = os.environ.get('TERRARIA_DIR', '/opt/terraria')
     REST_URL       = os.environ.get('REST_URL', 'http://127.0.0.1:7878')
@@ -22,6 +73,8 @@ class Config:
     SCREEN_SESSION   = os.environ.get('SCREEN_SESSION', 'terraria')
     SERVER_CONTAINER = os.environ.get('SERVER_CONTAINER', 'terraria-server')
     LOG_FILE         = os.environ.get('LOG_FILE', None)
+    # journalctl fallback only scans entries newer than this (--since syntax)
+    LOG_LOOKBACK     = os.environ.get('LOG_LOOKBACK', '-1h')
     MODS_DIR       = os.environ.get(
         'MODS_DIR',
         '/opt/terraria/.local/share/Terraria/tModLoader/Mods'
@@ -33,23 +86,30 @@ class Config:
     BACKUP_KEEP_COUNT          = int(os.environ.get('BACKUP_KEEP_COUNT', '24'))
     AUTO_BACKUP_INTERVAL_HOURS = int(os.environ.get('AUTO_BACKUP_INTERVAL_HOURS', '1'))
 
-    @property
+    # Compiled Jinja templates are cached across restarts. Unset uses Jinja's
+    # per-user temp directory (owner and mode checked by Jinja); a path must be
+    # a private 0700 directory owned by this user; '' disables.
+    JINJA_CACHE_DIR = os.environ.get('JINJA_CACHE_DIR')
+
+    # Derived paths are joined once per Config instance; TERRARIA_DIR does not
+    # change after startup.
+    @cached_property
     def CONFIG_FILE(self):
         return os.path.join(self.TERRARIA_DIR, 'serverconfig.txt')
 
-    @property
+    @cached_property
     def TSHOCK_CONFIG(self):
         return os.path.join(self.TERRARIA_DIR, 'tshock', 'config.json')
 
-    @property
+    @cached_property
     def WORLDS_DIR(self):
         return os.path.join(self.TERRARIA_DIR, 'worlds')
 
-    @property
+    @cached_property
     def BACKUPS_DIR(self):
         return os.path.join(self.TERRARIA_DIR, 'backups')
 
-    @property
+    @cached_property
     def ADMINS_FILE(self):
         return os.path.join(self.TERRARIA_DIR, '.admins.json')
 
@@ -64,30 +124,6 @@ class Config:
     ROLE_LEVELS  = {'viewer': 0, 'admin': 1, 'superadmin': 2}
     MAX_CONSOLE_LINES = 500
 
-    KNOWN_WORKSHOP_IDS = {
-        'CalamityMod':          '2824688072',
-        'CalamityModMusic':     '2824688266',
-        'ThoriumMod':           '2756794847',
-        'BossChecklist':        '2756794864',
-        'RecipeBrowser':        '2756794983',
-        'MagicStorage':         '2563309347',
-        'Census':               '2687356363',
-        'AlchemistNPCLite':     '2382561813',
-        'ImprovedTorches':      '2790887285',
-        'HEROsMod':             '2564599814',
-        'WingSlot':             '2563309386',
-        'CheatSheet':           '2563309402',
-        'AutoTrash':            '2563372007',
-        'Fargo_Mutant_Mod':     '2563309826',
-        'FargowiltasSouls':     '2564815791',
-        'StarlightRiver':       '2609329524',
-        'Infernum':             '3142790752',
-        'Terraria_Overhaul':    '1417245098',
-        'FancyLighting':        '2907538845',
-        'SpiritMod':            '2563309339',
-        'Redemption':           '2610690817',
-        'GRealm':               '2563309387',
-        'AssortedCrazyThings':  '2563309359',
-        'Wikithis':             '2563309480',
-        'AmuletOfManyMinions':  '2398614480',
-    }
+    # Same object as the module constant; services read it through cfg so a
+    # test config can substitute its own map.
+    KNOWN_WORKSHOP_IDS = KNOWN_WORKSHOP_IDS
@@ -1,6 +1,8 @@
+import atexit
 import re
 import threading
 from collections import deque
+from itertools import islice
 
 # Live console buffer — filled by the background log pollers.
 # Shared between background thread (writer) and Flask routes (readers).
@@ -15,3 +17,147 @@ console_lock = threading.Lock()
 # even after old lines have been removed.
 console_seq: int = 0
 ANSI_ESCAPE = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+
+
+def strip_ansi(text):
+    """Remove ANSI escape sequences; text without an ESC byte is returned as-is.
+
+    Most server output carries no colour codes, so a single substring check
+    skips the regex engine entirely on the common path.
+    """
+    if '\x1b' not in text:
+        return text
+    return ANSI_ESCAPE.sub('', text)
+
+
+def console_tail(n):
+    """Return the newest *n* buffered lines, oldest first.
+
+    Walks back from the right end of the deque instead of copying all of it
+    to slice off a few lines.
+    """
+    if n <= 0:
+        return []
+    with console_lock:
+        tail = list(islice(reversed(console_buffer), n))
+    tail.reverse()
+    return tail
+
+
+def console_since(since):
+    """Return (lines appended after sequence number *since*, current seq).
+
+    Lines already evicted from the buffer are skipped.
+    """
+    with console_lock:
+        seq = console_seq
+        # The buffer holds the last len(console_buffer) lines, so their
+        # sequence numbers run from (seq - len) to (seq - 1).
+        since = max(seq - len(console_buffer), min(since, seq))
+        n = seq - since
+        lines = list(islice(reversed(console_buffer), n)) if n else []
+    lines.reverse()
+    return lines, seq
+
+
+def console_extend(lines):
+    """Append a batch of lines to console_buffer under one lock acquisition."""
+    global console_seq
+    if not lines:
+        return
+    with console_lock:
+        console_buffer.extend(lines)
+        console_seq += len(lines)
+
+# Shared Docker SDK client. docker.from_env() opens a fresh socket connection
+# and negotiates the API version, so one client is created on first use and
+# reused by every request and background job. max_pool_size lets concurrent
+# requests share the daemon socket without waiting on each other.
+_docker_client = None
+_docker_lock = threading.Lock()
+
+
+def get_docker():
+    """Return the process-wide Docker client, creating it on first use."""
+    global _docker_client
+    with _docker_lock:
+        if _docker_client is None:
+            import docker
+            _docker_client = docker.from_env(max_pool_size=16)
+        return _docker_client
+
+
+def reset_docker():
+    """Drop the shared client (e.g. after the daemon restarted) so the next
+    get_docker() reconnects."""
+    global _docker_client
+    with _docker_lock:
+        client, _docker_client = _docker_client, None
+    if client is not None:
+        try:
+            client.close()
+        except Exception:
+            pass
+
+
+# Close the daemon socket pool on interpreter shutdown (worker exit/reload).
+atexit.register(reset_docker)
+
+
+# Shared requests.Session for outbound HTTPS (GitHub release checks, Discord
+# webhooks).  Keep-alive lets repeat calls to the same host skip the TCP and
+# TLS handshakes; requests is imported on first use like docker above.
+_http_session = None
+_http_lock = threading.Lock()
+
+
+def get_http():
+    """Return the process-wide requests.Session, creating it on first use."""
+    global _http_session
+    with _http_lock:
+        if _http_session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            # GitHub's API rejects anonymous clients without a User-Agent and
+            # Discord asks webhook callers to identify themselves.
+            session.headers['User-Agent'] = 'terraria-admin'
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _http_session = session
+        return _http_session
+
+
+# Small shared pool for overlapping independent blocking calls inside one
+# request (e.g. TShock player list + ban list).  Shared so a page view does
+# not spawn and join fresh threads every time.
+_io_pool = None
+_io_pool_lock = threading.Lock()
+
+
+def get_io_pool():
+    """Return the process-wide ThreadPoolExecutor, creating it on first use."""
+    global _io_pool
+    with _io_pool_lock:
+        if _io_pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _io_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='io')
+        return _io_pool
+
+
+# Single worker for stop → rewrite config → start sequences (world recreate /
+# switch).  Runs them off the request thread and, with one worker, never lets
+# two of them interleave on the same serverconfig.txt.
+_world_ops = None
+_world_ops_lock = threading.Lock()
+
+
+def get_world_ops():
+    """Return the process-wide world-operation executor, creating it on first use."""
+    global _world_ops
+    with _world_ops_lock:
+        if _world_ops is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _world_ops = ThreadPoolExecutor(max_workers=1, thread_name_prefix='world-ops')
+        return _world_ops
@@ -0,0 +1,42 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional — fall back to Flask's stdlib provider
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider that serializes with orjson (C/Rust) instead of stdlib json.
+
+    Every jsonify() call goes through response(), so the polling endpoints
+    (status, players, logs, diag, metrics, console lines) pick this up
+    without changes.
+    """
+
+    # Key order is insertion order; sorting every payload is wasted work.
+    sort_keys = False
+
+    def _option(self, sort_keys=False, indent=False):
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        option = self._option(kwargs.get('sort_keys', self.sort_keys), kwargs.get('indent'))
+        return orjson.dumps(obj, default=kwargs.get('default', self.default), option=option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # orjson already produces UTF-8 bytes: hand them to the response as-is
+        # instead of decoding to str in dumps() and re-encoding in Werkzeug.
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        body = orjson.dumps(obj, default=self.default,
+                            option=self._option(self.sort_keys, indent))
+        return self._app.response_class(body, mimetype=self.mimetype)
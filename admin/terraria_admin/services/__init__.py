@@ -0,0 +1,14 @@
+import importlib
+
+_SUBMODULES = frozenset({
+    'backups', 'config_parse', 'console', 'discord', 'metrics', 'mods',
+    'schedulers', 'screen', 'server', 'tshock', 'world',
+})
+
+
+def __getattr__(name):
+    # PEP 562: ``services.mods`` etc. resolve on first access instead of
+    # being imported eagerly with the package.
+    if name in _SUBMODULES:
+        return importlib.import_module(f'.{name}', __name__)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
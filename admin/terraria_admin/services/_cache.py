@@ -0,0 +1,99 @@
+"""
+Stat-validated cache for the small config files read on nearly every request
+(.server_type, enabled.json, .mod_meta.json, .discord.json).
+
+Two layers:
+- process-wide: path -> ((st_mtime_ns, st_size), parsed value); an unchanged
+  file costs one stat() instead of open + read + parse.
+- request-scoped: ``g._stat_cache`` (set up by the app's before_request hook);
+  repeat calls inside one request skip even the stat().
+
+Writers must call invalidate(path) after changing a file so the current
+request does not keep serving the value it already looked up, or store(path,
+value) to write the new value through and skip the next re-parse.
+"""
+import functools
+import os
+import threading
+
+from flask import g, has_request_context
+
+_entries: dict = {}
+_lock = threading.Lock()
+
+
+def _request_cache():
+    if has_request_context():
+        return g.get('_stat_cache')
+    return None
+
+
+def _copy(value):
+    # Callers routinely mutate the returned dict before saving it back.
+    return dict(value) if isinstance(value, dict) else value
+
+
+def mtime_cached(path_for):
+    """Cache ``parser(cfg)`` keyed on the mtime/size of ``path_for(cfg)``.
+
+    A missing file is not cached — the parser runs and supplies its default.
+    ``wrapper.peek(cfg)`` returns the cached value itself, without the copy,
+    for callers that only read from it.
+    """
+    def decorator(parser):
+        def peek(cfg):
+            path = path_for(cfg)
+            local = _request_cache()
+            if local is not None and path in local:
+                return local[path]
+            try:
+                st = os.stat(path)
+            except OSError:
+                return parser(cfg)
+            key = (st.st_mtime_ns, st.st_size)
+            with _lock:
+                cached = _entries.get(path)
+            if cached and cached[0] == key:
+                value = cached[1]
+            else:
+                value = parser(cfg)
+                with _lock:
+                    _entries[path] = (key, value)
+            if local is not None:
+                local[path] = value
+            return value
+
+        @functools.wraps(parser)
+        def wrapper(cfg):
+            return _copy(peek(cfg))
+        wrapper.path_for = path_for
+        wrapper.peek = peek
+        return wrapper
+    return decorator
+
+
+def store(path, value):
+    """Cache *value* as the parsed content of *path*, which was just written."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        invalidate(path)
+        return
+    with _lock:
+        _entries[path] = ((st.st_mtime_ns, st.st_size), value)
+    local = _request_cache()
+    if local is not None:
+        local[path] = value
+
+
+def invalidate(path):
+    with _lock:
+        _entries.pop(path, None)
+    local = _request_cache()
+    if local is not None:
+        local.pop(path, None)
+
+
+def clear():
+    with _lock:
+        _entries.clear()
@@ -1,13 +1,65 @@
+import errno
 import os
 import shutil
 from datetime import datetime
 
+# World files run to hundreds of MB: the userspace fallback copies in 1 MiB
+# chunks rather than shutil's 64 KiB default.
+_COPY_BUFSIZE = 1 << 20
+
+# copy_file_range() errors that just mean "not supported here" (cross-device,
+# old kernel, filesystem without support): fall back to a read/write loop.
+_COPY_FALLBACK_ERRNOS = frozenset({errno.EXDEV, errno.ENOSYS, errno.EOPNOTSUPP, errno.EINVAL})
+
+
+def fast_copy(src, dst, follow_symlinks=True):
+    """Copy src to dst in-kernel with copy_file_range(), which can reflink on
+    btrfs/xfs and copies server-side on NFS; otherwise copy through userspace.
+
+    With follow_symlinks=False (restoring from an untrusted backup dir) a
+    symlinked src raises OSError(ELOOP) whichever copy path is taken.
+    """
+    flags = os.O_RDONLY
+    if not follow_symlinks:
+        if os.path.islink(src):
+            raise OSError(errno.ELOOP, 'Refusing to copy a symlink', src)
+        flags |= os.O_NOFOLLOW
+    if not hasattr(os, 'copy_file_range'):
+        _copy_fileobj(src, dst, flags)
+        return
+    in_fd = os.open(src, flags)
+    try:
+        out_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            remaining = os.fstat(in_fd).st_size
+            while remaining > 0:
+                n = os.copy_file_range(in_fd, out_fd, remaining)
+                if n == 0:
+                    break
+                remaining -= n
+            return
+        except OSError as exc:
+            if exc.errno not in _COPY_FALLBACK_ERRNOS:
+                raise
+        finally:
+            os.close(out_fd)
+    finally:
+        os.close(in_fd)
+    _copy_fileobj(src, dst, flags)
+
+
+def _copy_fileobj(src, dst, flags):
+    with open(src, 'rb', opener=lambda path, _: os.open(path, flags)) as fsrc, \
+            open(dst, 'wb') as fdst:
+        shutil.copyfileobj(fsrc, fdst, length=_COPY_BUFSIZE)
+
 
 def create_backup(cfg, label='manual'):
     """Copy all .wld files to backups/<label>_<timestamp>/. Returns (name, error)."""
     if not os.path.isdir(cfg.WORLDS_DIR):
         return None, 'Worlds directory not found'
-    wld_files = [f for f in os.listdir(cfg.WORLDS_DIR) if f.endswith('.wld')]
+    with os.scandir(cfg.WORLDS_DIR) as it:
+        wld_files = [e.name for e in it if e.name.endswith('.wld')]
     if not wld_files:
         return None, 'No .wld files found in worlds directory'
     ts = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -15,10 +67,13 @@ def create_backup(cfg, label='manual'):
     backup_path = os.path.join(cfg.BACKUPS_DIR, backup_name)
     os.makedirs(backup_path, exist_ok=True)
     for fname in wld_files:
-        shutil.copy2(
-            os.path.join(cfg.WORLDS_DIR, fname),
-            os.path.join(backup_path, fname)
-        )
+        src = os.path.join(cfg.WORLDS_DIR, fname)
+        dst = os.path.join(backup_path, fname)
+        # Data goes through fast_copy; copy2's extra metadata pass is reduced
+        # to carrying over the timestamps from one stat().
+        st = os.stat(src)
+        fast_copy(src, dst)
+        os.utime(dst, ns=(st.st_atime_ns, st.st_mtime_ns))
     return backup_name, None
 
 
@@ -27,23 +82,26 @@ def list_backups(cfg):
     if not os.path.isdir(cfg.BACKUPS_DIR):
         return []
     backups = []
-    for name in os.listdir(cfg.BACKUPS_DIR):
-        path = os.path.join(cfg.BACKUPS_DIR, name)
-        if not os.path.isdir(path):
-            continue
-        files = [f for f in os.listdir(path) if f.endswith('.wld')]
-        if not files:
-            continue
-        total_size = sum(os.path.getsize(os.path.join(path, f)) for f in files)
-        mtime = os.path.getmtime(path)
-        backups.append({
-            'name': name,
-            'label': 'auto' if name.startswith('auto_') else 'manual',
-            'files': files,
-            'size_mb': round(total_size / (1024 * 1024), 1),
-            'timestamp': datetime.fromtimestamp(mtime).strftime('%Y-%m-%d %H:%M:%S'),
-            'mtime': mtime,
-        })
+    # scandir hands back dirent type and a cached stat per entry, so each
+    # backup costs one stat for the directory and one per world file.
+    with os.scandir(cfg.BACKUPS_DIR) as it:
+        for entry in it:
+            if not entry.is_dir():
+                continue
+            with os.scandir(entry.path) as sub:
+                wld = [f for f in sub if f.name.endswith('.wld')]
+            if not wld:
+                continue
+            total_size = sum(f.stat().st_size for f in wld)
+            mtime = entry.stat().st_mtime
+            backups.append({
+                'name': entry.name,
+                'label': 'auto' if entry.name.startswith('auto_') else 'manual',
+                'files': [f.name for f in wld],
+                'size_mb': round(total_size / (1024 * 1024), 1),
+                'timestamp': datetime.fromtimestamp(mtime).strftime('%Y-%m-%d %H:%M:%S'),
+                'mtime': mtime,
+            })
     return sorted(backups, key=lambda b: b['mtime'], reverse=True)
 
 
@@ -0,0 +1,15 @@
+import re
+
+# One "key = value" line: leading blanks skipped, '#' comments and lines
+# without '=' never match, key and value come back stripped.
+_KV_RE = re.compile(r'^[ \t]*([^#=\s][^=\n]*?)[ \t]*=[ \t]*(.*?)[ \t\r]*$', re.M)
+
+
+def parse_kv(path):
+    """Parse a ``key=value`` file such as serverconfig.txt into a dict.
+
+    Blank lines, ``#`` comments and lines without ``=`` are skipped; the
+    file is read in one call and matched with a single precompiled regex.
+    """
+    with open(path) as f:
+        return dict(_KV_RE.findall(f.read()))
@@ -1,34 +1,118 @@
+import codecs
 import logging
 import os
+import re
+import threading
 import time
+from collections import OrderedDict
 
-from .. import extensions
-from ..extensions import console_buffer, console_lock, ANSI_ESCAPE
+from ..extensions import console_extend, get_docker, reset_docker, strip_ansi
 
 log = logging.getLogger(__name__)
 
 
-def _extract_player_name(line, keyword):
-    """Extract player name from a log line like 'PlayerName has joined ...'."""
+# One case-insensitive pass finds the event, its verb and the player name
+# (the word right before "has"); the name is optional so a bare "has joined"
+# still reports "Someone".
+_PLAYER_RE = re.compile(r'(?:(\S+)\s+)?has\s+(joined|left|disconnected)\b', re.IGNORECASE)
+
+# Both pollers can see the same log line.  For each (event, name) every
+# poller counts its own sightings; the nth sighting is only notified by the
+# first poller to reach n, so the other poller's copy is dropped while a real
+# rejoin (a new sighting on every poller) still fires.  Keys idle for longer
+# than _EVENT_DEDUP_SECONDS (the most one poller may lag the other) are
+# forgotten, oldest first.
+_EVENT_DEDUP_SECONDS = 10
+_recent_events: OrderedDict = OrderedDict()  # key -> (last seen, {source: count})
+_recent_events_lock = threading.Lock()
+
+
+# Upper bound on one inotify wait, so rotation / missing-file checks still run
+# on a quiet server.
+_WATCH_TIMEOUT_MS = 2000
+
+# IN_DELETE_SELF | IN_IGNORED (kernel ABI values): the watched directory is
+# gone and the watch is dead, so it has to be re-armed on the new directory.
+_WATCH_GONE = 0x400 | 0x8000
+
+
+def _dir_watcher(log_dir):
+    """Return an inotify watch on *log_dir*, or None if inotify is unavailable.
+
+    inotify_simple is optional (Linux only); without it the file poller falls
+    back to polling every 0.5 s.
+    """
     try:
-        parts = line.split(keyword)[0].strip().split()
-        return parts[-1] if parts else 'Someone'
-    except Exception:
-        return 'Someone'
+        from inotify_simple import INotify, flags
+    except ImportError:
+        return None
+    try:
+        watcher = INotify()
+        watcher.add_watch(log_dir, flags.MODIFY | flags.CREATE | flags.MOVED_TO | flags.DELETE_SELF)
+    except OSError:
+        return None
+    return watcher
+
 
+def _is_mirrored_event(key, source):
+    """Record a sighting of *key* by *source*; True if another poller already
+    reported this occurrence."""
+    now = time.monotonic()
+    with _recent_events_lock:
+        while _recent_events and now - next(iter(_recent_events.values()))[0] > _EVENT_DEDUP_SECONDS:
+            _recent_events.popitem(last=False)
+        entry = _recent_events.pop(key, None)
+        counts = entry[1] if entry else {}
+        n = counts.get(source, 0) + 1
+        counts[source] = n
+        _recent_events[key] = (now, counts)
+        return any(c >= n for s, c in counts.items() if s != source)
 
-def check_player_event(line, cfg, discord_notify_fn):
-    """Detect player join/leave in a log line and fire Discord notification."""
-    lower = line.lower()
-    if 'has joined' in lower:
-        name = _extract_player_name(line, 'has joined')
+
+def check_player_event(line, cfg, discord_notify_fn, source=None):
+    """Detect player join/leave in a log line and fire Discord notification.
+
+    *source* names the poller that read the line; the copy of an event the
+    other poller has already reported is skipped.
+    """
+    m = _PLAYER_RE.search(line)
+    if m is None:
+        return
+    name = m.group(1) or 'Someone'
+    joined = m.group(2).lower() == 'joined'
+    if _is_mirrored_event((joined, name.lower()), source):
+        return
+    if joined:
         discord_notify_fn(f'**{name}** joined the server', cfg, color=0x3fb950, event='join')
-    elif 'has left' in lower or 'has disconnected' in lower:
-        key = 'has left' if 'has left' in lower else 'has disconnected'
-        name = _extract_player_name(line, key)
+    else:
         discord_notify_fn(f'**{name}** left the server', cfg, color=0xd29922, event='leave')
 
 
+def _log_chunks(client, container):
+    """Yield the container's raw output: the last 200 log lines, then live output.
+
+    docker-py streams the logs of a TTY container through
+    iter_content(chunk_size=1) — one Python iteration per byte.  For those,
+    attach to the live output first (so nothing falls in the gap), replay the
+    tail with one non-streaming call, then read the attach socket in 4 KiB
+    pieces.  Non-TTY containers already arrive as whole multiplexed frames.
+    """
+    if container.attrs.get('Config', {}).get('Tty') is not True:
+        yield from container.logs(
+            stream=True, follow=True, tail=200,
+            stdout=True, stderr=True,
+        )
+        return
+    from docker.utils.socket import frames_iter
+    sock = client.api.attach_socket(container.id, params={'stdout': 1, 'stderr': 1, 'stream': 1})
+    try:
+        yield container.logs(tail=200, stdout=True, stderr=True)
+        for _stream, data in frames_iter(sock, tty=True):
+            yield data
+    finally:
+        sock.close()
+
+
 def start_console_poller(app):
     """Start two daemon threads that fill console_buffer from all available sources.
 
@@ -38,20 +122,22 @@ def start_console_poller(app):
        ~/.local/share/Terraria/tModLoader/Logs/server.log even in headless mode,
        so Docker logs may be empty while the file has full output.  Both pollers
        run concurrently; duplicates are harmless (they appear twice at most and
-       the buffer is capped at MAX_CONSOLE_LINES).
+       the buffer is capped at MAX_CONSOLE_LINES), and check_player_event
+       drops the second poller's copy of a join/leave notification.
     """
-    import threading
     from ..services.discord import discord_notify
+    from .server import _is_connection_error
 
     cfg = app.terraria_config
 
     # ── 1. Docker-log poller ──────────────────────────────────────────────────
     def _docker_run():
         while True:
-            client = None
             try:
-                import docker
-                client = docker.from_env()
+                # The shared client survives "container not there yet" and
+                # the stream ending on a server restart; only a connection
+                # failure drops it for a fresh dial on the next attempt.
+                client = get_docker()
                 container = client.containers.get(cfg.SERVER_CONTAINER)
                 # With tty:true the Docker streaming API emits raw PTY bytes,
                 # which may arrive one character at a time and use \r (carriage
@@ -59,38 +145,35 @@ def start_console_poller(app):
                 # and apply \r semantics so each complete \n-terminated line is
                 # stored as a single entry in console_buffer.
                 pending = ''
-                for chunk in container.logs(
-                    stream=True, follow=True, tail=200,
-                    stdout=True, stderr=True,
-                ):
-                    pending += ANSI_ESCAPE.sub(
-                        '', chunk.decode('utf-8', errors='replace')
-                    )
-                    # Flush every complete \n-terminated line.
-                    while '\n' in pending:
-                        raw_line, pending = pending.split('\n', 1)
+                # Chunk boundaries can split a multi-byte UTF-8 character.
+                decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+                for chunk in _log_chunks(client, container):
+                    pending += strip_ansi(decoder.decode(chunk))
+                    # Flush every complete \n-terminated line with one split
+                    # (re-splitting the remainder per line is quadratic in a
+                    # burst); the last piece is the unfinished line.  The
+                    # chunk's lines go into the buffer under one lock.
+                    *complete, pending = pending.split('\n')
+                    batch = []
+                    for raw_line in complete:
                         # \r moves cursor to line start; keep only the text
                         # after the last \r (what a real terminal would show).
-                        if '\r' in raw_line:
-                            raw_line = raw_line.rsplit('\r', 1)[-1]
-                        line = raw_line.strip()
-                        if not line:
-                            continue
-                        with console_lock:
-                            console_buffer.append(line)
-                            extensions.console_seq += 1
-                        check_player_event(line, cfg, discord_notify)
+                        r = raw_line.rfind('\r')
+                        line = (raw_line[r + 1:] if r != -1 else raw_line).strip()
+                        if line:
+                            batch.append(line)
+                    if batch:
+                        console_extend(batch)
+                        for line in batch:
+                            check_player_event(line, cfg, discord_notify, 'docker')
                     # Discard overwritten partial-line data (\r without \n).
-                    if '\r' in pending:
-                        pending = pending.rsplit('\r', 1)[-1]
+                    r = pending.rfind('\r')
+                    if r != -1:
+                        pending = pending[r + 1:]
             except Exception as exc:
                 log.warning('Docker log poller error (retry in 5s): %s', exc)
-            finally:
-                if client:
-                    try:
-                        client.close()
-                    except Exception:
-                        pass
+                if _is_connection_error(exc):
+                    reset_docker()
             time.sleep(5)
 
     # ── 2. File poller ────────────────────────────────────────────────────────
@@ -126,6 +209,9 @@ def start_console_poller(app):
             return  # LOG_FILE not configured — nothing to tail
         last_pos = 0
         last_inode = None
+        log_dir = _os.path.dirname(configured)
+        watcher = None
+        watch_tried = False
         while True:
             log_file = _resolve_log_file(configured)
             try:
@@ -147,25 +233,45 @@ def start_console_poller(app):
                     last_pos = 0
                     last_inode = current_inode
 
+                # Drain everything new, then publish it with one lock
+                # acquisition; event checks run outside the lock.
+                batch = []
                 with open(log_file, 'r', errors='replace') as f:
                     f.seek(last_pos)
                     while True:
                         raw = f.readline()
                         if not raw:
                             break
-                        line = ANSI_ESCAPE.sub('', raw).strip()
-                        if not line:
-                            continue
-                        with console_lock:
-                            console_buffer.append(line)
-                            extensions.console_seq += 1
-                        check_player_event(line, cfg, discord_notify)
+                        line = strip_ansi(raw).strip()
+                        if line:
+                            batch.append(line)
                     last_pos = f.tell()
+                if batch:
+                    console_extend(batch)
+                    for line in batch:
+                        check_player_event(line, cfg, discord_notify, 'file')
             except Exception as exc:
                 log.warning('File log poller error (retry in 2s): %s', exc)
                 last_pos = 0
                 last_inode = None
-            time.sleep(0.5)
+
+            if not watch_tried and _os.path.isdir(log_dir):
+                watch_tried = True
+                watcher = _dir_watcher(log_dir)
+            if watcher is None:
+                time.sleep(0.5)
+                continue
+            # Block until the log directory changes instead of waking twice a
+            # second on an idle server.
+            try:
+                events = watcher.read(timeout=_WATCH_TIMEOUT_MS)
+                gone = any(e.mask & _WATCH_GONE for e in events)
+            except OSError:
+                gone = True
+            if gone:
+                watcher.close()
+                watcher = None
+                watch_tried = False
 
     threading.Thread(target=_docker_run, daemon=True, name='console-docker-poller').start()
     threading.Thread(target=_file_run,   daemon=True, name='console-file-poller').start()
@@ -1,11 +1,18 @@
 import json
+import logging
 import os
+import queue
 import threading
+import time
 from datetime import datetime, timezone
 
-import requests
+from ..extensions import get_http
+from ._cache import invalidate, mtime_cached
 
+log = logging.getLogger(__name__)
 
+
+@mtime_cached(lambda cfg: cfg.DISCORD_CONFIG_FILE)
 def get_discord_config(cfg):
     if os.path.exists(cfg.DISCORD_CONFIG_FILE):
         try:
@@ -19,6 +26,7 @@ def get_discord_config(cfg):
 def save_discord_config(data, cfg):
     with open(cfg.DISCORD_CONFIG_FILE, 'w') as f:
         json.dump(data, f, indent=2)
+    invalidate(cfg.DISCORD_CONFIG_FILE)
 
 
 _DISCORD_PREFIXES = (
@@ -29,8 +37,50 @@ _DISCORD_PREFIXES = (
 )
 
 
+# Webhook posts are handed to one long-lived worker thread instead of a new
+# thread per event.  The worker posts through the shared requests.Session, so
+# repeat posts reuse the TLS connection to discord.com.  A burst that overflows
+# the queue is dropped rather than blocking the request that raised it.
+discord_queue: queue.Queue = queue.Queue(maxsize=256)
+_worker = None
+_worker_lock = threading.Lock()
+
+# Identical messages to the same webhook within this window are sent once
+# (e.g. start + restart clicked twice, or both log pollers seeing a join).
+_COALESCE_SECONDS = 2.0
+_recent: dict = {}
+
+
+def _discord_worker():
+    while True:
+        webhook_url, payload, key = discord_queue.get()
+        try:
+            now = time.monotonic()
+            if now - _recent.get(key, -_COALESCE_SECONDS) < _COALESCE_SECONDS:
+                continue
+            _recent[key] = now
+            if len(_recent) > 64:
+                for k in [k for k, ts in _recent.items() if now - ts >= _COALESCE_SECONDS]:
+                    del _recent[k]
+            get_http().post(webhook_url, json=payload, timeout=5)
+        except Exception:
+            pass
+        finally:
+            discord_queue.task_done()
+
+
+def _ensure_worker():
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_discord_worker, daemon=True, name='discord-notify')
+            _worker.start()
+
+
 def discord_notify(message, cfg, color=0x3fb950, event='info'):
-    """Fire-and-forget Discord webhook notification in a background thread."""
+    """Queue a Discord webhook notification; returns immediately."""
     dcfg = get_discord_config(cfg)
     webhook_url = dcfg.get('webhook_url', '').strip()
     if not webhook_url:
@@ -40,17 +90,18 @@ def discord_notify(message, cfg, color=0x3fb950, event='info'):
     if not dcfg.get(f'notify_{event}', True):
         return
 
-    def _send():
-        try:
-            requests.post(webhook_url, json={
-                'embeds': [{
-                    'description': message,
-                    'color': color,
-                    'footer': {'text': 'Terraria Server'},
-                    'timestamp': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z'),
-                }]
-            }, timeout=5)
-        except Exception:
-            pass
-
-    threading.Thread(target=_send, daemon=True, name='discord-notify').start()
+    payload = {
+        'embeds': [{
+            'description': message,
+            'color': color,
+            'footer': {'text': 'Terraria Server'},
+            # isoformat() skips strftime's format-spec parsing; Discord
+            # accepts any ISO 8601 offset, not just 'Z'.
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        }]
+    }
+    _ensure_worker()
+    try:
+        discord_queue.put_nowait((webhook_url, payload, (webhook_url, event, message)))
+    except queue.Full:
+        log.warning('Discord queue full, dropping %s notification', event)
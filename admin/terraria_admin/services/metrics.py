@@ -0,0 +1,48 @@
+import logging
+import threading
+import time
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+log = logging.getLogger(__name__)
+
+# Host CPU/RAM for /api/metrics, refreshed by a daemon thread so requests
+# never block on psutil.cpu_percent(interval=...).
+_SAMPLE_INTERVAL = 1.0
+_latest = None  # (cpu_percent, virtual_memory) from the most recent sample
+_started = False
+_start_lock = threading.Lock()
+
+
+def start_metrics_sampler():
+    """Start the background host sampler once; no-op without psutil."""
+    global _started
+    if psutil is None:
+        return
+    with _start_lock:
+        if _started:
+            return
+        _started = True
+
+    def _run():
+        global _latest
+        while True:
+            try:
+                cpu = psutil.cpu_percent(interval=_SAMPLE_INTERVAL)
+                _latest = (cpu, psutil.virtual_memory())
+            except Exception as exc:
+                log.warning('Metrics sampler error (retry in 5s): %s', exc)
+                time.sleep(5)
+
+    threading.Thread(target=_run, daemon=True, name='metrics-sampler').start()
+
+
+def host_usage():
+    """Return (cpu_percent, virtual_memory), from the sampler when it is running."""
+    sample = _latest
+    if sample is not None:
+        return sample
+    return psutil.cpu_percent(interval=None), psutil.virtual_memory()
@@ -1,17 +1,37 @@
 import json
+import mmap
 import os
+import queue
 import shutil
+import struct
 import subprocess
+import threading
 import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from types import MappingProxyType
+
+from ._cache import invalidate, mtime_cached, store
 
 
 # ------------------------------------------------------------------
 # .tmod binary parser helpers
 # ------------------------------------------------------------------
 
-def _read_7bit_string(data, pos):
-    """Read a .NET BinaryWriter 7-bit-encoded string from *data* at *pos*."""
+TMOD_MAGIC = b'TMOD'
+
+# Little-endian file count and per-entry (uncompressed, compressed) lengths.
+_U32 = struct.Struct('<I')
+_FILE_LENS = struct.Struct('<II')
+
+
+def _read_7bit_length(data, pos):
+    """Read a .NET BinaryWriter 7-bit-encoded length prefix; return (length, pos)."""
+    length = data[pos]
+    if length < 0x80:
+        # Strings shorter than 128 bytes (nearly every tag, name and version)
+        # have a one-byte length prefix.
+        return length, pos + 1
     length = 0
     shift = 0
     while True:
@@ -19,8 +39,13 @@ def _read_7bit_string(data, pos):
         pos += 1
         length |= (b & 0x7F) << shift
         if not (b & 0x80):
-            break
+            return length, pos
         shift += 7
+
+
+def _read_7bit_string(data, pos):
+    """Read a .NET BinaryWriter 7-bit-encoded string from *data* at *pos*."""
+    length, pos = _read_7bit_length(data, pos)
     text = data[pos:pos + length].decode('utf-8', errors='replace')
     return text, pos + length
 
@@ -72,70 +97,123 @@ def _parse_info_binary(data):
     return mod_refs, weak_refs
 
 
-def _parse_tmod_file_table(raw, pos):
-    """Parse mod name/version and file table from signed data section."""
+def _parse_tmod_file_table(raw, pos, wanted):
+    """Parse mod name and file table from the signed data section.
+
+    Only entries named in *wanted* are returned, as {name: (offset, u_len,
+    c_len)}; every other name is skipped by its length without decoding.
+    """
     mod_name, pos = _read_7bit_string(raw, pos)
     _, pos = _read_7bit_string(raw, pos)  # mod version
 
-    file_count = int.from_bytes(raw[pos:pos + 4], 'little')
+    file_count, = _U32.unpack_from(raw, pos)
     pos += 4
 
-    entries = []
+    wanted_raw = {name.encode('utf-8'): name for name in wanted}
+    found = {}
     running_offset = 0
     for _ in range(file_count):
-        name, pos = _read_7bit_string(raw, pos)
-        u_len = int.from_bytes(raw[pos:pos + 4], 'little'); pos += 4
-        c_len = int.from_bytes(raw[pos:pos + 4], 'little'); pos += 4
-        entries.append((name, running_offset, u_len, c_len))
+        n, pos = _read_7bit_length(raw, pos)
+        name = wanted_raw.get(raw[pos:pos + n])
+        pos += n
+        u_len, c_len = _FILE_LENS.unpack_from(raw, pos)
+        if name is not None:
+            found[name] = (running_offset, u_len, c_len)
+        pos += 8
         running_offset += c_len
 
     file_data_start = pos
-    return mod_name, entries, file_data_start
+    return mod_name, found, file_data_start
+
+
+# parse_tmod_dependencies() results keyed by (path, st_mtime_ns, st_size), so
+# re-checking an unchanged mod (upload, install, dependency walk) skips the
+# full read + zlib inflate.
+_deps_cache: dict = {}
+_DEPS_CACHE_MAX = 256
 
 
 def parse_tmod_dependencies(tmod_path):
     """Return list of hard-required mod names from the Info file inside a .tmod."""
     try:
-        with open(tmod_path, 'rb') as fh:
-            raw = fh.read()
-
-        if raw[:4] != b'TMOD':
-            return []
-
-        pos = 4
-        _, pos = _read_7bit_string(raw, pos)  # tML version
-        pos += 20 + 256 + 4                   # hash + sig + datalen
-
-        _, entries, file_data_start = _parse_tmod_file_table(raw, pos)
-
-        for name, offset, u_len, c_len in entries:
-            if name == 'Info':
-                start = file_data_start + offset
-                file_bytes = raw[start:start + c_len]
-                if u_len != c_len:
-                    file_bytes = zlib.decompress(file_bytes, wbits=-15)
-                mod_refs, _ = _parse_info_binary(file_bytes)
-                return mod_refs
-
-        for name, offset, u_len, c_len in entries:
-            if name == 'build.txt':
-                start = file_data_start + offset
-                file_bytes = raw[start:start + c_len]
-                if u_len != c_len:
-                    file_bytes = zlib.decompress(file_bytes, wbits=-15)
-                for line in file_bytes.decode('utf-8', errors='replace').splitlines():
-                    line = line.strip()
-                    if line.startswith('modReferences') and '=' in line:
-                        return [d.strip() for d in line.split('=', 1)[1].split(',') if d.strip()]
-                return []
-
+        st = os.stat(tmod_path)
+    except OSError:
+        return []
+    key = (tmod_path, st.st_mtime_ns, st.st_size)
+    deps = _deps_cache.get(key)
+    if deps is None:
+        deps = _parse_tmod_dependencies(tmod_path)
+        if len(_deps_cache) >= _DEPS_CACHE_MAX:
+            _deps_cache.clear()
+        _deps_cache[key] = deps
+    return list(deps)
+
+
+def _parse_tmod_dependencies(tmod_path):
+    try:
+        # Map the file instead of reading it: content mods run to tens of MB
+        # while the header, file table and Info entry sit in the first pages,
+        # so only those get paged in and copied out.
+        with open(tmod_path, 'rb') as fh, \
+                mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as raw:
+            return _parse_tmod_mapped(raw)
     except Exception:
         pass
     return []
 
 
+def _parse_tmod_mapped(raw):
+    if raw[:4] != TMOD_MAGIC:
+        return []
+
+    pos = 4
+    _, pos = _read_7bit_string(raw, pos)  # tML version
+    pos += 20 + 256 + 4                   # hash + sig + datalen
+
+    _, entries, file_data_start = _parse_tmod_file_table(raw, pos, ('Info', 'build.txt'))
+
+    if 'Info' in entries:
+        offset, u_len, c_len = entries['Info']
+        start = file_data_start + offset
+        file_bytes = raw[start:start + c_len]
+        if u_len != c_len:
+            file_bytes = zlib.decompress(file_bytes, wbits=-15)
+        mod_refs, _ = _parse_info_binary(file_bytes)
+        return mod_refs
+
+    if 'build.txt' in entries:
+        offset, u_len, c_len = entries['build.txt']
+        start = file_data_start + offset
+        file_bytes = raw[start:start + c_len]
+        if u_len != c_len:
+            file_bytes = zlib.decompress(file_bytes, wbits=-15)
+        for line in file_bytes.decode('utf-8', errors='replace').splitlines():
+            line = line.strip()
+            if line.startswith('modReferences') and '=' in line:
+                return [d.strip() for d in line.split('=', 1)[1].split(',') if d.strip()]
+    return []
+
+
+# extract_tmod_version() results, keyed like _deps_cache; the background
+# update loop re-records every installed mod, most of them unchanged.
+_version_cache: dict = {}
+_VERSION_CACHE_MAX = 1024
+
+
 def extract_tmod_version(tmod_path):
     """Read mod name and version from .tmod header."""
+    st = os.stat(tmod_path)
+    key = (tmod_path, st.st_mtime_ns, st.st_size)
+    cached = _version_cache.get(key)
+    if cached is None:
+        cached = _extract_tmod_version(tmod_path)
+        if len(_version_cache) >= _VERSION_CACHE_MAX:
+            _version_cache.clear()
+        _version_cache[key] = cached
+    return cached
+
+
+def _extract_tmod_version(tmod_path):
     with open(tmod_path, 'rb') as fh:
         raw = fh.read(2048)  # 512 was too small for mods with long names/versions
     pos = 4
@@ -150,9 +228,14 @@ def extract_tmod_version(tmod_path):
 # enabled.json helpers
 # ------------------------------------------------------------------
 
+def _enabled_file(cfg):
+    return os.path.join(cfg.MODS_DIR, 'enabled.json')
+
+
+@mtime_cached(_enabled_file)
 def get_enabled_mods(cfg):
     """Return dict {ModName: bool} regardless of enabled.json format."""
-    enabled_file = os.path.join(cfg.MODS_DIR, 'enabled.json')
+    enabled_file = _enabled_file(cfg)
     if os.path.exists(enabled_file):
         try:
             with open(enabled_file) as f:
@@ -169,46 +252,76 @@ def get_enabled_mods(cfg):
 def save_enabled_mods(enabled, cfg):
     """Write enabled.json in tModLoader's native list format."""
     os.makedirs(cfg.MODS_DIR, exist_ok=True)
-    enabled_file = os.path.join(cfg.MODS_DIR, 'enabled.json')
+    enabled_file = _enabled_file(cfg)
     enabled_list = [name for name, active in enabled.items() if active]
     with open(enabled_file, 'w') as f:
         json.dump(enabled_list, f, indent=2)
+    invalidate(enabled_file)
+
+
+def set_mod_enabled(mod_name, on, cfg):
+    """Enable or disable one mod; returns False (and writes nothing) when the
+    mod is already in the requested state.
+
+    enabled.json is tModLoader's own file, so it stays a JSON list; this just
+    avoids rewriting it for no-op changes.
+    """
+    enabled = get_enabled_mods(cfg)
+    if bool(enabled.get(mod_name, False)) == on:
+        return False
+    enabled[mod_name] = on
+    save_enabled_mods(enabled, cfg)
+    return True
 
 
 # ------------------------------------------------------------------
 # Mod metadata cache
 # ------------------------------------------------------------------
 
+# Returned for mods with no .mod_meta.json entry so lookups like
+# meta.get(name, {}).get(...) don't build a throwaway dict per miss.
+EMPTY_META = MappingProxyType({})
+
+
 def _meta_file(cfg):
     return os.path.join(cfg.MODS_DIR, '.mod_meta.json')
 
 
+# Serialises writers of .mod_meta.json (request thread vs background updater).
+_meta_lock = threading.RLock()
+
+
+@mtime_cached(_meta_file)
 def get_mod_meta(cfg):
-    path = _meta_file(cfg)
-    if os.path.exists(path):
-        try:
-            with open(path) as f:
-                return json.load(f)
-        except Exception:
-            pass
-    return {}
+    try:
+        with open(_meta_file(cfg)) as f:
+            return json.load(f)
+    except Exception:
+        return {}
 
 
 def save_mod_meta(meta, cfg):
     os.makedirs(cfg.MODS_DIR, exist_ok=True)
-    with open(_meta_file(cfg), 'w') as f:
-        json.dump(meta, f, indent=2)
+    path = _meta_file(cfg)
+    with _meta_lock:
+        with open(path, 'w') as f:
+            json.dump(meta, f, indent=2)
+        # Write-through: the next get_mod_meta() is a stat, not a re-parse.
+        store(path, dict(meta))
 
 
 def record_mod_installed(mod_name, tmod_path, cfg, workshop_id=None):
-    """Update metadata cache after a mod is installed or updated."""
+    """Update metadata cache after a mod is installed or updated.
+
+    Returns the new meta entry so callers need not re-read .mod_meta.json.
+    """
     meta = get_mod_meta(cfg)
     try:
         _, version = extract_tmod_version(tmod_path)
     except Exception:
         version = 'unknown'
     now = datetime.now().isoformat(timespec='seconds')
-    entry = meta.get(mod_name, {})
+    entry = dict(meta.get(mod_name) or {})
     entry['version'] = version
     entry['last_updated'] = now
     if 'installed_at' not in entry:
@@ -217,6 +330,7 @@ def record_mod_installed(mod_name, tmod_path, cfg, workshop_id=None):
         entry['workshop_id'] = workshop_id
     meta[mod_name] = entry
     save_mod_meta(meta, cfg)
+    return entry
 
 
 def remove_mod_meta(mod_name, cfg):
@@ -239,13 +353,17 @@ def list_mods(cfg):
     enabled = get_enabled_mods(cfg)
     meta = get_mod_meta(cfg)
 
-    for fname in sorted(os.listdir(cfg.MODS_DIR)):
-        if not fname.endswith('.tmod'):
-            continue
+    # One scandir pass instead of listdir + a getsize() path lookup per mod;
+    # DirEntry.stat() caches its result on the entry.
+    with os.scandir(cfg.MODS_DIR) as it:
+        entries = sorted((e for e in it if e.name.endswith('.tmod')),
+                         key=lambda e: e.name)
+
+    for entry in entries:
+        fname = entry.name
         mod_name = fname[:-5]
-        fpath = os.path.join(cfg.MODS_DIR, fname)
-        size_bytes = os.path.getsize(fpath)
-        mod_meta = meta.get(mod_name, {})
+        size_bytes = entry.stat().st_size
+        mod_meta = meta.get(mod_name) or EMPTY_META
         workshop_id = mod_meta.get('workshop_id') or cfg.KNOWN_WORKSHOP_IDS.get(mod_name)
         mods.append({
             'name': mod_name,
@@ -281,14 +399,17 @@ def _run_steamcmd_download(steamcmd, app_id, workshop_id, steamcmd_home):
     return result, workshop_dir if os.path.isdir(workshop_dir) else None
 
 
-def download_mod_from_workshop(steamcmd, workshop_id, cfg):
+_STEAMCMD_HOME = '/tmp/steamcmd_home'
+_UPDATE_WORKERS = 4
+
+
+def download_mod_from_workshop(steamcmd, workshop_id, cfg, steamcmd_home=_STEAMCMD_HOME):
     """Download a Workshop item and copy the .tmod into MODS_DIR.
 
     tModLoader mods (1.4+) live under App ID 1281930 in the Workshop;
     legacy Terraria mods use 105600. We try 1281930 first, then fall
     back to 105600 so both generations are handled automatically.
     """
-    steamcmd_home = '/tmp/steamcmd_home'
     os.makedirs(steamcmd_home, exist_ok=True)
     try:
         # Try tModLoader app first (1281930), then Terraria (105600)
@@ -321,7 +442,19 @@ def download_mod_from_workshop(steamcmd, workshop_id, cfg):
         tmod_file = max(tmod_files, key=_tmod_version_key)
         os.makedirs(cfg.MODS_DIR, exist_ok=True)
         dest = os.path.join(cfg.MODS_DIR, os.path.basename(tmod_file))
-        shutil.copy2(tmod_file, dest)
+        # Copy next to the target and rename it into place: the dependency
+        # parser mmaps installed mods, and truncating a mapped file under a
+        # reader would kill the process with SIGBUS.
+        tmp = dest + '.part'
+        try:
+            shutil.copy2(tmod_file, tmp)
+            os.replace(tmp, dest)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
         mod_name = os.path.basename(tmod_file)[:-5]
         return mod_name, None
 
@@ -331,6 +464,32 @@ def download_mod_from_workshop(steamcmd, workshop_id, cfg):
         return None, f'Error downloading Workshop item {workshop_id}: {exc}'
 
 
+def download_workshop_mods(steamcmd, workshop_ids, cfg, workers=_UPDATE_WORKERS):
+    """Download several Workshop items concurrently.
+
+    Yields (workshop_id, mod_name, error) as each download finishes, so the
+    caller can record results (meta JSON writes) on its own thread. Each
+    worker borrows its own steamcmd HOME: parallel steamcmd instances
+    sharing one Steam client directory clobber each other's state.
+    """
+    homes = queue.Queue()
+    for i in range(workers):
+        homes.put(f'{_STEAMCMD_HOME}_{i}')
+
+    def _download(workshop_id):
+        home = homes.get()
+        try:
+            return download_mod_from_workshop(steamcmd, workshop_id, cfg, steamcmd_home=home)
+        finally:
+            homes.put(home)
+
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        futures = {ex.submit(_download, wid): wid for wid in workshop_ids}
+        for fut in as_completed(futures):
+            mod_name, err = fut.result()
+            yield futures[fut], mod_name, err
+
+
 # ------------------------------------------------------------------
 # Dependency auto-installer
 # ------------------------------------------------------------------
@@ -346,10 +505,7 @@ def ensure_mod_dependencies(tmod_path, steamcmd, cfg):
         dep_file = os.path.join(cfg.MODS_DIR, f'{dep}.tmod')
 
         if os.path.exists(dep_file):
-            enabled = get_enabled_mods(cfg)
-            if not enabled.get(dep, False):
-                enabled[dep] = True
-                save_enabled_mods(enabled, cfg)
+            if set_mod_enabled(dep, True, cfg):
                 messages.append((True, f'Dependency "{dep}" already installed — enabled it.'))
             continue
 
@@ -368,9 +524,7 @@ def ensure_mod_dependencies(tmod_path, steamcmd, cfg):
         else:
             dest = os.path.join(cfg.MODS_DIR, f'{mod_name}.tmod')
             record_mod_installed(mod_name, dest, cfg, workshop_id=workshop_id)
-            enabled = get_enabled_mods(cfg)
-            enabled[mod_name] = True
-            save_enabled_mods(enabled, cfg)
+            set_mod_enabled(mod_name, True, cfg)
             messages.append((True, f'Auto-installed dependency "{dep}" (Workshop {workshop_id}).'))
 
     return messages
@@ -382,15 +536,12 @@ def run_background_mod_updates(cfg):
     if not steamcmd:
         return
 
-    for mod in list_mods(cfg):
-        mod_name = mod['name']
-        workshop_id = mod.get('workshop_id')
-        if not workshop_id:
+    workshop_ids = [m['workshop_id'] for m in list_mods(cfg) if m.get('workshop_id')]
+    for workshop_id, new_mod_name, err in download_workshop_mods(steamcmd, workshop_ids, cfg):
+        if err:
             continue
         try:
-            new_mod_name, err = download_mod_from_workshop(steamcmd, workshop_id, cfg)
-            if not err:
-                dest = os.path.join(cfg.MODS_DIR, f'{new_mod_name}.tmod')
-                record_mod_installed(new_mod_name, dest, cfg, workshop_id)
+            dest = os.path.join(cfg.MODS_DIR, f'{new_mod_name}.tmod')
+            record_mod_installed(new_mod_name, dest, cfg, workshop_id)
         except Exception:
             pass
@@ -7,10 +7,15 @@ def start_all(app):
     from .console import start_console_poller
     from .backups import create_backup, prune_auto_backups
     from .mods    import run_background_mod_updates
+    from .metrics import start_metrics_sampler
+    from .server  import watch_container_events
 
     cfg = app.terraria_config
 
     start_console_poller(app)
+    start_metrics_sampler()
+    threading.Thread(target=watch_container_events, args=(cfg,),
+                     daemon=True, name='docker-events').start()
 
     if cfg.AUTO_BACKUP_INTERVAL_HOURS > 0:
         def _backup_loop():
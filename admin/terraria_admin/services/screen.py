@@ -32,24 +32,19 @@ def screen_send(cmd, cfg):
 
 def screen_capture(cfg, wait=0.6):
     """Return recent server output from the in-memory console buffer."""
-    from ..extensions import console_buffer
+    from ..extensions import console_tail
     time.sleep(wait)
-    return '\n'.join(list(console_buffer)[-80:])
+    return '\n'.join(console_tail(80))
 
 
 def is_screen_running(cfg):
     """Check whether the terraria server container is running."""
-    import docker
-    client = None
+    from ..extensions import get_docker
     try:
-        client = docker.from_env()
-        container = client.containers.get(cfg.SERVER_CONTAINER)
+        container = get_docker().containers.get(cfg.SERVER_CONTAINER)
         return container.status == 'running'
     except Exception:
         return False
-    finally:
-        if client:
-            client.close()
 
 
 def screen_cmd_output(cmd, cfg, wait=0.8):
@@ -59,15 +54,10 @@ def screen_cmd_output(cmd, cfg, wait=0.8):
     are not missed when the buffer is full and old entries are evicted.
     """
     from .. import extensions
-    from ..extensions import console_buffer, console_lock
-    with console_lock:
-        before_seq = extensions.console_seq
+    from ..extensions import console_since
+    before_seq = extensions.console_seq
     if not screen_send(cmd, cfg):
         return ''
     time.sleep(wait)
-    with console_lock:
-        buf = list(console_buffer)
-        seq = extensions.console_seq
-    buf_start = seq - len(buf)
-    offset = max(0, before_seq - buf_start)
-    return '\n'.join(buf[offset:])
+    lines, _ = console_since(before_seq)
+    return '\n'.join(lines)
@@ -1,49 +1,149 @@
+import logging
 import os
+import tempfile
+import threading
 import time
 
+from ..extensions import get_docker, reset_docker
+from ._cache import invalidate, mtime_cached
+from .config_parse import parse_kv
 from .tshock import rest_call
 from .screen import is_screen_running, screen_cmd_output
 
+log = logging.getLogger(__name__)
+
 # Cache container status for 5 seconds to reduce Docker SDK connections
 _status_cache: dict = {}
 _STATUS_CACHE_TTL = 5
 
+# Set while watch_container_events() is subscribed to the daemon's event
+# stream: every state change then refreshes _status_cache, so successful
+# inspects stay valid for _STATUS_CACHE_LIVE_TTL instead of the short TTL.
+# Each event bumps _status_gen; an inspect that started before the latest
+# event is not stored, so it cannot overwrite the listener's fresher result.
+_events_live = threading.Event()
+_STATUS_CACHE_LIVE_TTL = 60
+_status_gen = 0
+_status_lock = threading.Lock()
+_STATE_EVENTS = frozenset({
+    'create', 'start', 'restart', 'pause', 'unpause',
+    'die', 'stop', 'kill', 'oom', 'destroy',
+})
+
+
+def _server_type_file(cfg):
+    return os.path.join(cfg.TERRARIA_DIR, '.server_type')
 
+
+@mtime_cached(_server_type_file)
 def get_server_type(cfg):
-    type_file = os.path.join(cfg.TERRARIA_DIR, '.server_type')
+    type_file = _server_type_file(cfg)
     if os.path.exists(type_file):
         with open(type_file) as f:
             return f.read().strip()
     return cfg.SERVER_TYPE
 
 
+def _is_not_found(exc):
+    """True for 'no such container' — the client itself is still healthy."""
+    from docker.errors import NotFound
+    return isinstance(exc, NotFound)
+
+
+def _is_connection_error(exc):
+    """True when the daemon connection itself failed (dial refused, socket
+    reset or closed).  API errors and broken log/event streams leave the
+    shared client usable, so they must not close it under other threads."""
+    import requests
+    from docker.errors import APIError, DockerException
+    if isinstance(exc, (ConnectionError, requests.exceptions.ConnectionError)):
+        return True
+    return isinstance(exc, DockerException) and not isinstance(exc, APIError)
+
+
 def _service_active(cfg):
     """Return True if the terraria server Docker container is running.
 
     Caches the result for _STATUS_CACHE_TTL seconds to limit Docker SDK
-    connections when multiple pages poll /api/status frequently.
+    connections when multiple pages poll /api/status frequently, or for
+    _STATUS_CACHE_LIVE_TTL while the event listener is connected.
     Also caches StartedAt so _container_uptime() can compute uptime without
     an extra Docker call.
     """
-    import docker
     cache_key = cfg.SERVER_CONTAINER
     cached = _status_cache.get(cache_key)
-    if cached and (time.monotonic() - cached['ts']) < _STATUS_CACHE_TTL:
-        return cached['running']
-    client = docker.from_env()
+    if cached:
+        # Failed inspects are never trusted for longer than the short TTL.
+        ttl = (_STATUS_CACHE_LIVE_TTL if cached['ok'] and _events_live.is_set()
+               else _STATUS_CACHE_TTL)
+        if (time.monotonic() - cached['ts']) < ttl:
+            return cached['running']
+    gen = _status_gen
+    ok = True
     try:
-        container = client.containers.get(cfg.SERVER_CONTAINER)
+        container = get_docker().containers.get(cfg.SERVER_CONTAINER)
         running = container.status == 'running'
         started_at = container.attrs.get('State', {}).get('StartedAt', '') if running else ''
-    except Exception:
+    except Exception as exc:
         running = False
         started_at = ''
-    finally:
-        client.close()
-    _status_cache[cache_key] = {'running': running, 'started_at': started_at, 'ts': time.monotonic()}
+        if not _is_not_found(exc):
+            ok = False
+            reset_docker()
+    with _status_lock:
+        if gen == _status_gen:
+            _status_cache[cache_key] = {
+                'running': running, 'started_at': started_at,
+                'ts': time.monotonic(), 'ok': ok,
+            }
     return running
 
 
+def _invalidate_status(name):
+    """Drop the cached status and outdate any inspect still in flight."""
+    global _status_gen
+    with _status_lock:
+        _status_gen += 1
+        _status_cache.pop(name, None)
+
+
+def watch_container_events(cfg):
+    """Keep the container status cache current from Docker's event stream.
+
+    Runs forever in a daemon thread.  Each start/stop-type event re-inspects
+    the container once, so /api/status polls become dict lookups instead of
+    an inspect every _STATUS_CACHE_TTL seconds (at most one per
+    _STATUS_CACHE_LIVE_TTL as a backstop).  While the stream is down
+    _service_active() falls back to the TTL cache.
+    """
+    name = cfg.SERVER_CONTAINER
+    while True:
+        events = None
+        try:
+            events = get_docker().events(
+                decode=True, filters={'type': 'container', 'container': name},
+            )
+            # Seed after subscribing so a change in between is not missed.
+            _invalidate_status(name)
+            _service_active(cfg)
+            _events_live.set()
+            for event in events:
+                if event.get('Action', event.get('status')) in _STATE_EVENTS:
+                    _invalidate_status(name)
+                    _service_active(cfg)
+        except Exception as exc:
+            log.warning('Docker event listener error (retry in 5s): %s', exc)
+            reset_docker()
+        finally:
+            _events_live.clear()
+            if events is not None:
+                try:
+                    events.close()
+                except Exception:
+                    pass
+        time.sleep(5)
+
+
 def _container_uptime(cfg):
     """Return a human-readable uptime string derived from the cached container StartedAt.
 
@@ -75,18 +175,36 @@ def _container_uptime(cfg):
 
 def container_action(action, cfg):
     """Start, stop, or restart the terraria server container via Docker SDK."""
-    import docker
-    client = docker.from_env()
-    try:
-        container = client.containers.get(cfg.SERVER_CONTAINER)
-        if action == 'stop':
-            container.stop(timeout=30)
-        elif action == 'start':
-            container.start()
-        elif action == 'restart':
-            container.restart(timeout=30)
-    finally:
-        client.close()
+    container = get_docker().containers.get(cfg.SERVER_CONTAINER)
+    if action == 'stop':
+        container.stop(timeout=30)
+    elif action == 'start':
+        container.start()
+    elif action == 'restart':
+        container.restart(timeout=30)
+
+
+def wait_until_stopped(cfg, timeout=5.0, interval=0.1):
+    """Poll the container until it is no longer running, up to *timeout* s.
+
+    Returns True once it is down (or gone), False on timeout or Docker error.
+    Replaces fixed sleeps after a stop: a normal stop returns on the first
+    check because Container.stop() already waits for the exit.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if get_docker().containers.get(cfg.SERVER_CONTAINER).status != 'running':
+                break
+        except Exception as exc:
+            if _is_not_found(exc):
+                break
+            return False
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
+    _invalidate_status(cfg.SERVER_CONTAINER)
+    return True
 
 
 def _stored_version(cfg):
@@ -97,17 +215,64 @@ def _stored_version(cfg):
     return 'unknown'
 
 
-def read_serverconfig(key, cfg):
-    """Read a single key from serverconfig.txt."""
+@mtime_cached(lambda cfg: cfg.CONFIG_FILE)
+def get_serverconfig(cfg):
+    """Return serverconfig.txt as a dict ({} if missing or unreadable)."""
     try:
-        with open(cfg.CONFIG_FILE) as f:
-            for line in f:
-                line = line.strip()
-                if line.startswith(f'{key}='):
-                    return line.split('=', 1)[1].strip()
+        return parse_kv(cfg.CONFIG_FILE)
     except Exception:
-        pass
-    return None
+        return {}
+
+
+def read_serverconfig(key, cfg):
+    """Read a single key from serverconfig.txt.
+
+    Looks the key up in the cached parse without copying it.  Unlike the
+    old line scan, blanks around '=' are allowed and the last of duplicated
+    keys wins — the value the server itself ends up using.
+    """
+    return get_serverconfig.peek(cfg).get(key)
+
+
+def write_serverconfig(lines, cfg):
+    """Atomically replace serverconfig.txt with *lines*, one per line."""
+    write_serverconfig_text('\n'.join(lines) + '\n', cfg)
+
+
+def write_serverconfig_text(text, cfg):
+    """Atomically replace serverconfig.txt with the complete file *text*.
+
+    The text goes to a temp file in the same directory, is fsynced, then
+    renamed over the original and the directory fsynced, so a crash mid-write
+    can never leave the server with a truncated or missing config.
+    """
+    path = cfg.CONFIG_FILE
+    data = memoryview(text.encode('utf-8'))
+    dirname = os.path.dirname(path) or '.'
+    fd, tmp = tempfile.mkstemp(dir=dirname, prefix='.serverconfig.')
+    try:
+        try:
+            # os.write() may write less than asked; loop until it is all out.
+            while data:
+                data = data[os.write(fd, data):]
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    # Persist the rename itself.
+    dir_fd = os.open(dirname, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+    invalidate(path)
 
 
 def get_server_status(cfg):
@@ -1,7 +1,7 @@
 import ipaddress
 import urllib.parse
 
-import requests
+from ..extensions import get_http
 
 # Only allow REST calls to loopback or private-network addresses to prevent
 # an attacker from using a crafted REST_URL to pivot to internal services.
@@ -23,6 +23,8 @@ def _is_safe_rest_url(url: str) -> bool:
 
 def rest_call(endpoint, cfg, method='GET', data=None):
     """Call TShock REST API. Only used when server_type == tshock."""
+    import requests
+
     if not _is_safe_rest_url(cfg.REST_URL):
         return {'status': 'error', 'error': 'REST_URL must point to localhost or a private network address'}
     try:
@@ -30,10 +32,12 @@ def rest_call(endpoint, cfg, method='GET', data=None):
         params = {'token': cfg.REST_TOKEN}
         if data:
             params.update(data)
+        # Shared keep-alive session: repeated calls reuse the loopback socket.
+        http = get_http()
         if method == 'GET':
-            resp = requests.get(url, params=params, timeout=5)
+            resp = http.get(url, params=params, timeout=5)
         else:
-            resp = requests.post(url, data=params, timeout=5)
+            resp = http.post(url, data=params, timeout=5)
         return resp.json() if resp.text else {'status': resp.status_code}
     except requests.exceptions.ConnectionError:
         return {'status': 'error', 'error': 'Server offline or REST API disabled'}
@@ -2,8 +2,7 @@ import os
 import time
 from datetime import datetime
 
-import requests
-
+from ..extensions import get_http
 from .server import get_server_type, _stored_version, container_action
 
 # Simple in-memory cache for version info to avoid hitting GitHub on every page load.
@@ -15,16 +14,16 @@ def list_worlds(cfg):
     """Return list of .wld files available in WORLDS_DIR."""
     if not os.path.isdir(cfg.WORLDS_DIR):
         return []
+    with os.scandir(cfg.WORLDS_DIR) as it:
+        entries = sorted((e for e in it if e.name.endswith('.wld')), key=lambda e: e.name)
     worlds = []
-    for fname in sorted(os.listdir(cfg.WORLDS_DIR)):
-        if not fname.endswith('.wld'):
-            continue
-        path = os.path.join(cfg.WORLDS_DIR, fname)
+    for entry in entries:
+        st = entry.stat()
         worlds.append({
-            'name': fname[:-4],
-            'filename': fname,
-            'size_mb': round(os.path.getsize(path) / (1024 * 1024), 1),
-            'modified': datetime.fromtimestamp(os.path.getmtime(path)).strftime('%Y-%m-%d %H:%M'),
+            'name': entry.name[:-4],
+            'filename': entry.name,
+            'size_mb': round(st.st_size / (1024 * 1024), 1),
+            'modified': datetime.fromtimestamp(st.st_mtime).strftime('%Y-%m-%d %H:%M'),
         })
     return worlds
 
@@ -40,21 +39,22 @@ def get_version_info(cfg):
         latest = cached['latest']
     else:
         latest = 'unknown'
+        http = get_http()
         try:
             if server_type == 'tshock':
-                resp = requests.get(
+                resp = http.get(
                     'https://api.github.com/repos/Pryaxis/TShock/releases/latest', timeout=5
                 )
                 if resp.ok:
                     latest = resp.json().get('tag_name', 'unknown')
             elif server_type == 'tmodloader':
-                resp = requests.get(
+                resp = http.get(
                     'https://api.github.com/repos/tModLoader/tModLoader/releases/latest', timeout=5
                 )
                 if resp.ok:
                     latest = resp.json().get('tag_name', 'unknown')
             else:
-                resp = requests.get(
+                resp = http.get(
                     'https://terraria.org/api/get/dedicated-servers-names', timeout=5
                 )
                 if resp.ok:
@@ -85,9 +85,10 @@ def update_tmodloader(cfg):
     import zipfile
 
     log = logging.getLogger(__name__)
+    http = get_http()
 
     try:
-        resp = requests.get(
+        resp = http.get(
             'https://api.github.com/repos/tModLoader/tModLoader/releases/latest', timeout=10
         )
         if not resp.ok:
@@ -114,9 +115,12 @@ def update_tmodloader(cfg):
 
         # Download first while the server is still running, then swap atomically.
         log.info('Downloading tModLoader %s from %s', latest_tag, zip_asset['browser_download_url'])
-        with tempfile.TemporaryDirectory() as tmpdir:
+        # Stage inside TERRARIA_DIR so the final swap is a same-filesystem
+        # rename; from /tmp, shutil.move had to copy the whole tree while the
+        # server was already stopped.
+        with tempfile.TemporaryDirectory(dir=cfg.TERRARIA_DIR, prefix='.tml_update_') as tmpdir:
             zip_path = os.path.join(tmpdir, 'tModLoader.zip')
-            r = requests.get(zip_asset['browser_download_url'], stream=True, timeout=480)
+            r = http.get(zip_asset['browser_download_url'], stream=True, timeout=480)
             r.raise_for_status()
             with open(zip_path, 'wb') as f:
                 for chunk in r.iter_content(chunk_size=65536):
@@ -143,7 +147,7 @@ def update_tmodloader(cfg):
                 else:
                     shutil.rmtree(tml_dir)
 
-            shutil.move(new_dir, tml_dir)
+            os.rename(new_dir, tml_dir)
 
         with open(os.path.join(cfg.TERRARIA_DIR, '.server_version'), 'w') as f:
             f.write(latest_tag)
@@ -28,6 +28,7 @@ def _make_test_config_class(terraria_dir_path):
         SESSION_COOKIE_HTTPONLY = True
         PERMANENT_SESSION_LIFETIME = 3600
         MAX_CONTENT_LENGTH = 256 * 1024 * 1024
+        MAX_FORM_LENGTH = 64 * 1024
 
         TERRARIA_DIR = terraria_dir_path
         REST_URL = 'http://127.0.0.1:7878'
@@ -37,6 +38,7 @@ def _make_test_config_class(terraria_dir_path):
         SCREEN_SESSION = 'terraria'
         SERVER_CONTAINER = 'terraria-server'
         LOG_FILE = None
+        LOG_LOOKBACK = '-1h'
         MODS_DIR = _mods_dir
         STEAMCMD_BIN = '/nonexistent/steamcmd.sh'
         TERRARIA_APP_ID = '105600'
@@ -141,3 +143,36 @@ def mock_docker():
     client, container = _make_mock_docker()
     with patch('docker.from_env', return_value=client):
         yield client, container
+
+
+@pytest.fixture(autouse=True)
+def _reset_docker_client():
+    """Drop the shared Docker client so each test sees its own docker.from_env patch."""
+    from terraria_admin import extensions
+    extensions._docker_client = None
+    yield
+    extensions._docker_client = None
+
+
+@pytest.fixture(autouse=True)
+def _clear_api_ttl_cache():
+    """Polled /api/* results are cached for a few seconds; start each test cold."""
+    from terraria_admin.blueprints import api
+    api._ttl_store.clear()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def _clear_player_event_dedup():
+    """Join/leave notifications are deduplicated for a few seconds; start each test cold."""
+    from terraria_admin.services import console
+    console._recent_events.clear()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def _clear_file_cache():
+    """Parsed config files are cached by mtime; start each test cold."""
+    from terraria_admin.services import _cache
+    _cache.clear()
+    yield
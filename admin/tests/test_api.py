@@ -1,4 +1,5 @@
 """Tests for /api/* endpoints."""
+import io
 import json
 from unittest.mock import patch, MagicMock
 
@@ -16,11 +17,51 @@ class TestApiStatus:
         assert 'online' in data
         assert data['online'] is True
 
+    def test_api_status_is_cached_briefly(self, auth_client):
+        with patch('terraria_admin.blueprints.api.get_server_status') as m:
+            m.return_value = {'online': False}
+            auth_client.get('/api/status')
+            auth_client.get('/api/status')
+        m.assert_called_once()
+
     def test_api_status_requires_auth(self, client):
         r = client.get('/api/status')
         assert r.status_code == 302
 
 
+class TestApiConditional:
+    def test_api_status_sets_etag_and_cache_control(self, auth_client):
+        with patch('terraria_admin.blueprints.api.get_server_status', return_value={'online': True}):
+            r = auth_client.get('/api/status')
+        assert r.headers.get('ETag')
+        assert 'max-age=2' in r.headers.get('Cache-Control', '')
+
+    def test_api_status_unchanged_returns_304(self, auth_client):
+        with patch('terraria_admin.blueprints.api.get_server_status', return_value={'online': True}):
+            etag = auth_client.get('/api/status').headers['ETag']
+            r = auth_client.get('/api/status', headers={'If-None-Match': etag})
+        assert r.status_code == 304
+        assert r.data == b''
+
+    def test_api_status_changed_returns_200(self, auth_client):
+        with patch('terraria_admin.blueprints.api.get_server_status', return_value={'online': True}):
+            etag = auth_client.get('/api/status').headers['ETag']
+        with patch('terraria_admin.blueprints.api.get_server_status', return_value={'online': False}):
+            r = auth_client.get('/api/status', headers={'If-None-Match': etag})
+        assert r.status_code == 200
+        assert r.get_json()['online'] is False
+
+    def test_api_diag_unchanged_returns_304(self, auth_client):
+        with patch('docker.from_env', side_effect=Exception('daemon down')):
+            etag = auth_client.get('/api/diag').headers['ETag']
+            r = auth_client.get('/api/diag', headers={'If-None-Match': etag})
+        assert r.status_code == 304
+
+    def test_api_metrics_sets_etag(self, auth_client):
+        r = auth_client.get('/api/metrics')
+        assert r.headers.get('ETag')
+
+
 class TestApiPlayers:
     def test_api_players_returns_list(self, auth_client):
         with patch('terraria_admin.blueprints.api.get_players') as m:
@@ -79,6 +120,16 @@ class TestApiLogs:
         assert 'lines' in data
         assert isinstance(data['lines'], list)
 
+    def test_api_logs_streams_valid_json_across_batches(self, auth_client):
+        from terraria_admin.blueprints import api
+        lines = [b'plain', b'quote " and \\ backslash', 'caf\xe9'.encode()] * 90
+        with patch.object(api, '_read_logs', return_value=lines):
+            r = auth_client.get('/api/logs')
+        assert r.is_streamed
+        assert json.loads(r.get_data()) == {'lines': [l.decode() for l in lines]}
+        with patch.object(api, '_read_logs', return_value=[]):
+            assert auth_client.get('/api/logs').get_json() == {'lines': []}
+
     def test_api_logs_level_filter_error(self, auth_client, app):
         from terraria_admin.extensions import console_buffer, console_lock
         with console_lock:
@@ -93,10 +144,137 @@ class TestApiLogs:
         for line in data['lines']:
             assert any(kw in line.lower() for kw in ('error', 'exception', 'fail', 'fatal'))
 
+    def test_api_logs_level_filter_warn_is_case_insensitive(self, auth_client):
+        from terraria_admin.extensions import console_buffer, console_lock
+        with console_lock:
+            console_buffer.clear()
+            console_buffer.append('[Server] Warning: low memory')
+            console_buffer.append('[Server] FATAL crash')
+            console_buffer.append('[Server] normal line')
+
+        with patch('terraria_admin.blueprints.api.subprocess.Popen', side_effect=OSError):
+            r = auth_client.get('/api/logs?level=warn&lines=100')
+        assert r.get_json()['lines'] == ['[Server] Warning: low memory', '[Server] FATAL crash']
+
     def test_api_logs_requires_auth(self, client):
         r = client.get('/api/logs')
         assert r.status_code == 302
 
+    def test_tail_file_returns_last_lines(self, tmp_path):
+        from terraria_admin.blueprints.api import _tail_file
+        log = tmp_path / 'server.log'
+        log.write_bytes(b''.join(b'line %d\n' % i for i in range(5000)))
+        assert _tail_file(str(log), 3, block=64) == [b'line 4997', b'line 4998', b'line 4999']
+        assert len(_tail_file(str(log), 10000)) == 5000
+
+    def test_tail_file_without_trailing_newline(self, tmp_path):
+        from terraria_admin.blueprints.api import _tail_file
+        log = tmp_path / 'server.log'
+        log.write_bytes(b'a\nb\nc')
+        assert _tail_file(str(log), 2, block=1) == [b'b', b'c']
+
+    def test_tail_file_handles_crlf_and_empty_files(self, tmp_path):
+        from terraria_admin.blueprints.api import _tail_file
+        log = tmp_path / 'server.log'
+        log.write_bytes(b'one\r\nloading 50%\rloading 100%\r\n\r\nlast\r\n')
+        assert _tail_file(str(log), 3) == [b'loading 50%\rloading 100%', b'', b'last']
+        log.write_bytes(b'')
+        assert _tail_file(str(log), 3) == []
+
+    def test_api_logs_filters_log_file_bytes(self, auth_client, app, tmp_path):
+        log = tmp_path / 'server.log'
+        log.write_bytes('ok\nWARN caf\xe9 low\nFatal: boom\n'.encode('utf-8'))
+        with patch.object(app.extensions['api_cfg'], 'LOG_FILE', str(log)):
+            r = auth_client.get('/api/logs?level=warn')
+        assert r.get_json()['lines'] == ['WARN caf\xe9 low', 'Fatal: boom']
+
+    def test_resolved_config_is_per_app(self, app, tmp_path):
+        from terraria_admin import create_app
+        base = type(app.terraria_config)
+
+        class OtherConfig(base):
+            LOG_LOOKBACK = '-5m'
+
+        other = create_app(config_class=OtherConfig)
+        assert other.extensions['api_cfg'].LOG_LOOKBACK == '-5m'
+        assert app.extensions['api_cfg'].LOG_LOOKBACK == base.LOG_LOOKBACK
+
+    def test_api_logs_journalctl_is_bounded_by_lookback(self, auth_client):
+        popen = MagicMock()
+        popen.return_value.stdout = io.BytesIO(b'b\na\n')
+        popen.return_value.wait.return_value = 0
+        with patch('terraria_admin.blueprints.api.journal', None), \
+             patch('terraria_admin.blueprints.api._JOURNALCTL', '/usr/bin/journalctl'), \
+             patch('terraria_admin.blueprints.api.subprocess.Popen', popen):
+            r = auth_client.get('/api/logs?lines=10')
+        assert r.get_json()['lines'] == ['a', 'b']
+        argv = popen.call_args[0][0]
+        assert argv[0] == '/usr/bin/journalctl'
+        assert '--since=-1h' in argv
+        assert '-n10' in argv
+
+    def test_api_logs_skips_journalctl_when_unavailable(self, auth_client):
+        with patch('terraria_admin.blueprints.api.journal', None), \
+             patch('terraria_admin.blueprints.api._JOURNALCTL', None), \
+             patch('terraria_admin.blueprints.api.subprocess.Popen') as popen:
+            r = auth_client.get('/api/logs')
+        assert r.status_code == 200
+        popen.assert_not_called()
+
+    def test_journalctl_tail_stops_reading_at_limit(self, app):
+        from terraria_admin.blueprints import api
+        proc = MagicMock()
+        proc.stdout = io.BytesIO(b'newest\nolder\noldest-but-cut-off\n')
+        proc.wait.return_value = -15
+        with patch.object(api, '_JOURNAL_LINE_BYTES', 10), \
+             patch('terraria_admin.blueprints.api.subprocess.Popen', return_value=proc):
+            tail = api._journalctl_tail(app.terraria_config, 2)
+        assert tail == [b'older', b'newest']
+        proc.terminate.assert_called_once()
+
+    def test_journalctl_tail_failure_returns_none(self, app):
+        from terraria_admin.blueprints import api
+        proc = MagicMock()
+        proc.stdout = io.BytesIO(b'')
+        proc.wait.return_value = 1
+        with patch('terraria_admin.blueprints.api.subprocess.Popen', return_value=proc):
+            assert api._journalctl_tail(app.terraria_config, 10) is None
+
+    def test_api_logs_reads_systemd_journal(self, auth_client):
+        from datetime import datetime, timezone
+        entries = [
+            {'MESSAGE': 'second', 'SYSLOG_IDENTIFIER': 'terraria',
+             '__REALTIME_TIMESTAMP': datetime(2024, 1, 1, 12, 0, 1, tzinfo=timezone.utc)},
+            {'MESSAGE': 'first', 'SYSLOG_IDENTIFIER': 'terraria',
+             '__REALTIME_TIMESTAMP': datetime(2024, 1, 1, 12, 0, 0, tzinfo=timezone.utc)},
+            {},
+        ]
+        reader = MagicMock()
+        reader.get_previous.side_effect = entries
+        fake_journal = MagicMock()
+        fake_journal.Reader.return_value = reader
+        with patch('terraria_admin.blueprints.api.journal', fake_journal), \
+             patch('terraria_admin.blueprints.api.subprocess.Popen') as run:
+            r = auth_client.get('/api/logs?lines=10')
+        assert r.get_json()['lines'] == [
+            '2024-01-01T12:00:00+00:00 terraria: first',
+            '2024-01-01T12:00:01+00:00 terraria: second',
+        ]
+        reader.add_match.assert_called_once_with(_SYSTEMD_UNIT='terraria.service')
+        reader.close.assert_called_once()
+        run.assert_not_called()
+
+    def test_api_logs_empty_journal_falls_through(self, auth_client):
+        reader = MagicMock()
+        reader.get_previous.return_value = {}
+        fake_journal = MagicMock()
+        fake_journal.Reader.return_value = reader
+        with patch('terraria_admin.blueprints.api.journal', fake_journal), \
+             patch('terraria_admin.blueprints.api._JOURNALCTL', None), \
+             patch('terraria_admin.extensions.console_tail', return_value=['buffered']):
+            r = auth_client.get('/api/logs?lines=10')
+        assert r.get_json()['lines'] == ['buffered']
+
     def test_api_logs_lines_capped_at_1000(self, auth_client):
         r = auth_client.get('/api/logs?lines=99999')
         assert r.status_code == 200
@@ -104,6 +282,13 @@ class TestApiLogs:
         # At most 1000 lines returned
         assert len(data.get('lines', [])) <= 1000
 
+    @pytest.mark.parametrize('arg', ['0', '-5'])
+    def test_api_logs_lines_floor_is_1(self, auth_client, arg):
+        with patch('terraria_admin.blueprints.api._read_logs', return_value=[]) as read:
+            r = auth_client.get(f'/api/logs?lines={arg}')
+        assert r.status_code == 200
+        assert read.call_args[0][1] == 1
+
 
 class TestApiMetrics:
     def test_api_metrics_returns_json(self, auth_client):
@@ -114,8 +299,106 @@ class TestApiMetrics:
         assert isinstance(data, dict)
         assert 'error' in data or 'cpu_percent' in data
 
+    def test_api_metrics_without_psutil(self, auth_client):
+        with patch('terraria_admin.blueprints.api._HAS_PSUTIL', False):
+            r = auth_client.get('/api/metrics')
+        assert r.get_json() == {'error': 'psutil not installed'}
+
+    def test_server_process_is_cached_until_it_exits(self):
+        from terraria_admin.blueprints import api
+        proc = MagicMock()
+        proc.info = {'cmdline': ['dotnet', 'tModLoader.dll', '-server']}
+        proc.is_running.return_value = True
+        other = MagicMock()
+        other.info = {'cmdline': ['bash']}
+        api._server_proc = None
+        with patch('psutil.process_iter', return_value=[other, proc]) as scan:
+            assert api._server_process() is proc
+            assert api._server_process() is proc
+            scan.assert_called_once()
+            proc.is_running.return_value = False
+            scan.return_value = [other]
+            assert api._server_process() is None
+            assert scan.call_count == 2
+        api._server_proc = None
+
+    def test_api_metrics_uses_sampled_host_usage(self, auth_client):
+        pytest.importorskip('psutil')
+        from terraria_admin.services import metrics
+        mem = MagicMock(used=2 * 1024 ** 3, total=8 * 1024 ** 3, percent=25.0)
+        with patch.object(metrics, '_latest', (42.0, mem)), \
+             patch('psutil.cpu_percent') as cpu_percent:
+            r = auth_client.get('/api/metrics')
+        data = r.get_json()
+        assert data['cpu_percent'] == 42.0
+        assert data['ram_used_gb'] == 2.0
+        cpu_percent.assert_not_called()
+
 
 class TestLogsPage:
     def test_logs_page_renders(self, auth_client):
         r = auth_client.get('/logs')
         assert r.status_code == 200
+
+
+class TestApiDiag:
+    def test_api_diag_runs_probes_in_one_exec(self, auth_client, mock_docker):
+        from terraria_admin.blueprints.api import _DIAG_PROBES
+        client, _ = mock_docker
+        api = client.api
+        api.inspect_container.return_value = {'State': {'Status': 'running'}, 'Config': {'Tty': True}}
+        api.logs.return_value = b'line one\n'
+        api.exec_create.return_value = {'Id': 'abc'}
+        api.exec_start.return_value = (
+            b'\n---DIAG:terraria_ls---\ntotal 0\n\n---DIAG:dotnet_version---\n8.0.1\n')
+        r = auth_client.get('/api/diag')
+        assert r.status_code == 200
+        data = r.get_json()
+        assert data['docker']['connected'] is True
+        assert data['container']['status'] == 'running'
+        assert data['container']['tty'] is True
+        assert data['container']['logs_last'] == ['line one']
+        api.exec_create.assert_called_once()
+        api.exec_start.assert_called_once_with('abc')
+        client.containers.get.assert_not_called()
+        assert data['container']['terraria_ls'] == 'total 0'
+        assert data['container']['dotnet_version'] == '8.0.1'
+        assert data['container']['env_ld'] == '(no output)'
+        assert set(key for key, _ in _DIAG_PROBES) <= set(data['container'])
+
+    def test_diag_script_output_parses_back(self):
+        import subprocess
+        from terraria_admin.blueprints.api import _parse_diag_output
+        script = ("printf '\\n---DIAG:a---\\n'; ( printf 'no newline' ) 2>&1\n"
+                  "printf '\\n---DIAG:b---\\n'; ( echo out; echo err >&2 ) 2>&1")
+        out = subprocess.run(['sh', '-c', script], capture_output=True).stdout
+        assert _parse_diag_output(out) == {'a': 'no newline', 'b': 'out\nerr'}
+
+    def test_api_diag_rereads_serverconfig_only_when_changed(self, auth_client, app, mock_docker):
+        mock_docker[0].api.inspect_container.return_value = {'State': {'Status': 'exited'}}
+        mock_docker[0].api.logs.return_value = b''
+        cfg = app.terraria_config
+        with open(cfg.CONFIG_FILE, 'w') as f:
+            f.write('maxplayers=8\n')
+        assert auth_client.get('/api/diag').get_json()['serverconfig']['content'] == 'maxplayers=8\n'
+        with patch('builtins.open', side_effect=AssertionError('re-read')):
+            from terraria_admin.blueprints.api import _serverconfig_text
+            assert _serverconfig_text(cfg.CONFIG_FILE) == 'maxplayers=8\n'
+        with open(cfg.CONFIG_FILE, 'w') as f:
+            f.write('maxplayers=16\n')
+        assert auth_client.get('/api/diag').get_json()['serverconfig']['content'] == 'maxplayers=16\n'
+
+    def test_api_diag_reconnects_stale_docker_client(self, auth_client):
+        stale = MagicMock()
+        stale.ping.side_effect = ConnectionError('socket closed')
+        fresh = MagicMock()
+        fresh.api.inspect_container.side_effect = Exception('no container')
+        with patch('docker.from_env', side_effect=[stale, fresh]):
+            data = auth_client.get('/api/diag').get_json()
+        assert data['docker']['connected'] is True
+        stale.close.assert_called_once()
+        fresh.ping.assert_called_once()
+
+    def test_api_diag_requires_auth(self, client):
+        r = client.get('/api/diag')
+        assert r.status_code == 302
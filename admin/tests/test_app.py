@@ -0,0 +1,154 @@
+"""Tests for app-level wiring in create_app (error handlers, body limits, JSON provider, URL map, template cache)."""
+import io
+import os
+import stat
+from unittest.mock import patch
+
+import pytest
+from werkzeug.exceptions import InternalServerError, RequestEntityTooLarge
+
+
+class TestErrorHandlers:
+    def test_404_logged_in_renders_error_page(self, auth_client):
+        r = auth_client.get('/no-such-page')
+        assert r.status_code == 404
+        assert r.mimetype == 'text/html'
+        assert b'404' in r.data
+        assert b'Page not found' in r.data
+
+    def test_404_page_shows_pending_flash(self, auth_client):
+        with auth_client.session_transaction() as sess:
+            sess['_flashes'] = [('error', 'Backup not found')]
+        r = auth_client.get('/no-such-page')
+        assert r.status_code == 404
+        assert b'Backup not found' in r.data
+
+    def test_404_logged_out_redirects_to_login(self, client):
+        r = client.get('/no-such-page')
+        assert r.status_code == 302
+        assert '/login' in r.headers['Location']
+
+    def test_404_api_returns_json(self, auth_client):
+        r = auth_client.get('/api/no-such-endpoint')
+        assert r.status_code == 404
+        assert r.get_json() == {'error': 'Not found', 'status': 404}
+
+    def test_500_renders_error_page(self, app):
+        handler = app.error_handler_spec[None][500][InternalServerError]
+        with app.test_request_context('/boom'):
+            r = app.make_response(handler(InternalServerError()))
+        assert r.status_code == 500
+        assert b'Internal server error' in r.data
+
+
+class TestFormBodyLimit:
+    def test_oversized_form_rejected_before_handler(self, auth_client):
+        with patch('terraria_admin.blueprints.world.screen_send') as mock_send:
+            r = auth_client.post('/world/broadcast',
+                                 data={'message': 'x' * (80 * 1024)})
+        assert r.status_code == 302
+        mock_send.assert_not_called()
+
+    def test_oversized_api_body_returns_413(self, auth_client):
+        r = auth_client.post('/api/console/send', data=b'{}' + b' ' * (80 * 1024),
+                             content_type='application/json')
+        assert r.status_code == 413
+
+    def test_upload_endpoint_keeps_full_limit(self, app):
+        with app.test_request_context('/mods/upload', method='POST',
+                                      data=b'x' * (80 * 1024)):
+            # Raises 413 if the upload were held to the form limit.
+            assert app.preprocess_request() is None
+
+    @staticmethod
+    def _chunked_context(app, body):
+        # The test builder always sets CONTENT_LENGTH; a chunked request as a
+        # terminating server (gunicorn) hands it over carries none.
+        return app.test_request_context(
+            '/world/broadcast', method='POST', input_stream=io.BytesIO(body),
+            content_type='application/x-www-form-urlencoded',
+            headers={'Transfer-Encoding': 'chunked'},
+            environ_overrides={'wsgi.input_terminated': True})
+
+    def test_oversized_chunked_body_returns_413(self, app):
+        with self._chunked_context(app, b'message=' + b'x' * (80 * 1024)):
+            with pytest.raises(RequestEntityTooLarge):
+                app.preprocess_request()
+
+    def test_small_chunked_body_still_parses(self, app):
+        from flask import request
+        with self._chunked_context(app, b'message=hello'):
+            assert request.content_length is None
+            assert app.preprocess_request() is None
+            assert request.form['message'] == 'hello'
+
+
+class TestJsonProvider:
+    def test_jsonify_keeps_insertion_order(self, app):
+        pytest.importorskip('orjson')
+        from flask import jsonify
+        with app.test_request_context():
+            r = jsonify({'b': 1, 'a': [1, 2], 3: 'x'})
+        assert r.mimetype == 'application/json'
+        assert r.get_data() == b'{"b":1,"a":[1,2],"3":"x"}'
+
+
+class TestUrlMap:
+    def test_each_route_registered_once(self, app):
+        seen = set()
+        for rule in app.url_map.iter_rules():
+            key = (rule.rule, frozenset(rule.methods))
+            assert key not in seen, f'duplicate route {rule.rule}'
+            seen.add(key)
+
+    def test_each_blueprint_registered_once(self, app):
+        endpoints = [rule.endpoint for rule in app.url_map.iter_rules()]
+        assert len(endpoints) == len(set(endpoints))
+
+
+class TestTemplateCache:
+    def test_bytecode_cache_written_to_configured_dir(self, app, tmp_path):
+        from flask import render_template
+        from terraria_admin import create_app
+        base = type(app.terraria_config)
+
+        class CachedConfig(base):
+            JINJA_CACHE_DIR = str(tmp_path / 'jinja')
+
+        cached_app = create_app(config_class=CachedConfig)
+        with cached_app.test_request_context():
+            render_template('error.html', code=404, message='Page not found')
+        assert any(p.suffix == '.cache' for p in (tmp_path / 'jinja').iterdir())
+        assert cached_app.jinja_env.bytecode_cache is not None
+
+    def test_bytecode_cache_disabled_without_dir(self, app):
+        assert app.jinja_env.bytecode_cache is None
+
+    def _create(self, app, cache_dir):
+        from terraria_admin import create_app
+
+        class CachedConfig(type(app.terraria_config)):
+            JINJA_CACHE_DIR = cache_dir
+
+        return create_app(config_class=CachedConfig)
+
+    def test_bytecode_cache_unset_uses_jinja_private_dir(self, app):
+        cache = self._create(app, None).jinja_env.bytecode_cache
+        assert cache is not None
+        st = os.lstat(cache.directory)
+        assert st.st_uid == os.getuid()
+        assert stat.S_IMODE(st.st_mode) == 0o700
+
+    def test_bytecode_cache_refuses_shared_dir(self, app, tmp_path):
+        shared = tmp_path / 'shared'
+        shared.mkdir(mode=0o777)
+        shared.chmod(0o777)
+        assert self._create(app, str(shared)).jinja_env.bytecode_cache is None
+        assert list(shared.iterdir()) == []
+
+    def test_bytecode_cache_refuses_symlink(self, app, tmp_path):
+        target = tmp_path / 'target'
+        target.mkdir(mode=0o700)
+        link = tmp_path / 'link'
+        link.symlink_to(target)
+        assert self._create(app, str(link)).jinja_env.bytecode_cache is None
@@ -59,6 +59,18 @@ class TestBackupService:
         mtimes = [b['mtime'] for b in backups]
         assert mtimes == sorted(mtimes, reverse=True)
 
+    def test_list_backups_sums_only_wld_files(self, tmp_path):
+        cfg = FakeCfg(str(tmp_path))
+        bdir = os.path.join(cfg.BACKUPS_DIR, 'manual_20240101_000000')
+        os.makedirs(bdir)
+        for fname, size in (('a.wld', 512 * 1024), ('b.wld', 512 * 1024), ('a.twld', 4096)):
+            with open(os.path.join(bdir, fname), 'wb') as f:
+                f.write(b'\x00' * size)
+
+        [backup] = list_backups(cfg)
+        assert sorted(backup['files']) == ['a.wld', 'b.wld']
+        assert backup['size_mb'] == 1.0
+
     def test_list_backups_label_detection(self, tmp_path):
         cfg = FakeCfg(str(tmp_path))
         os.makedirs(cfg.WORLDS_DIR)
@@ -129,6 +141,28 @@ class TestBackupRoutes:
         assert r.status_code == 200
         assert b'Invalid backup name' in r.data
 
+    def test_safe_backup_path_rejects_symlink_escape(self, tmp_path):
+        from unittest.mock import MagicMock
+        from terraria_admin.blueprints.backups import _safe_backup_path
+        cfg = MagicMock()
+        cfg.BACKUPS_DIR = str(tmp_path / 'backups')
+        os.makedirs(os.path.join(cfg.BACKUPS_DIR, 'inside'))
+        os.symlink(str(tmp_path), os.path.join(cfg.BACKUPS_DIR, 'escape'))
+        os.symlink('inside', os.path.join(cfg.BACKUPS_DIR, 'alias'))
+        assert _safe_backup_path('escape', cfg) is None
+        assert _safe_backup_path('alias', cfg) == os.path.join(cfg.BACKUPS_DIR, 'alias')
+
+    def test_safe_backup_path_skips_realpath_for_plain_dirs(self, tmp_path):
+        from unittest.mock import MagicMock, patch
+        from terraria_admin.blueprints.backups import _safe_backup_path
+        cfg = MagicMock()
+        cfg.BACKUPS_DIR = str(tmp_path)
+        os.makedirs(tmp_path / 'world_20240101_000000')
+        with patch('terraria_admin.blueprints.backups.os.path.realpath') as realpath:
+            assert _safe_backup_path('world_20240101_000000', cfg) == \
+                os.path.join(str(tmp_path), 'world_20240101_000000')
+        realpath.assert_not_called()
+
     def test_backups_delete_nonexistent(self, auth_client):
         r = auth_client.post('/backups/delete',
                              data={'backup_name': 'nonexistent_20000101_000000'},
@@ -165,3 +199,218 @@ class TestBackupRoutes:
         assert r.status_code == 200
         assert b'deleted' in r.data.lower()
         assert not os.path.isdir(os.path.join(cfg.BACKUPS_DIR, name))
+
+
+class TestBackupRestore:
+    def test_restore_copies_regular_wld_files_only(self, auth_client, app, tmp_path):
+        from unittest.mock import patch
+        cfg = app.terraria_config
+        name = 'manual_restore_test'
+        path = os.path.join(cfg.BACKUPS_DIR, name)
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, 'Restored.wld'), 'wb') as f:
+            f.write(b'restored world')
+        outside = tmp_path / 'outside.wld'
+        outside.write_bytes(b'not a backup')
+        os.symlink(outside, os.path.join(path, 'Linked.wld'))
+        try:
+            with patch('terraria_admin.blueprints.backups.container_action') as action:
+                r = auth_client.post('/backups/restore', data={'backup_name': name})
+            assert r.status_code == 302
+            assert [c.args[0] for c in action.call_args_list] == ['stop', 'start']
+            with open(os.path.join(cfg.WORLDS_DIR, 'Restored.wld'), 'rb') as f:
+                assert f.read() == b'restored world'
+            assert not os.path.exists(os.path.join(cfg.WORLDS_DIR, 'Restored.wld.new'))
+            assert not os.path.exists(os.path.join(cfg.WORLDS_DIR, 'Linked.wld'))
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+            for fname in ('Restored.wld', 'Linked.wld'):
+                try:
+                    os.remove(os.path.join(cfg.WORLDS_DIR, fname))
+                except FileNotFoundError:
+                    pass
+
+    def test_restore_failure_keeps_existing_world(self, auth_client, app):
+        from unittest.mock import patch
+        cfg = app.terraria_config
+        name = 'manual_restore_fail'
+        path = os.path.join(cfg.BACKUPS_DIR, name)
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, 'Kept.wld'), 'wb') as f:
+            f.write(b'backup copy')
+        live = os.path.join(cfg.WORLDS_DIR, 'Kept.wld')
+        with open(live, 'wb') as f:
+            f.write(b'live world')
+        def partial_copy(src, dst, **kwargs):
+            with open(dst, 'wb') as f:
+                f.write(b'half')
+            raise OSError('disk full')
+
+        try:
+            with patch('terraria_admin.blueprints.backups.container_action') as action, \
+                 patch('terraria_admin.blueprints.backups.fast_copy', side_effect=partial_copy):
+                r = auth_client.post('/backups/restore', data={'backup_name': name},
+                                     follow_redirects=True)
+            assert b'Restore failed' in r.data
+            with open(live, 'rb') as f:
+                assert f.read() == b'live world'
+            assert not os.path.exists(live + '.new')
+            assert [c.args[0] for c in action.call_args_list] == ['stop', 'start']
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+            os.remove(live)
+
+
+class TestFastCopy:
+    def test_fast_copy_copies_and_truncates(self, tmp_path):
+        from terraria_admin.services.backups import fast_copy
+        src = tmp_path / 'a.wld'
+        dst = tmp_path / 'b.wld'
+        src.write_bytes(os.urandom(3 * 1024 * 1024 + 7))
+        dst.write_bytes(b'x' * (8 * 1024 * 1024))
+        fast_copy(str(src), str(dst))
+        assert dst.read_bytes() == src.read_bytes()
+
+    def test_fast_copy_falls_back_when_unsupported(self, tmp_path):
+        import errno
+        from unittest.mock import patch
+        from terraria_admin.services.backups import fast_copy
+        src = tmp_path / 'a.wld'
+        dst = tmp_path / 'b.wld'
+        src.write_bytes(b'world data')
+        with patch('os.copy_file_range', create=True,
+                   side_effect=OSError(errno.EXDEV, 'cross-device')):
+            fast_copy(str(src), str(dst))
+        assert dst.read_bytes() == b'world data'
+
+    def test_fallback_uses_large_buffer_without_patching_shutil(self, tmp_path):
+        import errno
+        from unittest.mock import patch
+        from terraria_admin.services.backups import fast_copy
+        src = tmp_path / 'a.wld'
+        src.write_bytes(b'world data')
+        assert shutil.COPY_BUFSIZE < 1 << 20
+        with patch('os.copy_file_range', create=True,
+                   side_effect=OSError(errno.EXDEV, 'cross-device')), \
+             patch('shutil.copyfileobj', wraps=shutil.copyfileobj) as copy:
+            fast_copy(str(src), str(tmp_path / 'b.wld'))
+        assert copy.call_args.kwargs['length'] == 1 << 20
+
+    @pytest.mark.parametrize('has_copy_file_range', [True, False])
+    def test_fast_copy_refuses_symlink_without_follow(self, tmp_path, has_copy_file_range):
+        from unittest.mock import patch
+        from terraria_admin.services.backups import fast_copy
+        target = tmp_path / 'secret'
+        target.write_bytes(b'x')
+        link = tmp_path / 'a.wld'
+        link.symlink_to(target)
+        with patch('terraria_admin.services.backups.hasattr',
+                   create=True, return_value=has_copy_file_range), \
+             pytest.raises(OSError):
+            fast_copy(str(link), str(tmp_path / 'b.wld'), follow_symlinks=False)
+        assert not (tmp_path / 'b.wld').exists()
+
+    def test_create_backup_follows_symlinked_world(self, tmp_path):
+        cfg = FakeCfg(str(tmp_path))
+        os.makedirs(cfg.WORLDS_DIR)
+        target = tmp_path / 'elsewhere.wld'
+        target.write_bytes(b'linked world')
+        os.symlink(target, os.path.join(cfg.WORLDS_DIR, 'Linked.wld'))
+        name, err = create_backup(cfg)
+        assert err is None
+        with open(os.path.join(cfg.BACKUPS_DIR, name, 'Linked.wld'), 'rb') as f:
+            assert f.read() == b'linked world'
+
+    def test_create_backup_keeps_world_mtime(self, tmp_path):
+        cfg = FakeCfg(str(tmp_path))
+        os.makedirs(cfg.WORLDS_DIR)
+        src = os.path.join(cfg.WORLDS_DIR, 'w.wld')
+        with open(src, 'wb') as f:
+            f.write(b'world' * 1000)
+        os.utime(src, (1_600_000_000, 1_600_000_000))
+
+        name, err = create_backup(cfg)
+        assert err is None
+        copied = os.path.join(cfg.BACKUPS_DIR, name, 'w.wld')
+        with open(copied, 'rb') as f:
+            assert f.read() == b'world' * 1000
+        assert os.stat(copied).st_mtime == 1_600_000_000
+
+
+class TestBackupDownload:
+    def test_download_streams_zip_of_backup(self, auth_client, app):
+        import io
+        import zipfile
+        cfg = app.terraria_config
+        name = 'manual_download_test'
+        path = os.path.join(cfg.BACKUPS_DIR, name)
+        os.makedirs(path, exist_ok=True)
+        payload = os.urandom(2 * 1024 * 1024 + 3)
+        with open(os.path.join(path, 'World.wld'), 'wb') as f:
+            f.write(payload)
+        try:
+            r = auth_client.get(f'/backups/download/{name}')
+            assert r.status_code == 200
+            assert r.is_streamed
+            assert r.mimetype == 'application/zip'
+            assert f'filename={name}.zip' in r.headers['Content-Disposition']
+            with zipfile.ZipFile(io.BytesIO(r.get_data())) as zf:
+                assert zf.testzip() is None
+                assert zf.namelist() == ['World.wld']
+                assert zf.read('World.wld') == payload
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def test_stream_zip_deflates_worlds_and_stores_compressed(self, tmp_path):
+        import io
+        import zipfile
+        from terraria_admin.blueprints.backups import _stream_zip
+        world = b'\x00' * 200000 + b'tiles' * 1000
+        packed = b'\x1f\x8b' + os.urandom(4096)
+        (tmp_path / 'Big.wld').write_bytes(world)
+        (tmp_path / 'extra.gz').write_bytes(packed)
+        data = b''.join(_stream_zip(str(tmp_path), chunk_size=65536))
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            assert zf.getinfo('Big.wld').compress_type == zipfile.ZIP_DEFLATED
+            assert zf.getinfo('Big.wld').compress_size < len(world) // 10
+            assert zf.getinfo('extra.gz').compress_type == zipfile.ZIP_STORED
+            assert zf.read('Big.wld') == world
+            assert zf.read('extra.gz') == packed
+
+    def test_stream_zip_entries_are_level_1_deflate(self, tmp_path):
+        import io
+        import struct
+        import zipfile
+        import zlib
+        from terraria_admin.blueprints.backups import _stream_zip
+        world = bytes(range(256)) * 2000 + b'tiles' * 5000
+        (tmp_path / 'World.wld').write_bytes(world)
+        data = b''.join(_stream_zip(str(tmp_path), chunk_size=65536))
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            info = zf.getinfo('World.wld')
+        # Compression method as written in the entry's local header.
+        off = info.header_offset
+        assert data[off:off + 4] == b'PK\x03\x04'
+        assert struct.unpack_from('<H', data, off + 8)[0] == zipfile.ZIP_DEFLATED
+        name_len, extra_len = struct.unpack_from('<HH', data, off + 26)
+        start = off + 30 + name_len + extra_len
+        raw = data[start:start + info.compress_size]
+        level1 = zlib.compressobj(1, zlib.DEFLATED, -15)
+        assert raw == level1.compress(world) + level1.flush()
+        assert zlib.decompress(raw, -15) == world
+
+    def test_stream_zip_read_error_is_logged_and_raised(self, tmp_path, caplog):
+        from terraria_admin.blueprints.backups import _stream_zip
+        (tmp_path / 'a.wld').write_bytes(b'a' * 1000)
+        (tmp_path / 'b.wld').write_bytes(b'b' * 1000)
+        stream = _stream_zip(str(tmp_path), chunk_size=100)
+        next(stream)
+        (tmp_path / 'b.wld').unlink()
+        # Ending quietly would hand the client a truncated zip.
+        with pytest.raises(FileNotFoundError):
+            b''.join(stream)
+        assert 'aborted' in caplog.text
+
+    def test_download_unknown_backup_redirects(self, auth_client):
+        r = auth_client.get('/backups/download/does_not_exist')
+        assert r.status_code == 302
@@ -0,0 +1,123 @@
+"""Tests for the /config page, its parsed-file cache and the update script runner."""
+import os
+import subprocess
+from unittest.mock import patch
+
+import pytest
+
+from terraria_admin.blueprints import config_bp
+
+
+@pytest.fixture(autouse=True)
+def _clear_cfg_cache():
+    config_bp._CFG_CACHE.clear()
+    yield
+    config_bp._CFG_CACHE.clear()
+
+
+class TestConfigCache:
+    def test_load_kv_parses_and_skips_comments(self, tmp_path):
+        path = tmp_path / 'serverconfig.txt'
+        path.write_text('# comment\nmaxplayers = 8\n\nmotd=Hi=there\nbroken line\n')
+        assert config_bp._load_kv(str(path)) == {'maxplayers': '8', 'motd': 'Hi=there'}
+
+    def test_load_kv_missing_file(self, tmp_path):
+        assert config_bp._load_kv(str(tmp_path / 'nope.txt')) == {}
+
+    def test_load_kv_reparses_only_when_file_changes(self, tmp_path):
+        path = tmp_path / 'serverconfig.txt'
+        path.write_text('maxplayers=8\n')
+        assert config_bp._load_kv(str(path))['maxplayers'] == '8'
+        with patch.object(config_bp, 'parse_kv', side_effect=AssertionError('re-parsed')):
+            assert config_bp._load_kv(str(path))['maxplayers'] == '8'
+        path.write_text('maxplayers=16\n')
+        assert config_bp._load_kv(str(path))['maxplayers'] == '16'
+
+    def test_load_kv_returns_independent_copies(self, tmp_path):
+        path = tmp_path / 'serverconfig.txt'
+        path.write_text('maxplayers=8\n')
+        config_bp._load_kv(str(path))['maxplayers'] = 'mutated'
+        assert config_bp._load_kv(str(path))['maxplayers'] == '8'
+
+    def test_load_tshock_settings_and_bad_json(self, tmp_path):
+        path = tmp_path / 'config.json'
+        path.write_text('{"Settings": {"ServerPassword": "x"}}')
+        assert config_bp._load_tshock(str(path)) == {'ServerPassword': 'x'}
+        path.write_text('{not json')
+        assert config_bp._load_tshock(str(path)) == {}
+
+
+class TestParseKv:
+    def test_parse_kv_matches_line_parser_rules(self, tmp_path):
+        from terraria_admin.services.config_parse import parse_kv
+        path = tmp_path / 'serverconfig.txt'
+        path.write_bytes(b'  # indented comment\r\n world = /w/A.wld \r\npassword=a=b\r\nnoequals\r\n\r\n')
+        assert parse_kv(str(path)) == {'world': '/w/A.wld', 'password': 'a=b'}
+
+
+class TestConfigPaths:
+    def test_derived_paths_computed_once_per_instance(self, tmp_path):
+        from terraria_admin.config import Config
+        cfg = Config()
+        cfg.TERRARIA_DIR = str(tmp_path)
+        assert cfg.CONFIG_FILE == os.path.join(str(tmp_path), 'serverconfig.txt')
+        assert cfg.WORLDS_DIR is cfg.WORLDS_DIR
+        assert 'BACKUPS_DIR' not in vars(cfg)
+        cfg.BACKUPS_DIR
+        assert 'BACKUPS_DIR' in vars(cfg)
+
+
+class TestDotenv:
+    def test_dotenv_loaded_once_per_environment(self, monkeypatch):
+        from terraria_admin import config
+        monkeypatch.delenv('_DOTENV_LOADED', raising=False)
+        with patch.object(config, 'load_dotenv') as load:
+            config._load_dotenv_once()
+            config._load_dotenv_once()
+        load.assert_called_once_with()
+        assert os.environ['_DOTENV_LOADED'] == '1'
+
+
+class TestConfigPage:
+    def test_config_page_renders_server_config(self, auth_client, app):
+        cfg = app.terraria_config
+        with open(cfg.CONFIG_FILE, 'w') as f:
+            f.write('maxplayers=12\nmotd=Welcome aboard\n')
+        with patch('terraria_admin.blueprints.config_bp.get_version_info',
+                   return_value={'current': '1.0', 'latest': '1.0', 'update_available': False}):
+            r = auth_client.get('/config')
+        assert r.status_code == 200
+        assert b'Welcome aboard' in r.data
+
+    def test_config_page_requires_auth(self, client):
+        r = client.get('/config')
+        assert r.status_code == 302
+
+
+class TestUpdateScript:
+    def test_failure_keeps_only_output_tail(self, tmp_path):
+        script = tmp_path / 'update.sh'
+        script.write_text('for i in $(seq 1 500); do echo "line $i"; done\necho boom >&2\nexit 3\n')
+        returncode, tail = config_bp._run_update_script(str(script), str(tmp_path))
+        assert returncode == 3
+        lines = tail.splitlines()
+        assert len(lines) == config_bp._UPDATE_TAIL_LINES
+        assert lines[-1] == 'boom'
+        assert 'line 1\n' not in tail
+
+    def test_timeout_kills_script(self, tmp_path):
+        script = tmp_path / 'update.sh'
+        script.write_text('exec sleep 30\n')
+        with pytest.raises(subprocess.TimeoutExpired):
+            config_bp._run_update_script(str(script), str(tmp_path), timeout=0.2)
+
+    def test_update_route_flashes_tail_on_failure(self, auth_client, app):
+        script = os.path.join(app.terraria_config.TERRARIA_DIR, 'update.sh')
+        with open(script, 'w') as f:
+            f.write('echo "download failed"\nexit 1\n')
+        try:
+            r = auth_client.post('/update', follow_redirects=True)
+        finally:
+            os.remove(script)
+        assert r.status_code == 200
+        assert b'Update failed: download failed' in r.data
@@ -52,6 +52,14 @@ class TestConsoleRoutes:
         data = r.get_json()
         assert data['lines'] == []
 
+    def test_api_console_lines_up_to_date_poll_skips_lock(self, auth_client):
+        from terraria_admin import extensions
+        seq = extensions.console_seq
+        with patch('terraria_admin.blueprints.console.console_since') as locked_read:
+            r = auth_client.get(f'/api/console/lines?since={seq}')
+        locked_read.assert_not_called()
+        assert r.get_json() == {'lines': [], 'total': seq}
+
     def test_api_console_lines_since_beyond_total_clamped(self, auth_client):
         """since > len(buf) must not raise — it is clamped to len(buf)."""
         r = auth_client.get('/api/console/lines?since=99999999')
@@ -59,6 +67,27 @@ class TestConsoleRoutes:
         data = r.get_json()
         assert data['lines'] == []
 
+    def test_api_console_lines_returns_ordered_tail_after_eviction(self, auth_client):
+        from terraria_admin import extensions
+        from terraria_admin.extensions import console_buffer, console_lock, MAX_CONSOLE_LINES
+        with console_lock:
+            start = extensions.console_seq
+            for i in range(MAX_CONSOLE_LINES + 10):
+                console_buffer.append(f'evict-{i}')
+                extensions.console_seq += 1
+            seq = extensions.console_seq
+
+        data = auth_client.get(f'/api/console/lines?since={seq - 3}').get_json()
+        assert data['lines'] == [f'evict-{MAX_CONSOLE_LINES + 7}', f'evict-{MAX_CONSOLE_LINES + 8}',
+                                 f'evict-{MAX_CONSOLE_LINES + 9}']
+        # A cursor older than the buffer is clamped to its oldest line.
+        data = auth_client.get(f'/api/console/lines?since={start}').get_json()
+        assert len(data['lines']) == MAX_CONSOLE_LINES
+        assert data['lines'][0] == 'evict-10'
+        # Leave room in the shared buffer for the poller tests' len() checks.
+        with console_lock:
+            console_buffer.clear()
+
     def test_api_console_lines_requires_auth(self, client):
         r = client.get('/api/console/lines?since=0')
         assert r.status_code == 302
@@ -135,6 +164,63 @@ class TestCheckPlayerEvent:
     def test_case_insensitive_join(self):
         calls = self._run('dave HAS JOINED')
         assert len(calls) == 1
+        assert '**dave**' in calls[0][0]
+
+    def test_event_without_name_reports_someone(self):
+        calls = self._run('has joined')
+        assert calls[0][0] == '**Someone** joined the server'
+
+    def test_word_boundary_required(self):
+        assert self._run('Zed has leftovers') == []
+
+    def test_event_mid_line_uses_preceding_word(self):
+        calls = self._run('[12:00:01] [Server] Erin has disconnected (timeout)')
+        assert calls == [('**Erin** left the server', {'color': 0xd29922, 'event': 'leave'})]
+
+    def _run_from(self, line, source):
+        from terraria_admin.services.console import check_player_event
+        calls = []
+        check_player_event(line, object(), lambda msg, cfg, **kw: calls.append(msg), source)
+        return calls
+
+    def test_duplicate_event_from_second_poller_dropped(self):
+        assert len(self._run_from('Fay has joined', 'docker')) == 1
+        assert self._run_from('[12:00:01] [Server/INFO]: Fay has joined', 'file') == []
+        assert len(self._run_from('Fay has left', 'file')) == 1
+        assert self._run_from('Fay has left', 'docker') == []
+
+    def test_quick_rejoin_still_notified(self):
+        lines = ['Hal has joined', 'Hal has left', 'Hal has joined']
+        fired = [self._run_from(l, 'docker') for l in lines]
+        assert all(len(c) == 1 for c in fired)
+        # The file poller catching up later reports nothing new.
+        assert all(self._run_from(l, 'file') == [] for l in lines)
+
+    def test_same_poller_repeat_always_notified(self):
+        assert len(self._run('Ivy has joined')) == 1
+        assert len(self._run('Ivy has joined')) == 1
+
+    def test_other_poller_copy_fires_after_window(self):
+        from terraria_admin.services import console
+        assert len(self._run_from('Gus has joined', 'docker')) == 1
+        with patch.object(console.time, 'monotonic',
+                          return_value=time.monotonic() + console._EVENT_DEDUP_SECONDS + 1):
+            assert len(self._run_from('Gus has joined', 'file')) == 1
+
+
+class TestDirWatcher:
+    def test_returns_none_without_inotify(self, tmp_path):
+        from terraria_admin.services.console import _dir_watcher
+        with patch.dict('sys.modules', {'inotify_simple': None}):
+            assert _dir_watcher(str(tmp_path)) is None
+
+    def test_watches_log_directory(self, tmp_path):
+        from terraria_admin.services.console import _dir_watcher
+        fake = MagicMock()
+        with patch.dict('sys.modules', {'inotify_simple': fake}):
+            watcher = _dir_watcher(str(tmp_path))
+        assert watcher is fake.INotify.return_value
+        assert watcher.add_watch.call_args[0][0] == str(tmp_path)
 
 
 # ── Console poller service tests ──────────────────────────────────────────────
@@ -247,6 +333,102 @@ class TestConsolePoller:
         # No entry should contain an embedded newline
         assert all('\n' not in l for l in new_lines)
 
+    def test_strip_ansi_fast_path_returns_same_object(self):
+        from terraria_admin.extensions import strip_ansi
+        plain = '[Server] no colours here'
+        assert strip_ansi(plain) is plain
+        assert strip_ansi('\x1b[32mgreen\x1b[0m text') == 'green text'
+
+    def test_console_tail_and_since(self):
+        from terraria_admin import extensions
+        extensions.console_extend(['tail-a', 'tail-b', 'tail-c'])
+        seq = extensions.console_seq
+        assert extensions.console_tail(2) == ['tail-b', 'tail-c']
+        assert extensions.console_tail(0) == []
+        assert extensions.console_since(seq - 3) == (['tail-a', 'tail-b', 'tail-c'], seq)
+        assert extensions.console_since(seq) == ([], seq)
+
+    def test_console_extend_advances_seq_by_batch_size(self):
+        """A batch is appended in order and bumps console_seq once per line."""
+        from terraria_admin import extensions
+
+        with extensions.console_lock:
+            seq_before = extensions.console_seq
+        extensions.console_extend(['[Server] one', '[Server] two', '[Server] three'])
+        extensions.console_extend([])
+
+        with extensions.console_lock:
+            assert extensions.console_seq == seq_before + 3
+            assert list(extensions.console_buffer)[-3:] == [
+                '[Server] one', '[Server] two', '[Server] three']
+
+    def test_tty_container_reads_attach_socket(self, app):
+        """TTY logs come from one tail call plus the attach socket, not the
+        byte-at-a-time logs stream; split UTF-8 characters survive."""
+        from terraria_admin.extensions import console_buffer, console_lock
+
+        mock_container = MagicMock()
+        mock_container.attrs = {'Config': {'Tty': True}}
+        mock_container.logs.return_value = b'[Server] tail line\n'
+        sock = MagicMock()
+        mock_client = MagicMock()
+        mock_client.containers.get.return_value = mock_container
+        mock_client.api.attach_socket.return_value = sock
+        frames = [(1, b'[Server] caf\xc3'), (1, b'\xa9 live\n')]
+
+        done = threading.Event()
+
+        def fake_sleep(t):
+            done.set()
+            raise SystemExit
+
+        with console_lock:
+            before = len(console_buffer)
+
+        with patch('docker.from_env', return_value=mock_client), \
+             patch('docker.utils.socket.frames_iter', return_value=iter(frames)), \
+             patch('terraria_admin.services.console.time.sleep', side_effect=fake_sleep):
+            from terraria_admin.services.console import start_console_poller
+            start_console_poller(app)
+            done.wait(timeout=3)
+
+        with console_lock:
+            new_lines = list(console_buffer)[before:]
+
+        assert new_lines[-2:] == ['[Server] tail line', '[Server] café live']
+        assert 'stream' not in mock_container.logs.call_args[1]
+        sock.close.assert_called_once()
+
+    def test_poller_applies_carriage_return_overwrites(self, app):
+        """Progress lines redrawn with \\r keep only their final state."""
+        from terraria_admin.extensions import console_buffer, console_lock
+
+        chunks = [b'Loading 10%\rLoading 50%', b'\rLoading 100%\n[Server] ready\n']
+        mock_container = MagicMock()
+        mock_container.logs.return_value = iter(chunks)
+        mock_client = MagicMock()
+        mock_client.containers.get.return_value = mock_container
+
+        done = threading.Event()
+
+        def fake_sleep(t):
+            done.set()
+            raise SystemExit
+
+        with console_lock:
+            before = len(console_buffer)
+
+        with patch('docker.from_env', return_value=mock_client), \
+             patch('terraria_admin.services.console.time.sleep', side_effect=fake_sleep):
+            from terraria_admin.services.console import start_console_poller
+            start_console_poller(app)
+            done.wait(timeout=3)
+
+        with console_lock:
+            new_lines = list(console_buffer)[before:]
+
+        assert new_lines[-2:] == ['Loading 100%', '[Server] ready']
+
     def test_poller_strips_ansi_codes(self, app):
         """ANSI escape sequences must be removed from log lines."""
         from terraria_admin.extensions import console_buffer, console_lock
@@ -285,7 +467,7 @@ class TestConsolePoller:
 
         call_count = {'n': 0}
 
-        def fake_from_env():
+        def fake_from_env(**kwargs):
             call_count['n'] += 1
             if call_count['n'] == 1:
                 raise Exception('Docker not available')
@@ -314,6 +496,57 @@ class TestConsolePoller:
         # Must have retried at least once after the initial failure
         assert call_count['n'] >= 2, 'poller must reconnect after Docker error'
 
+    def test_poller_keeps_client_while_container_missing(self, app):
+        """'No such container' is retried on the same shared client."""
+        import docker
+
+        mock_client = MagicMock()
+        mock_client.containers.get.side_effect = docker.errors.NotFound('no such container')
+
+        done = threading.Event()
+        sleep_count = {'n': 0}
+
+        def fake_sleep(t):
+            sleep_count['n'] += 1
+            if sleep_count['n'] >= 3:
+                done.set()
+                raise SystemExit
+
+        with patch('docker.from_env', return_value=mock_client) as from_env, \
+             patch('terraria_admin.services.console.time.sleep', side_effect=fake_sleep):
+            from terraria_admin.services.console import start_console_poller
+            start_console_poller(app)
+            assert done.wait(timeout=4)
+
+        assert mock_client.containers.get.call_count >= 3
+        from_env.assert_called_once()
+        mock_client.close.assert_not_called()
+
+    @pytest.mark.parametrize('error, resets', [
+        (ValueError('bad frame'), False),
+        (ConnectionResetError('reset by peer'), True),
+    ])
+    def test_poller_resets_client_only_on_connection_errors(self, app, error, resets):
+        mock_container = MagicMock()
+        mock_container.attrs = {'Config': {'Tty': False}}
+        mock_container.logs.side_effect = error
+        mock_client = MagicMock()
+        mock_client.containers.get.return_value = mock_container
+
+        done = threading.Event()
+
+        def fake_sleep(t):
+            done.set()
+            raise SystemExit
+
+        with patch('docker.from_env', return_value=mock_client), \
+             patch('terraria_admin.services.console.time.sleep', side_effect=fake_sleep):
+            from terraria_admin.services.console import start_console_poller
+            start_console_poller(app)
+            assert done.wait(timeout=4)
+
+        assert mock_client.close.called is resets
+
     def test_poller_respects_max_console_lines(self, app):
         """Buffer must not exceed MAX_CONSOLE_LINES."""
         from terraria_admin.extensions import console_buffer, console_lock, MAX_CONSOLE_LINES
@@ -344,3 +577,66 @@ class TestConsolePoller:
 
         with console_lock:
             assert len(console_buffer) <= MAX_CONSOLE_LINES
+
+    def test_file_poller_publishes_drained_lines_as_one_batch(self, tmp_path):
+        import types
+        log_file = tmp_path / 'server.log'
+        log_file.write_text('[Server] one\n\n[Server] two\nAmy has joined.\n')
+        cfg = types.SimpleNamespace(LOG_FILE=str(log_file), SERVER_CONTAINER='terraria-server')
+        fake_app = types.SimpleNamespace(terraria_config=cfg)
+
+        batches = []
+        events = []
+        done = threading.Event()
+
+        def fake_sleep(t):
+            if t == 0.5:   # file poller finished its first drain
+                done.set()
+            raise SystemExit
+
+        with patch('docker.from_env', side_effect=RuntimeError('no docker')), \
+             patch('terraria_admin.services.console._dir_watcher', return_value=None), \
+             patch('terraria_admin.services.console.console_extend', side_effect=batches.append), \
+             patch('terraria_admin.services.console.check_player_event',
+                   side_effect=lambda line, *a: events.append(line)), \
+             patch('terraria_admin.services.console.time.sleep', side_effect=fake_sleep):
+            from terraria_admin.services.console import start_console_poller
+            start_console_poller(fake_app)
+            assert done.wait(timeout=5)
+
+        assert batches == [['[Server] one', '[Server] two', 'Amy has joined.']]
+        assert events == batches[0]
+
+    def test_file_poller_rearms_watch_after_log_dir_deleted(self, tmp_path):
+        import types
+        log_file = tmp_path / 'server.log'
+        log_file.write_text('[Server] up\n')
+        cfg = types.SimpleNamespace(LOG_FILE=str(log_file), SERVER_CONTAINER='terraria-server')
+        fake_app = types.SimpleNamespace(terraria_config=cfg)
+
+        dead = MagicMock()
+        dead.read.return_value = [types.SimpleNamespace(mask=0x400), types.SimpleNamespace(mask=0x8000)]
+        fresh = MagicMock()
+        done = threading.Event()
+
+        def fresh_read(timeout):
+            done.set()
+            raise SystemExit
+
+        fresh.read.side_effect = fresh_read
+
+        with patch('docker.from_env', side_effect=RuntimeError('no docker')), \
+             patch('terraria_admin.services.console._dir_watcher',
+                   side_effect=[dead, fresh]) as make_watcher, \
+             patch('terraria_admin.services.console.console_extend'), \
+             patch('terraria_admin.services.console.time.sleep', side_effect=SystemExit):
+            from terraria_admin.services.console import start_console_poller
+            start_console_poller(fake_app)
+            assert done.wait(timeout=5)
+            # Let the poller thread finish before the patches are undone.
+            for t in threading.enumerate():
+                if t.name == 'console-file-poller':
+                    t.join(timeout=2)
+
+        dead.close.assert_called_once()
+        assert make_watcher.call_count == 2
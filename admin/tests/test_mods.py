@@ -2,19 +2,54 @@
 import io
 import json
 import os
+import threading
 from unittest.mock import patch, MagicMock
 
 import pytest
 
 from terraria_admin.services.mods import (
     get_enabled_mods, save_enabled_mods, list_mods,
-    record_mod_installed, get_mod_meta, download_mod_from_workshop,
-    ensure_mod_dependencies,
+    record_mod_installed, get_mod_meta, save_mod_meta, download_mod_from_workshop,
+    ensure_mod_dependencies, parse_tmod_dependencies,
 )
 
 
 # ── Service unit tests ────────────────────────────────────────────────────────
 
+def _dotnet_str(s):
+    """Encode *s* the way .NET BinaryWriter.Write(string) does."""
+    data = s.encode('utf-8')
+    n, prefix = len(data), bytearray()
+    while True:
+        b = n & 0x7F
+        n >>= 7
+        prefix.append(b | 0x80 if n else b)
+        if not n:
+            return bytes(prefix) + data
+
+
+def _build_tmod(path, mod_name='TestMod', version='1.0', files=None):
+    """Write a minimal, uncompressed .tmod archive containing *files* {name: bytes}."""
+    files = files or {}
+    table = b''.join(
+        _dotnet_str(name) + len(body).to_bytes(4, 'little') * 2
+        for name, body in files.items()
+    )
+    payload = (
+        _dotnet_str(mod_name) + _dotnet_str(version)
+        + len(files).to_bytes(4, 'little') + table + b''.join(files.values())
+    )
+    with open(path, 'wb') as f:
+        f.write(b'TMOD' + _dotnet_str('2024.1') + b'\x00' * (20 + 256)
+                + len(payload).to_bytes(4, 'little') + payload)
+
+
+def _info_with_refs(*refs):
+    """Binary Info file declaring *refs* as modReferences."""
+    return (_dotnet_str('modReferences') + b''.join(_dotnet_str(r) for r in refs)
+            + _dotnet_str('') + _dotnet_str('side') + b'\x00' + _dotnet_str(''))
+
+
 class FakeModsCfg:
     def __init__(self, tmp_dir):
         self.MODS_DIR = os.path.join(tmp_dir, 'Mods')
@@ -46,6 +81,28 @@ class TestModService:
         assert loaded.get('ModB') is True
         assert loaded.get('ModC') is True
 
+    def test_set_mod_enabled_skips_noop_writes(self, tmp_path):
+        from terraria_admin.services.mods import set_mod_enabled
+        cfg = FakeModsCfg(str(tmp_path))
+        assert set_mod_enabled('ModA', True, cfg) is True
+        with patch('terraria_admin.services.mods.save_enabled_mods') as save:
+            assert set_mod_enabled('ModA', True, cfg) is False
+            assert set_mod_enabled('ModB', False, cfg) is False
+        save.assert_not_called()
+        assert set_mod_enabled('ModA', False, cfg) is True
+        assert get_enabled_mods(cfg) == {}
+
+    def test_known_workshop_ids_are_read_only(self):
+        from terraria_admin.config import Config
+        with pytest.raises(TypeError):
+            Config.KNOWN_WORKSHOP_IDS['Evil'] = '1'
+        assert Config.KNOWN_WORKSHOP_IDS['CalamityMod'] == '2824688072'
+
+    def test_known_workshop_ids_shared_module_constant(self):
+        from terraria_admin import config
+        assert config.Config.KNOWN_WORKSHOP_IDS is config.KNOWN_WORKSHOP_IDS
+        assert config.Config().KNOWN_WORKSHOP_IDS is config.KNOWN_WORKSHOP_IDS
+
     def test_list_mods_empty_dir(self, tmp_path):
         cfg = FakeModsCfg(str(tmp_path))
         assert list_mods(cfg) == []
@@ -60,6 +117,15 @@ class TestModService:
         assert 'ModA' in names
         assert 'ModB' in names
 
+    def test_list_mods_sorted_with_sizes(self, tmp_path):
+        cfg = FakeModsCfg(str(tmp_path))
+        for name, size in (('Zeta.tmod', 1024 * 1024), ('Alpha.tmod', 0), ('notes.txt', 5)):
+            with open(os.path.join(cfg.MODS_DIR, name), 'wb') as f:
+                f.write(b'\x00' * size)
+        mods = list_mods(cfg)
+        assert [m['name'] for m in mods] == ['Alpha', 'Zeta']
+        assert [m['size_mb'] for m in mods] == [0, 1.0]
+
     def test_download_uses_tmodloader_app_id_first(self, tmp_path):
         """download_mod_from_workshop tries App ID 1281930 before 105600.
         Simulates the case where the mod is in the tModLoader Workshop (1281930)
@@ -97,6 +163,30 @@ class TestModService:
         # Must try 1281930 first
         assert calls[0] == '1281930'
 
+    def test_download_replaces_installed_mod_atomically(self, tmp_path):
+        """An update must swap in a new file, never rewrite the mapped one."""
+        cfg = FakeModsCfg(str(tmp_path))
+        cfg.TERRARIA_APP_ID = '105600'
+        dest = os.path.join(cfg.MODS_DIR, 'CalamityMod.tmod')
+        with open(dest, 'wb') as f:
+            f.write(b'old' * 100)
+        old_inode = os.stat(dest).st_ino
+
+        workshop_dir = tmp_path / 'ws' / '1.4.4'
+        workshop_dir.mkdir(parents=True)
+        (workshop_dir / 'CalamityMod.tmod').write_bytes(b'new')
+
+        with patch('terraria_admin.services.mods._run_steamcmd_download',
+                   return_value=(MagicMock(stdout='', stderr=''), str(tmp_path / 'ws'))):
+            mod_name, err = download_mod_from_workshop(
+                '/fake/steamcmd.sh', '2824688072', cfg, steamcmd_home=str(tmp_path / 'home'))
+
+        assert err is None and mod_name == 'CalamityMod'
+        with open(dest, 'rb') as f:
+            assert f.read() == b'new'
+        assert os.stat(dest).st_ino != old_inode
+        assert not os.path.exists(dest + '.part')
+
     def test_download_falls_back_to_terraria_app_id(self, tmp_path):
         """Falls back to TERRARIA_APP_ID (105600) when 1281930 has no match."""
         cfg = FakeModsCfg(str(tmp_path))
@@ -148,6 +238,104 @@ class TestModService:
         assert 'CalamityMod' in meta
         assert meta['CalamityMod']['workshop_id'] == '2824688072'
 
+    def test_get_mod_meta_picks_up_external_changes(self, tmp_path):
+        """The stat-keyed cache must not hide edits made outside save_mod_meta."""
+        cfg = FakeModsCfg(str(tmp_path))
+        save_mod_meta({'ModA': {'version': '1.0'}}, cfg)
+        assert get_mod_meta(cfg)['ModA']['version'] == '1.0'
+
+        path = os.path.join(cfg.MODS_DIR, '.mod_meta.json')
+        with open(path, 'w') as f:
+            json.dump({'ModA': {'version': '2.0'}, 'ModB': {}}, f)
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+        meta = get_mod_meta(cfg)
+        assert meta['ModA']['version'] == '2.0'
+        assert 'ModB' in meta
+
+    def test_get_mod_meta_returns_independent_copy(self, tmp_path):
+        cfg = FakeModsCfg(str(tmp_path))
+        save_mod_meta({'ModA': {'version': '1.0'}}, cfg)
+        get_mod_meta(cfg).pop('ModA')
+        assert 'ModA' in get_mod_meta(cfg)
+
+    def test_parse_tmod_dependencies_reads_info(self, tmp_path):
+        path = str(tmp_path / 'Child.tmod')
+        _build_tmod(path, 'Child', files={'Info': _info_with_refs('Parent@1.0', 'Other')})
+        assert parse_tmod_dependencies(path) == ['Parent', 'Other']
+
+    def test_parse_tmod_dependencies_skips_other_entries(self, tmp_path):
+        path = str(tmp_path / 'Big.tmod')
+        files = {f'Assets/tex{i}.rawimg': b'\x00' * (i + 1) for i in range(50)}
+        files['Assets/' + 'long' * 40 + '.png'] = b'\x01' * 7
+        files['build.txt'] = b'modReferences = Ignored\n'
+        files['Info'] = _info_with_refs('Parent')
+        _build_tmod(path, 'Big', files=files)
+        assert parse_tmod_dependencies(path) == ['Parent']
+
+    def test_parse_tmod_dependencies_falls_back_to_build_txt(self, tmp_path):
+        path = str(tmp_path / 'Old.tmod')
+        _build_tmod(path, 'Old', files={'a.png': b'xx', 'build.txt': b'modReferences = A, B\n'})
+        assert parse_tmod_dependencies(path) == ['A', 'B']
+
+    def test_extract_tmod_version_cached_until_file_changes(self, tmp_path):
+        from terraria_admin.services.mods import extract_tmod_version
+        path = str(tmp_path / 'Ver.tmod')
+        _build_tmod(path, 'Ver', '1.0')
+        assert extract_tmod_version(path) == ('Ver', '1.0')
+
+        with patch('terraria_admin.services.mods._extract_tmod_version') as m:
+            assert extract_tmod_version(path) == ('Ver', '1.0')
+        m.assert_not_called()
+
+        _build_tmod(path, 'Ver', '1.0.1')
+        assert extract_tmod_version(path) == ('Ver', '1.0.1')
+
+    @pytest.mark.parametrize('text', ['', 'version', 'x' * 127, 'y' * 128, 'z' * 20000, 'Привет'])
+    def test_read_7bit_string_roundtrip(self, text):
+        from terraria_admin.services.mods import _read_7bit_string
+        encoded = b'\xff' + _dotnet_str(text) + b'tail'
+        assert _read_7bit_string(encoded, 1) == (text, len(encoded) - 4)
+
+    @pytest.mark.parametrize('content', [b'', b'NOTATMOD' * 10])
+    def test_parse_tmod_dependencies_empty_or_foreign_file(self, tmp_path, content):
+        path = tmp_path / 'Broken.tmod'
+        path.write_bytes(content)
+        assert parse_tmod_dependencies(str(path)) == []
+
+    def test_parse_tmod_dependencies_cached_until_file_changes(self, tmp_path):
+        path = str(tmp_path / 'Cached.tmod')
+        _build_tmod(path, 'Cached', files={'Info': _info_with_refs('A')})
+        assert parse_tmod_dependencies(path) == ['A']
+
+        with patch('terraria_admin.services.mods._parse_tmod_dependencies') as m:
+            assert parse_tmod_dependencies(path) == ['A']
+        m.assert_not_called()
+
+        _build_tmod(path, 'Cached', files={'Info': _info_with_refs('A', 'B')})
+        assert parse_tmod_dependencies(path) == ['A', 'B']
+
+    def test_background_updates_record_each_successful_download(self, tmp_path):
+        from terraria_admin.services.mods import run_background_mod_updates
+        cfg = FakeModsCfg(str(tmp_path))
+        cfg.STEAMCMD_BIN = str(tmp_path / 'steamcmd')
+        open(cfg.STEAMCMD_BIN, 'w').close()
+        for name in ('CalamityMod', 'Local'):
+            open(os.path.join(cfg.MODS_DIR, f'{name}.tmod'), 'wb').close()
+        save_mod_meta({'Other': {'workshop_id': '42'}}, cfg)
+        open(os.path.join(cfg.MODS_DIR, 'Other.tmod'), 'wb').close()
+
+        results = [('2824688072', 'CalamityMod', None), ('42', None, 'download failed')]
+        with patch('terraria_admin.services.mods.download_workshop_mods',
+                   return_value=iter(results)) as dl, \
+             patch('terraria_admin.services.mods.record_mod_installed') as rec:
+            run_background_mod_updates(cfg)
+
+        assert sorted(dl.call_args.args[1]) == ['2824688072', '42']
+        rec.assert_called_once_with(
+            'CalamityMod', os.path.join(cfg.MODS_DIR, 'CalamityMod.tmod'), cfg, '2824688072')
+
     def test_ensure_mod_dependencies_records_version(self, tmp_path):
         """Auto-installed dependencies must have their version recorded in meta.
 
@@ -239,7 +427,7 @@ class TestModRoutes:
     def test_mods_upload_valid_tmod(self, auth_client, app):
         cfg = app.terraria_config
         os.makedirs(cfg.MODS_DIR, exist_ok=True)
-        fake_tmod = b'\x00' * 512
+        fake_tmod = b'TMOD' + b'\x00' * 508
         data = {
             'mod_file': (io.BytesIO(fake_tmod), 'UploadedMod.tmod'),
         }
@@ -253,6 +441,30 @@ class TestModRoutes:
         assert os.path.exists(dest)
         os.remove(dest)
 
+    def test_mods_upload_bad_magic_rejected(self, auth_client, app):
+        cfg = app.terraria_config
+        data = {'mod_file': (io.BytesIO(b'MZ' + b'\x00' * 64), 'Renamed.tmod')}
+        r = auth_client.post('/mods/upload', data=data,
+                             content_type='multipart/form-data',
+                             follow_redirects=True)
+        assert b'Not a valid .tmod file' in r.data
+        assert not os.path.exists(os.path.join(cfg.MODS_DIR, 'Renamed.tmod'))
+
+    def test_mods_upload_streams_full_content(self, auth_client, app):
+        cfg = app.terraria_config
+        payload = b'TMOD' + os.urandom(3 * (1 << 20) + 17)
+        data = {'mod_file': (io.BytesIO(payload), 'BigMod.tmod')}
+        with patch('terraria_admin.blueprints.mods.record_mod_installed'):
+            auth_client.post('/mods/upload', data=data,
+                             content_type='multipart/form-data')
+        dest = os.path.join(cfg.MODS_DIR, 'BigMod.tmod')
+        try:
+            with open(dest, 'rb') as fh:
+                assert fh.read() == payload
+            assert not os.path.exists(dest + '.part')
+        finally:
+            os.remove(dest)
+
     def test_mods_delete_traversal_rejected(self, auth_client, app):
         """Path traversal via mod_name is sanitised by secure_filename.
         The route ends up looking for MODS_DIR/passwd.tmod which doesn't exist."""
@@ -263,6 +475,22 @@ class TestModRoutes:
         # Route should not succeed in deleting anything; it flashes "not found" or "invalid path"
         assert b'not found' in r.data.lower() or b'invalid' in r.data.lower()
 
+    def test_mods_delete_symlink_rejected(self, auth_client, app, tmp_path):
+        cfg = app.terraria_config
+        os.makedirs(cfg.MODS_DIR, exist_ok=True)
+        victim = tmp_path / 'victim.tmod'
+        victim.write_bytes(b'TMOD')
+        link = os.path.join(cfg.MODS_DIR, 'Linked.tmod')
+        os.symlink(victim, link)
+        try:
+            r = auth_client.post('/mods/delete', data={'mod_name': 'Linked'},
+                                 follow_redirects=True)
+            assert b'Invalid mod path' in r.data
+            assert os.path.lexists(link)
+            assert victim.exists()
+        finally:
+            os.remove(link)
+
     def test_mods_delete_nonexistent(self, auth_client):
         r = auth_client.post('/mods/delete',
                              data={'mod_name': 'NoSuchMod'},
@@ -306,6 +534,71 @@ class TestModRoutes:
         assert r.status_code == 200
         assert b'steamcmd not found' in r.data.lower()
 
+    def test_mods_update_all_downloads_in_parallel_and_records(self, auth_client, app):
+        cfg = app.terraria_config
+        mods = [{'name': f'Mod{i}', 'workshop_id': str(1000 + i)} for i in range(4)]
+        mods.append({'name': 'LocalOnly', 'workshop_id': None})
+        barrier = threading.Barrier(4, timeout=5)
+        homes = set()
+
+        def fake_download(steamcmd, workshop_id, cfg_arg, steamcmd_home=None):
+            homes.add(steamcmd_home)
+            barrier.wait()  # only passes if all four run at once
+            return f'Mod{int(workshop_id) - 1000}', None
+
+        with patch('terraria_admin.blueprints.mods.shutil.which', return_value='/fake/steamcmd'), \
+             patch('terraria_admin.blueprints.mods.list_mods', return_value=mods), \
+             patch('terraria_admin.services.mods.download_mod_from_workshop', side_effect=fake_download), \
+             patch('terraria_admin.blueprints.mods.record_mod_installed') as record:
+            r = auth_client.post('/mods/update_all', follow_redirects=True)
+        assert r.status_code == 200
+        assert b'LocalOnly' in r.data
+        assert len(homes) == 4
+        assert sorted(c.args[0] for c in record.call_args_list) == ['Mod0', 'Mod1', 'Mod2', 'Mod3']
+
+    def test_mods_update_all_reads_meta_once(self, auth_client, app):
+        from terraria_admin.blueprints import mods as mods_bp
+        mods = [{'name': f'Mod{i}', 'workshop_id': str(2000 + i)} for i in range(3)]
+        results = [(wid, m['name'], None) for wid, m in ((m['workshop_id'], m) for m in mods)]
+        with patch('terraria_admin.blueprints.mods.shutil.which', return_value='/fake/steamcmd'), \
+             patch('terraria_admin.blueprints.mods.list_mods', return_value=mods), \
+             patch('terraria_admin.blueprints.mods.download_workshop_mods', return_value=iter(results)), \
+             patch('terraria_admin.blueprints.mods.record_mod_installed',
+                   return_value={'version': '2.0'}), \
+             patch('terraria_admin.blueprints.mods.get_mod_meta',
+                   wraps=mods_bp.get_mod_meta) as get_meta:
+            r = auth_client.post('/mods/update_all', follow_redirects=True)
+        assert get_meta.call_count == 1
+        assert 'Updated 3 mods' in r.data.decode()
+
+    def test_mods_update_all_parses_real_meta_once(self, auth_client, app):
+        import json as _json
+        cfg = app.terraria_config
+        names = [f'Real{i}' for i in range(3)]
+        paths = [os.path.join(cfg.MODS_DIR, f'{n}.tmod') for n in names]
+        for name, path in zip(names, paths):
+            _build_tmod(path, name, '2.0')
+        meta_path = os.path.join(cfg.MODS_DIR, '.mod_meta.json')
+        save_mod_meta({n: {'version': '1.0', 'workshop_id': str(3000 + i)}
+                       for i, n in enumerate(names)}, cfg)
+        from terraria_admin.services import _cache
+        _cache.clear()
+        results = [(str(3000 + i), n, None) for i, n in enumerate(names)]
+        try:
+            with patch('terraria_admin.blueprints.mods.shutil.which', return_value='/fake/steamcmd'), \
+                 patch('terraria_admin.blueprints.mods.download_workshop_mods',
+                       return_value=iter(results)), \
+                 patch('terraria_admin.services.mods.json.load', wraps=_json.load) as load:
+                r = auth_client.post('/mods/update_all', follow_redirects=True)
+            meta_parses = [c for c in load.call_args_list if c.args[0].name == meta_path]
+            assert len(meta_parses) == 1
+            assert 'Updated 3 mods' in r.data.decode()
+            with open(meta_path) as f:
+                assert {n: e['version'] for n, e in _json.load(f).items()} == dict.fromkeys(names, '2.0')
+        finally:
+            for path in paths + [meta_path]:
+                os.remove(path)
+
     def test_mods_workshop_non_numeric_id_rejected(self, auth_client):
         r = auth_client.post('/mods/workshop',
                              data={'workshop_id': 'abc123!'},
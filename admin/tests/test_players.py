@@ -12,6 +12,25 @@ class TestPlayersRoutes:
         assert r.status_code == 200
         assert b'Players' in r.data
 
+    def test_players_tshock_fetches_bans_concurrently(self, auth_client):
+        import threading
+        both = threading.Barrier(2, timeout=5)
+
+        def slow_players(cfg):
+            both.wait()
+            return [{'nickname': 'Alice'}]
+
+        def slow_rest(endpoint, cfg, *a, **kw):
+            both.wait()  # deadlocks (and times out) if run after get_players
+            return {'status': '200', 'bans': [{'name': 'Griefer', 'reason': 'x'}]}
+
+        with patch('terraria_admin.blueprints.players.get_server_type', return_value='tshock'), \
+             patch('terraria_admin.blueprints.players.get_players', side_effect=slow_players), \
+             patch('terraria_admin.blueprints.players.rest_call', side_effect=slow_rest):
+            r = auth_client.get('/players')
+        assert r.status_code == 200
+        assert b'Griefer' in r.data
+
     def test_players_requires_auth(self, client):
         r = client.get('/players')
         assert r.status_code == 302
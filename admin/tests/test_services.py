@@ -1,6 +1,7 @@
 """Unit tests for individual service functions."""
 import os
 import json
+import time
 from unittest.mock import patch, MagicMock, call
 
 import pytest
@@ -60,7 +61,7 @@ class TestScreenService:
         with patch('docker.from_env', return_value=client):
             result = is_screen_running(cfg)
         assert result is True
-        client.close.assert_called_once()
+        client.close.assert_not_called()
 
     def test_is_screen_running_container_stopped(self, tmp_path):
         from terraria_admin.services.screen import is_screen_running
@@ -94,6 +95,25 @@ class TestServerService:
         cfg.MAX_PLAYERS = 8
         return cfg
 
+    def test_wait_until_stopped_returns_as_soon_as_down(self, tmp_path):
+        from terraria_admin.services.server import wait_until_stopped
+        cfg = self._make_cfg(tmp_path)
+        states = iter(['running', 'running', 'exited'])
+        client = MagicMock()
+        client.containers.get.side_effect = lambda name: MagicMock(status=next(states))
+        with patch('terraria_admin.services.server.get_docker', return_value=client), \
+             patch('terraria_admin.services.server.time.sleep') as sleep:
+            assert wait_until_stopped(cfg) is True
+        assert sleep.call_count == 2
+
+    def test_wait_until_stopped_times_out(self, tmp_path):
+        from terraria_admin.services.server import wait_until_stopped
+        cfg = self._make_cfg(tmp_path)
+        client = MagicMock()
+        client.containers.get.return_value.status = 'running'
+        with patch('terraria_admin.services.server.get_docker', return_value=client):
+            assert wait_until_stopped(cfg, timeout=0.05, interval=0.01) is False
+
     def test_container_action_stop(self, tmp_path):
         from terraria_admin.services.server import container_action
         cfg = self._make_cfg(tmp_path)
@@ -103,7 +123,6 @@ class TestServerService:
         with patch('docker.from_env', return_value=client):
             container_action('stop', cfg)
         container.stop.assert_called_once()
-        client.close.assert_called_once()
 
     def test_container_action_start(self, tmp_path):
         from terraria_admin.services.server import container_action
@@ -125,7 +144,7 @@ class TestServerService:
             container_action('restart', cfg)
         container.restart.assert_called_once()
 
-    def test_container_action_closes_client_on_exception(self, tmp_path):
+    def test_container_action_raises_on_lookup_error(self, tmp_path):
         from terraria_admin.services.server import container_action
         cfg = self._make_cfg(tmp_path)
         client = MagicMock()
@@ -133,8 +152,292 @@ class TestServerService:
         with patch('docker.from_env', return_value=client):
             with pytest.raises(Exception):
                 container_action('stop', cfg)
-        client.close.assert_called_once()
 
+    def test_docker_client_is_shared(self, tmp_path):
+        from terraria_admin.services.server import container_action
+        cfg = self._make_cfg(tmp_path)
+        client = MagicMock()
+        with patch('docker.from_env', return_value=client) as from_env:
+            container_action('start', cfg)
+            container_action('stop', cfg)
+        from_env.assert_called_once_with(max_pool_size=16)
+        client.close.assert_not_called()
+
+    def test_status_check_rebuilds_client_after_connection_error(self, tmp_path):
+        from terraria_admin.services.server import _service_active, _status_cache
+        cfg = self._make_cfg(tmp_path)
+        broken = MagicMock()
+        broken.containers.get.side_effect = ConnectionError('socket closed')
+        healthy = MagicMock()
+        healthy.containers.get.return_value.status = 'running'
+        _status_cache.clear()
+        with patch('docker.from_env', side_effect=[broken, healthy]):
+            assert _service_active(cfg) is False
+            broken.close.assert_called_once()
+            _status_cache.clear()
+            assert _service_active(cfg) is True
+        _status_cache.clear()
+
+    def test_status_check_keeps_client_when_container_missing(self, tmp_path):
+        from docker.errors import NotFound
+        from terraria_admin.services.server import _service_active, _status_cache
+        cfg = self._make_cfg(tmp_path)
+        client = MagicMock()
+        client.containers.get.side_effect = NotFound('no such container')
+        _status_cache.clear()
+        with patch('docker.from_env', return_value=client):
+            assert _service_active(cfg) is False
+        client.close.assert_not_called()
+        _status_cache.clear()
+
+    def test_event_listener_refreshes_status_on_state_change(self, tmp_path):
+        from terraria_admin.services import server
+        cfg = self._make_cfg(tmp_path)
+        client = MagicMock()
+        container = client.containers.get.return_value
+        container.status = 'exited'
+        seen = []
+
+        def events(**kwargs):
+            seen.append((server._events_live.is_set(), server._service_active(cfg)))
+            container.status = 'running'
+            yield {'Action': 'exec_start'}
+            # Unrelated events leave the cached state alone within the live TTL.
+            with patch.object(server.time, 'monotonic', return_value=time.monotonic() + 30):
+                seen.append(server._service_active(cfg))
+            yield {'Action': 'start'}
+            seen.append(server._service_active(cfg))
+
+        client.events.side_effect = events
+        server._status_cache.clear()
+        with patch('docker.from_env', return_value=client), \
+             patch.object(server.time, 'sleep', side_effect=SystemExit), \
+             pytest.raises(SystemExit):
+            server.watch_container_events(cfg)
+
+        assert seen == [(True, False), False, True]
+        assert client.containers.get.call_count == 2
+        assert client.events.call_args.kwargs['filters'] == {
+            'type': 'container', 'container': 'terraria-server'}
+        assert not server._events_live.is_set()
+        server._status_cache.clear()
+
+    def test_live_status_expires_after_live_ttl(self, tmp_path):
+        from terraria_admin.services import server
+        cfg = self._make_cfg(tmp_path)
+        client = MagicMock()
+        client.containers.get.return_value.status = 'running'
+        server._status_cache.clear()
+        server._events_live.set()
+        try:
+            with patch('docker.from_env', return_value=client):
+                assert server._service_active(cfg) is True
+                client.containers.get.return_value.status = 'exited'
+                later = time.monotonic() + server._STATUS_CACHE_LIVE_TTL + 1
+                with patch.object(server.time, 'monotonic', return_value=later):
+                    assert server._service_active(cfg) is False
+        finally:
+            server._events_live.clear()
+            server._status_cache.clear()
+
+    def test_failed_inspect_not_trusted_while_live(self, tmp_path):
+        from terraria_admin.services import server
+        cfg = self._make_cfg(tmp_path)
+        broken = MagicMock()
+        broken.containers.get.side_effect = ConnectionError('socket closed')
+        healthy = MagicMock()
+        healthy.containers.get.return_value.status = 'running'
+        server._status_cache.clear()
+        server._events_live.set()
+        try:
+            with patch('docker.from_env', side_effect=[broken, healthy]):
+                assert server._service_active(cfg) is False
+                later = time.monotonic() + server._STATUS_CACHE_TTL + 1
+                with patch.object(server.time, 'monotonic', return_value=later):
+                    assert server._service_active(cfg) is True
+        finally:
+            server._events_live.clear()
+            server._status_cache.clear()
+
+    def test_inspect_outdated_by_event_is_not_stored(self, tmp_path):
+        from terraria_admin.services import server
+        cfg = self._make_cfg(tmp_path)
+        client = MagicMock()
+
+        def inspect(name):
+            # The container dies while this (older) inspect is in flight.
+            server._invalidate_status(name)
+            return MagicMock(status='running')
+
+        client.containers.get.side_effect = inspect
+        server._status_cache.clear()
+        with patch('docker.from_env', return_value=client):
+            assert server._service_active(cfg) is True
+        assert 'terraria-server' not in server._status_cache
+
+
+# ── extensions.py ─────────────────────────────────────────────────────────────
+
+class TestHttpSession:
+    def test_http_session_is_shared_and_pooled(self):
+        from terraria_admin.extensions import get_http
+        session = get_http()
+        assert get_http() is session
+        adapter = session.get_adapter('https://discord.com/api/webhooks/x')
+        assert adapter._pool_maxsize == 8
+        assert session.headers['User-Agent'] == 'terraria-admin'
+
+    def test_version_check_uses_shared_session(self, tmp_path):
+        from terraria_admin.services import world
+        cfg = MagicMock()
+        cfg.TERRARIA_DIR = str(tmp_path)
+        cfg.SERVER_TYPE = 'tshock'
+        session = MagicMock()
+        session.get.return_value.ok = True
+        session.get.return_value.json.return_value = {'tag_name': 'v5.2.0'}
+        world._version_cache.clear()
+        with patch('terraria_admin.services.world.get_http', return_value=session):
+            info = world.get_version_info(cfg)
+        world._version_cache.clear()
+        assert info['latest'] == 'v5.2.0'
+        session.get.assert_called_once()
+
+
+# ── tshock.py ─────────────────────────────────────────────────────────────────
+
+class TestTshockRest:
+    def test_rest_call_uses_shared_session(self):
+        from terraria_admin.services.tshock import rest_call
+        cfg = MagicMock()
+        cfg.REST_URL = 'http://127.0.0.1:7878'
+        cfg.REST_TOKEN = 'tok'
+        session = MagicMock()
+        session.get.return_value.text = '{"status": "200"}'
+        session.get.return_value.json.return_value = {'status': '200', 'players': []}
+        with patch('terraria_admin.services.tshock.get_http', return_value=session):
+            assert rest_call('/v2/players/list', cfg)['status'] == '200'
+            rest_call('/v2/server/broadcast', cfg, 'POST', {'msg': 'hi'})
+        session.get.assert_called_once_with(
+            'http://127.0.0.1:7878/v2/players/list', params={'token': 'tok'}, timeout=5)
+        assert session.post.call_args.kwargs['data'] == {'token': 'tok', 'msg': 'hi'}
+
+    def test_rest_call_offline(self):
+        import requests
+        from terraria_admin.services.tshock import rest_call
+        cfg = MagicMock()
+        cfg.REST_URL = 'http://127.0.0.1:7878'
+        session = MagicMock()
+        session.get.side_effect = requests.exceptions.ConnectionError()
+        with patch('terraria_admin.services.tshock.get_http', return_value=session):
+            assert rest_call('/v2/server/status', cfg)['status'] == 'error'
+
+
+# ── _cache.py ─────────────────────────────────────────────────────────────────
+
+class TestFileCache:
+    def test_server_type_reparsed_only_when_file_changes(self, tmp_path):
+        from terraria_admin.services.server import get_server_type
+        cfg = MagicMock()
+        cfg.TERRARIA_DIR = str(tmp_path)
+        type_file = tmp_path / '.server_type'
+        type_file.write_text('vanilla\n')
+
+        real_open = open
+        with patch('builtins.open', side_effect=real_open) as mock_open:
+            assert get_server_type(cfg) == 'vanilla'
+            assert get_server_type(cfg) == 'vanilla'
+        assert mock_open.call_count == 1
+
+        type_file.write_text('tshock\n')
+        assert get_server_type(cfg) == 'tshock'
+
+    def test_read_serverconfig_parses_once_per_change(self, tmp_path):
+        from terraria_admin.services import server
+        cfg = MagicMock()
+        cfg.CONFIG_FILE = str(tmp_path / 'serverconfig.txt')
+        server.write_serverconfig(['worldname=Alpha', 'maxplayers=8'], cfg)
+
+        with patch('terraria_admin.services.server.parse_kv', wraps=server.parse_kv) as parse:
+            assert server.read_serverconfig('worldname', cfg) == 'Alpha'
+            assert server.read_serverconfig('maxplayers', cfg) == '8'
+            assert server.read_serverconfig('missing', cfg) is None
+            assert parse.call_count == 1
+            server.write_serverconfig(['worldname=Beta'], cfg)
+            assert server.read_serverconfig('worldname', cfg) == 'Beta'
+            assert parse.call_count == 2
+
+    def test_read_serverconfig_does_not_copy_and_last_key_wins(self, tmp_path):
+        from terraria_admin.services import server
+        cfg = MagicMock()
+        cfg.CONFIG_FILE = str(tmp_path / 'serverconfig.txt')
+        server.write_serverconfig(['port=7777', 'maxplayers = 8', 'port=7778'], cfg)
+        with patch('terraria_admin.services._cache._copy') as copy:
+            assert server.read_serverconfig('port', cfg) == '7778'
+            assert server.read_serverconfig('maxplayers', cfg) == '8'
+        copy.assert_not_called()
+
+    def test_write_serverconfig_is_atomic(self, tmp_path):
+        from terraria_admin.services import server
+        cfg = MagicMock()
+        cfg.CONFIG_FILE = str(tmp_path / 'serverconfig.txt')
+        server.write_serverconfig(['worldname=Alpha'], cfg)
+        assert (tmp_path / 'serverconfig.txt').read_text() == 'worldname=Alpha\n'
+
+        with patch('terraria_admin.services.server.os.fsync', side_effect=OSError('EIO')):
+            with pytest.raises(OSError):
+                server.write_serverconfig(['worldname=Beta'], cfg)
+        assert (tmp_path / 'serverconfig.txt').read_text() == 'worldname=Alpha\n'
+        assert os.listdir(tmp_path) == ['serverconfig.txt']
+
+    def test_write_serverconfig_handles_short_writes_and_syncs_dir(self, tmp_path):
+        from terraria_admin.services import server
+        cfg = MagicMock()
+        cfg.CONFIG_FILE = str(tmp_path / 'serverconfig.txt')
+        real_write = os.write
+        synced = []
+        real_fsync = os.fsync
+
+        def fsync(fd):
+            synced.append(os.path.isdir(f'/proc/self/fd/{fd}'))
+            real_fsync(fd)
+
+        lines = [f'key{i}=value{i}' for i in range(200)]
+        with patch('terraria_admin.services.server.os.write',
+                   side_effect=lambda fd, data: real_write(fd, data[:7])), \
+             patch('terraria_admin.services.server.os.fsync', side_effect=fsync):
+            server.write_serverconfig(lines, cfg)
+        assert (tmp_path / 'serverconfig.txt').read_text() == '\n'.join(lines) + '\n'
+        assert synced == [False, True]
+
+    def test_request_scope_skips_stat_and_save_invalidates(self, app, tmp_path):
+        from terraria_admin.services.mods import get_enabled_mods, save_enabled_mods
+        cfg = MagicMock()
+        cfg.MODS_DIR = str(tmp_path)
+        save_enabled_mods({'ModA': True}, cfg)
+
+        with app.test_request_context():
+            app.preprocess_request()
+            assert get_enabled_mods(cfg) == {'ModA': True}
+            with patch('terraria_admin.services._cache.os.stat') as mock_stat:
+                enabled = get_enabled_mods(cfg)
+            mock_stat.assert_not_called()
+            enabled['ModB'] = True  # callers get a copy
+            assert get_enabled_mods(cfg) == {'ModA': True}
+            save_enabled_mods(enabled, cfg)
+            assert get_enabled_mods(cfg) == {'ModA': True, 'ModB': True}
+
+
+    def test_save_mod_meta_writes_through(self, tmp_path):
+        from terraria_admin.services.mods import get_mod_meta, save_mod_meta
+        cfg = MagicMock()
+        cfg.MODS_DIR = str(tmp_path)
+        meta = {'ModA': {'version': '1.0'}}
+        save_mod_meta(meta, cfg)
+        meta['ModA'] = {'version': 'mutated'}  # the cache keeps its own copy
+
+        with patch('terraria_admin.services.mods.json.load') as load:
+            assert get_mod_meta(cfg) == {'ModA': {'version': '1.0'}}
+        load.assert_not_called()
 
 # ── discord.py ────────────────────────────────────────────────────────────────
 
@@ -147,19 +450,24 @@ class TestDiscordService:
         discord_notify('Test message', cfg)
 
     def test_discord_notify_sends_request(self, tmp_path):
-        from terraria_admin.services.discord import discord_notify, save_discord_config
+        from terraria_admin.services.discord import (
+            discord_notify, discord_queue, save_discord_config,
+        )
         cfg = MagicMock()
         cfg.DISCORD_CONFIG_FILE = str(tmp_path / '.discord.json')
         save_discord_config({'webhook_url': 'https://discord.com/api/webhooks/test'}, cfg)
 
-        with patch('requests.post') as mock_post:
+        session = MagicMock()
+        with patch('terraria_admin.services.discord.get_http', return_value=session):
             discord_notify('Server started', cfg)
-            import time; time.sleep(0.15)
+            discord_queue.join()
 
-        mock_post.assert_called_once()
-        payload = mock_post.call_args[1]['json']
+        session.post.assert_called_once()
+        payload = session.post.call_args[1]['json']
         assert 'embeds' in payload
         assert 'Server started' in payload['embeds'][0]['description']
+        from datetime import datetime
+        assert datetime.fromisoformat(payload['embeds'][0]['timestamp']).utcoffset().total_seconds() == 0
 
     def test_discord_notify_event_disabled(self, tmp_path):
         from terraria_admin.services.discord import discord_notify, save_discord_config
@@ -169,10 +477,74 @@ class TestDiscordService:
             'webhook_url': 'https://discord.com/api/webhooks/test',
             'notify_start': False,
         }, cfg)
-        with patch('requests.post') as mock_post:
+        with patch('terraria_admin.services.discord.discord_queue') as mock_queue:
             discord_notify('Server started', cfg, event='start')
-            import time; time.sleep(0.15)
-        mock_post.assert_not_called()
+        mock_queue.put_nowait.assert_not_called()
+
+    def test_discord_notify_coalesces_identical_burst(self, tmp_path):
+        from terraria_admin.services import discord
+        cfg = MagicMock()
+        cfg.DISCORD_CONFIG_FILE = str(tmp_path / '.discord3.json')
+        discord.save_discord_config({'webhook_url': 'https://discord.com/api/webhooks/test'}, cfg)
+        discord._recent.clear()
+
+        session = MagicMock()
+        with patch('terraria_admin.services.discord.get_http', return_value=session):
+            discord.discord_notify('Server stopped', cfg, event='stop')
+            discord.discord_notify('Server stopped', cfg, event='stop')
+            discord.discord_notify('Backup created', cfg, event='backup')
+            discord.discord_queue.join()
+
+        assert session.post.call_count == 2
+
+    def test_discord_notify_drops_when_queue_full(self, tmp_path):
+        import queue
+        from terraria_admin.services import discord
+        cfg = MagicMock()
+        cfg.DISCORD_CONFIG_FILE = str(tmp_path / '.discord4.json')
+        discord.save_discord_config({'webhook_url': 'https://discord.com/api/webhooks/test'}, cfg)
+
+        full = MagicMock()
+        full.put_nowait.side_effect = queue.Full
+        with patch('terraria_admin.services.discord.discord_queue', full):
+            discord.discord_notify('Server started', cfg)  # must not raise or block
+
+
+# ── world.py ──────────────────────────────────────────────────────────────────
+
+class TestTmodloaderUpdate:
+    def test_update_swaps_in_place_with_rename(self, tmp_path):
+        import io
+        import zipfile
+        from terraria_admin.services import world
+        cfg = MagicMock()
+        cfg.TERRARIA_DIR = str(tmp_path)
+        (tmp_path / '.server_version').write_text('v1')
+        (tmp_path / 'tModLoader').mkdir()
+        (tmp_path / 'tModLoader' / 'old.dll').write_bytes(b'old')
+
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, 'w') as zf:
+            zf.writestr('tModLoader.dll', b'new')
+        release = MagicMock(ok=True)
+        release.json.return_value = {
+            'tag_name': 'v2',
+            'assets': [{'name': 'tModLoader.zip', 'browser_download_url': 'https://x/t.zip'}],
+        }
+        download = MagicMock()
+        download.iter_content.return_value = [buf.getvalue()]
+        session = MagicMock()
+        session.get.side_effect = [release, download]
+
+        with patch('terraria_admin.services.world.get_http', return_value=session), \
+             patch('terraria_admin.services.world.container_action'), \
+             patch('shutil.move', side_effect=AssertionError('cross-device move')):
+            ok, msg = world.update_tmodloader(cfg)
+
+        assert ok, msg
+        assert (tmp_path / 'tModLoader' / 'tModLoader.dll').read_bytes() == b'new'
+        assert (tmp_path / 'tModLoader_bak_v1' / 'old.dll').read_bytes() == b'old'
+        assert not [p for p in os.listdir(tmp_path) if p.startswith('.tml_update_')]
 
 
 # ── backups.py ────────────────────────────────────────────────────────────────
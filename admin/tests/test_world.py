@@ -5,6 +5,12 @@ from unittest.mock import patch, MagicMock
 import pytest
 
 
+def _wait_for_world_jobs():
+    """Block until every queued recreate/switch job has run (single worker, FIFO)."""
+    from terraria_admin.extensions import get_world_ops
+    get_world_ops().submit(lambda: None).result(timeout=5)
+
+
 # ── World service unit tests ───────────────────────────────────────────────────
 
 class TestWorldService:
@@ -216,6 +222,44 @@ class TestWorldRoutes:
         assert r.status_code == 200
         assert b'Invalid world name' in r.data
 
+    @pytest.mark.parametrize('name', ['', 'a/b', 'a\\b', 'x\x00y', 'evil\nworld=/etc', 'cr\rlf'])
+    def test_world_switch_bad_names_rejected_before_fs(self, auth_client, name):
+        with patch('terraria_admin.blueprints.world.list_worlds') as mock_list, \
+             patch('terraria_admin.blueprints.world._submit_job') as mock_submit:
+            r = auth_client.post('/world/switch', data={'world_name': name})
+        assert r.status_code == 302
+        mock_list.assert_not_called()
+        mock_submit.assert_not_called()
+
+    def test_world_switch_requires_listed_world(self, auth_client):
+        with patch('terraria_admin.blueprints.world.list_worlds',
+                   return_value=[{'name': 'Other'}]), \
+             patch('terraria_admin.blueprints.world._submit_job') as mock_submit:
+            r = auth_client.post('/world/switch', data={'world_name': 'A' * 65})
+        assert r.status_code == 302
+        mock_submit.assert_not_called()
+
+    def test_world_switch_accepts_existing_non_ascii_name(self, auth_client, app):
+        cfg = app.terraria_config
+        name = "Bob's Wörld v1.2"
+        world_path = os.path.join(cfg.WORLDS_DIR, name + '.wld')
+        with open(world_path, 'wb') as f:
+            f.write(b'\x00' * 64)
+        try:
+            with patch('terraria_admin.blueprints.world._submit_job', return_value='j') as mock_submit:
+                r = auth_client.post('/world/switch', data={'world_name': name})
+        finally:
+            os.remove(world_path)
+        assert r.status_code == 302
+        mock_submit.assert_called_once()
+        assert mock_submit.call_args[0][2:] == (world_path, name)
+
+    def test_recreate_world_rejects_bad_name(self, auth_client):
+        with patch('terraria_admin.blueprints.world._submit_job') as mock_submit:
+            r = auth_client.post('/world/recreate', data={'worldname': '../Evil'})
+        assert r.status_code == 302
+        mock_submit.assert_not_called()
+
     def test_world_switch_nonexistent_world(self, auth_client):
         with patch('terraria_admin.blueprints.world.get_server_status', return_value={'online': False}), \
              patch('terraria_admin.services.world.list_worlds', return_value=[]):
@@ -238,18 +282,42 @@ class TestWorldRoutes:
             r = auth_client.post('/world/switch',
                                  data={'world_name': 'SwitchTest'},
                                  follow_redirects=True)
+            _wait_for_world_jobs()
         assert r.status_code == 200
-        assert b'Switched' in r.data or b'Error' in r.data
+        assert b'Switching to world' in r.data
 
         os.remove(world_path)
 
+    def test_world_switch_keeps_other_settings(self, auth_client, app):
+        cfg = app.terraria_config
+        os.makedirs(cfg.WORLDS_DIR, exist_ok=True)
+        world_path = os.path.join(cfg.WORLDS_DIR, 'Keep.wld')
+        with open(world_path, 'wb') as f:
+            f.write(b'\x00' * 64)
+        with open(cfg.CONFIG_FILE, 'w') as f:
+            f.write('# header\nworld=/old.wld\nautocreate=2\nmaxplayers = 12\nmotd=a=b\n')
+        try:
+            with patch('terraria_admin.blueprints.world.container_action'):
+                auth_client.post('/world/switch', data={'world_name': 'Keep'})
+                _wait_for_world_jobs()
+            with open(cfg.CONFIG_FILE) as f:
+                written = f.read()
+        finally:
+            os.remove(world_path)
+            os.remove(cfg.CONFIG_FILE)
+        assert f'world={world_path}\n' in written
+        assert 'worldname=Keep\n' in written
+        assert 'maxplayers=12\n' in written
+        assert 'motd=a=b\n' in written
+        assert 'autocreate' not in written
+
     def test_recreate_world_writes_evil_and_seed(self, auth_client, app):
         """recreate_world must write evil type and seed to serverconfig."""
         cfg = app.terraria_config
         os.makedirs(cfg.WORLDS_DIR, exist_ok=True)
 
         with patch('terraria_admin.blueprints.world.container_action'), \
-             patch('terraria_admin.blueprints.world.time'):
+             patch('terraria_admin.blueprints.world.wait_until_stopped'):
             r = auth_client.post('/world/recreate',
                                  data={
                                      'worldname': 'EvilSeedWorld',
@@ -259,6 +327,7 @@ class TestWorldRoutes:
                                      'seed': 'not the bees',
                                  },
                                  follow_redirects=False)
+            _wait_for_world_jobs()
         assert r.status_code == 302
 
         with open(cfg.CONFIG_FILE) as f:
@@ -266,13 +335,40 @@ class TestWorldRoutes:
         assert 'evil=2' in config
         assert 'seed=not the bees' in config
 
+    def test_recreate_world_config_layout(self, auth_client, app):
+        cfg = app.terraria_config
+        with patch('terraria_admin.blueprints.world.container_action'), \
+             patch('terraria_admin.blueprints.world.wait_until_stopped'):
+            auth_client.post('/world/recreate', data={
+                'worldname': 'Layout', 'size': '3', 'difficulty': '2', 'evil': '1', 'seed': '42',
+            })
+            _wait_for_world_jobs()
+
+        with open(cfg.CONFIG_FILE) as f:
+            lines = f.read().split('\n')
+        assert lines[0] == '# Terraria Server Configuration'
+        assert lines[1].startswith('# Created: ')
+        assert lines[2:12] == [
+            '',
+            f'world={cfg.TERRARIA_DIR}/worlds/Layout.wld',
+            'autocreate=3',
+            'worldname=Layout',
+            'difficulty=2',
+            'evil=1',
+            'seed=42',
+            f'worldpath={cfg.TERRARIA_DIR}/worlds',
+            'maxplayers=8',
+            'port=7777',
+        ]
+        assert lines[-2:] == ['priority=1', '']
+
     def test_recreate_world_omits_seed_when_blank(self, auth_client, app):
         """When seed is blank, seed= line must NOT appear in serverconfig."""
         cfg = app.terraria_config
         os.makedirs(cfg.WORLDS_DIR, exist_ok=True)
 
         with patch('terraria_admin.blueprints.world.container_action'), \
-             patch('terraria_admin.blueprints.world.time'):
+             patch('terraria_admin.blueprints.world.wait_until_stopped'):
             r = auth_client.post('/world/recreate',
                                  data={
                                      'worldname': 'TestWorld2',
@@ -282,12 +378,48 @@ class TestWorldRoutes:
                                      'seed': '',
                                  },
                                  follow_redirects=False)
+            _wait_for_world_jobs()
         assert r.status_code == 302
 
         with open(cfg.CONFIG_FILE) as f:
             config = f.read()
         assert 'seed=' not in config
 
+    def test_recreate_world_returns_before_job_runs(self, auth_client, app):
+        """The POST only queues the job; its id is handed to the page to poll."""
+        import threading
+        cfg = app.terraria_config
+        release = threading.Event()
+
+        with patch('terraria_admin.blueprints.world.container_action'), \
+             patch('terraria_admin.blueprints.world.wait_until_stopped',
+                   side_effect=lambda cfg: release.wait(5)):
+            r = auth_client.post('/world/recreate', data={'worldname': 'QueuedWorld'})
+            assert r.status_code == 302
+            job_id = r.headers['Location'].split('job=')[1]
+            assert auth_client.get(f'/world/job/{job_id}').get_json()['status'] in ('pending', 'running')
+            release.set()
+            _wait_for_world_jobs()
+
+        assert auth_client.get(f'/world/job/{job_id}').get_json() == {'status': 'done'}
+        with open(cfg.CONFIG_FILE) as f:
+            assert 'worldname=QueuedWorld' in f.read()
+
+    def test_world_job_reports_error(self, auth_client, app):
+        with patch('terraria_admin.blueprints.world.container_action'), \
+             patch('terraria_admin.blueprints.world.wait_until_stopped'), \
+             patch('terraria_admin.blueprints.world.write_serverconfig_text',
+                   side_effect=OSError('disk full')):
+            r = auth_client.post('/world/recreate', data={'worldname': 'FailWorld'})
+            _wait_for_world_jobs()
+        job_id = r.headers['Location'].split('job=')[1]
+        data = auth_client.get(f'/world/job/{job_id}').get_json()
+        assert data == {'status': 'error', 'error': 'disk full'}
+
+    def test_world_job_unknown_id(self, auth_client):
+        r = auth_client.get('/world/job/doesnotexist')
+        assert r.status_code == 404
+
     def test_set_time_tmodloader_sends_cmd(self, auth_client):
         with patch('terraria_admin.blueprints.world.screen_send', return_value=True) as mock_send:
             r = auth_client.post('/world/time',
@@ -297,3 +429,21 @@ class TestWorldRoutes:
         mock_send.assert_called_once()
         # 'day' maps to 'dawn' for tModLoader
         assert mock_send.call_args[0][0] == 'dawn'
+
+    def test_set_time_rejects_unknown_value_before_server_type(self, auth_client):
+        with patch('terraria_admin.blueprints.world.get_server_type') as mock_type, \
+             patch('terraria_admin.blueprints.world.screen_send') as mock_send:
+            r = auth_client.post('/world/time',
+                                 data={'time': 'exit'},
+                                 follow_redirects=False)
+        assert r.status_code == 302
+        mock_type.assert_not_called()
+        mock_send.assert_not_called()
+
+    def test_broadcast_empty_message_skips_server_type(self, auth_client):
+        with patch('terraria_admin.blueprints.world.get_server_type') as mock_type:
+            r = auth_client.post('/world/broadcast',
+                                 data={'message': '   '},
+                                 follow_redirects=False)
+        assert r.status_code == 302
+        mock_type.assert_not_called()